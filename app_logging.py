@@ -0,0 +1,142 @@
+"""
+Logging setup for Receipt Task Printer.
+Log records are put on an in-memory queue by the thread that logs them and
+formatted and written by a background listener, so adding a task or printing a
+receipt never waits for the disk. The log file rotates by size, or by time when
+``RECEIPT_LOG_ROTATE`` names an interval, and old files beyond the backup count
+are deleted, so the log cannot grow without limit on shared PCs.
+
+Settings come from the environment:
+
+    RECEIPT_LOG_FILE     log file path (default: receipt_tasks.log)
+    RECEIPT_LOG_FORMAT   ``text`` (default) or ``json`` for one JSON object per line
+    RECEIPT_LOG_MAX_BYTES  size that triggers rotation (default: 1 MB)
+    RECEIPT_LOG_BACKUPS  rotated files kept (default: 5)
+    RECEIPT_LOG_ROTATE   rotate on time instead, e.g. ``midnight`` or ``H``
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime
+from typing import List, Optional
+
+LOG_FILE = 'receipt_tasks.log'
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 5
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+FILE_ENV_VAR = 'RECEIPT_LOG_FILE'
+FORMAT_ENV_VAR = 'RECEIPT_LOG_FORMAT'
+MAX_BYTES_ENV_VAR = 'RECEIPT_LOG_MAX_BYTES'
+BACKUPS_ENV_VAR = 'RECEIPT_LOG_BACKUPS'
+ROTATE_ENV_VAR = 'RECEIPT_LOG_ROTATE'
+
+TEXT = 'text'
+JSON_LINES = 'json'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object on a single line, for log shipping."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records unformatted, leaving all formatting to the listener thread.
+
+    The stock ``prepare`` formats the message on the logging thread so records
+    can be pickled; this queue never leaves the process, so that is not needed.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, ''))
+    except ValueError:
+        return default
+
+
+def create_file_handler(path: str, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                        rotate: Optional[str] = None) -> logging.Handler:
+    """Return a handler that rotates ``path`` by size, or by time when ``rotate`` is given."""
+    if rotate:
+        return logging.handlers.TimedRotatingFileHandler(path, when=rotate, backupCount=backups,
+                                                         encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                encoding='utf-8', delay=True)
+
+
+def setup_logging(level: int = logging.INFO, path: Optional[str] = None, log_format: Optional[str] = None,
+                  console: bool = True) -> logging.handlers.QueueListener:
+    """
+    Route the root logger through a queue to a rotating log file and the console.
+
+    Arguments left as None are read from the environment. Calling again replaces
+    the previous setup; the listener is stopped, flushing the queue, at exit.
+    """
+    global _listener, _queue_handler
+    path = path or os.environ.get(FILE_ENV_VAR) or LOG_FILE
+    log_format = (log_format or os.environ.get(FORMAT_ENV_VAR, '').strip().lower() or TEXT)
+    if log_format not in (TEXT, JSON_LINES):
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    file_handler = create_file_handler(path, _env_int(MAX_BYTES_ENV_VAR, LOG_MAX_BYTES),
+                                       _env_int(BACKUPS_ENV_VAR, LOG_BACKUPS),
+                                       os.environ.get(ROTATE_ENV_VAR) or None)
+    file_handler.setFormatter(JsonLinesFormatter() if log_format == JSON_LINES
+                              else logging.Formatter(TEXT_FORMAT))
+    handlers: List[logging.Handler] = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    shutdown_logging()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    _queue_handler = _EnqueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and close the log file; safe to call twice."""
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for Receipt Task Printer.
+Measures application startup, task list and task store operations at 10 to
+100,000 tasks, per-receipt layout and encoding time, and end-to-end receipts
+per second against a fake printer with configurable latency and against the
+ESC/POS emulator.
+
+Results are written as JSON and can be compared with a saved baseline; any
+metric more than ``--threshold`` worse than the baseline is reported as a
+regression and makes the run exit with status 1::
+
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --baseline baseline.json
+
+GUI benchmarks need a display and are skipped without one.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import printer_utils
+import receipt_layout
+import task_store
+from escpos_emulator import EscPosEmulator
+from printer_utils import ESCPOS_RASTER, ESCPOS_TEXT, EscPosBackend
+
+SECONDS = 's'
+RATE = 'receipts/s'
+
+LIST_SIZES = (10, 100, 1000, 10000, 100000)
+QUICK_LIST_SIZES = (10, 1000)
+E2E_TASKS = 200
+QUICK_E2E_TASKS = 50
+DEFAULT_THRESHOLD = 0.25  # Fractional slowdown reported as a regression
+STARTUP_TARGET = 2.0  # Seconds; NFR-01 in spec.md
+
+BENCH_PRINTER = 'RONGTA Benchmark'
+
+# Run in a fresh interpreter; prints the wall-clock time once the window is drawn
+_STARTUP_SCRIPT = """
+import time
+import tkinter as tk
+import main
+root = tk.Tk()
+app = main.ReceiptTaskApp(root)
+root.update()
+print(time.time())
+app._on_close()
+"""
+
+Results = Dict[str, Dict[str, object]]
+
+
+class FakePrinterBackend(EscPosBackend):
+    """ESC/POS backend whose printer discards data after ``latency`` seconds per receipt."""
+
+    def __init__(self, latency: float = 0.0, mode: str = ESCPOS_TEXT):
+        super().__init__({BENCH_PRINTER: os.devnull}, discover_devices=False, mode=mode,
+                         logo_path='')
+        self.latency = latency
+
+    def _write(self, sink, data: bytes) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        super()._write(sink, data)
+
+
+def time_call(func: Callable[[], object], number: int = 1, repeat: int = 5) -> float:
+    """Return the median seconds per call over ``repeat`` runs of ``number`` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return statistics.median(timings)
+
+
+def sample_tasks(count: int, prefix: str = 'Task') -> List[str]:
+    """Return distinct tasks of typical length, with every tenth one long enough to wrap."""
+    tasks = []
+    for i in range(count):
+        if i % 10 == 9:
+            tasks.append(f"{prefix} {i}: pick up the dry cleaning, then call the supplier about "
+                         f"the order for table linen before the lunch service")
+        else:
+            tasks.append(f"{prefix} {i}: table {i % 40 + 1}, 2x soup")
+    return tasks
+
+
+def _record(results: Results, name: str, value: float, unit: str = SECONDS) -> None:
+    results[name] = {'value': value, 'unit': unit}
+    shown = f"{value * 1000:.3f} ms" if unit == SECONDS else f"{value:.1f} {unit}"
+    print(f"{name:<40} {shown}", file=sys.stderr)
+
+
+def bench_startup(results: Results, skipped: Dict[str, str], repeat: int) -> None:
+    """Time from launching the interpreter to the first drawn window."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    timings = []
+    with tempfile.TemporaryDirectory() as workdir:  # Keeps the app's log file out of the tree
+        for _ in range(repeat):
+            started = time.time()
+            proc = subprocess.run([sys.executable, '-c', _STARTUP_SCRIPT], cwd=workdir, env=env,
+                                  capture_output=True, text=True, timeout=60)
+            lines = proc.stdout.split()
+            if proc.returncode != 0 or not lines:
+                reason = (proc.stderr.strip().splitlines() or ['no output'])[-1]
+                skipped['startup'] = reason
+                print(f"{'startup':<40} skipped: {reason}", file=sys.stderr)
+                return
+            timings.append(float(lines[-1]) - started)
+    startup = statistics.median(timings)
+    _record(results, 'startup', startup)
+    if startup > STARTUP_TARGET:
+        print(f"Startup exceeds the {STARTUP_TARGET:g} s target", file=sys.stderr)
+
+
+def bench_task_list(results: Results, skipped: Dict[str, str], sizes: Sequence[int]) -> None:
+    """Time adding, removing and redrawing tasks in the GUI at each list size."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:  # ImportError, or TclError without a display
+        skipped['gui'] = str(e)
+        print(f"{'gui':<40} skipped: {e}", file=sys.stderr)
+        return
+    import main
+    # Keep per-task log lines out of the measurements and off the console
+    logging.disable(logging.INFO)
+    printer_utils.set_backend(FakePrinterBackend())
+    app = main.ReceiptTaskApp(root)
+    try:
+        for n in sizes:
+            app.tasks.clear()
+            app.tasks.add(sample_tasks(n))
+            repeat = max(3, min(20, 10000 // n))
+
+            def refresh():
+                app._refresh_listbox()
+                root.update_idletasks()
+
+            def add():
+                app.task_entry.insert(0, 'New task')
+                app._add_task()
+                # Draw now rather than at the next frame, so each run pays for its own redraw
+                app.ui.flush()
+                root.update_idletasks()
+
+            def remove():
+                # The first task is the worst case: every later task is renumbered
+                app.task_listbox.selection_set(0)
+                app._remove_selected()
+                app.ui.flush()
+                root.update_idletasks()
+
+            _record(results, f'gui.refresh_listbox[n={n}]', time_call(refresh, repeat=repeat))
+            _record(results, f'gui.add_task[n={n}]', time_call(add, repeat=repeat))
+            _record(results, f'gui.remove_selected[n={n}]', time_call(remove, repeat=repeat))
+    finally:
+        app._on_close()
+        printer_utils.set_backend(None)
+        logging.disable(logging.NOTSET)
+
+
+def bench_task_store(results: Results, sizes: Sequence[int]) -> None:
+    """Time task store operations at the front of the list, the worst case for a plain list."""
+    for n in sizes:
+        store = task_store.TaskStore()
+        store.add(sample_tasks(n))
+        repeat = max(3, min(20, 10000 // n))
+
+        def insert_remove():
+            store.add(['New task'], position=0)
+            store.remove_at([0])
+
+        _record(results, f'store.insert_remove_front[n={n}]', time_call(insert_remove, 100, repeat))
+        _record(results, f'store.move_front_to_end[n={n}]',
+                time_call(lambda: store.move(0, len(store) - 1), 100, repeat))
+
+
+def bench_receipts(results: Results, count: int) -> None:
+    """Time laying out and encoding one receipt, per ESC/POS mode."""
+    time_str = datetime.now().strftime('%Y-%m-%d %H:%M')
+    runs = iter(range(1000))
+
+    def per_receipt(func: Callable[[str], object]) -> float:
+        # Fresh tasks on every run so cached measurements and bitmaps are not reused
+        def run():
+            for task in tasks:
+                func(task)
+        timings = []
+        for _ in range(3):
+            tasks = sample_tasks(count, f'Run {next(runs)}')
+            timings.append(time_call(run, repeat=1) / count)
+        return statistics.median(timings)
+
+    _record(results, 'receipt.layout', per_receipt(lambda task: receipt_layout.layout_receipt(
+        task, time_str, printer_utils.TASK_FONT, printer_utils.TIME_FONT,
+        printer_utils.RECEIPT_WIDTH_PX, printer_utils.MARGIN_PX)))
+    timestamp = datetime.now()
+    for mode in _modes():
+        backend = EscPosBackend({}, discover_devices=False, mode=mode, logo_path='')
+        _record(results, f'receipt.encode.{mode}',
+                per_receipt(lambda task: backend.encode_receipt(task, timestamp)))
+
+
+def bench_end_to_end(results: Results, count: int, latency: float) -> None:
+    """Measure receipts per second through ``print_batch``, fake printer and emulator."""
+    for mode in _modes():
+        backend = FakePrinterBackend(latency, mode)
+        _record(results, f'e2e.fake.{mode}', _print_rate(backend, BENCH_PRINTER, count), RATE)
+
+    with EscPosEmulator(port=0) as emulator:
+        backend = EscPosBackend({BENCH_PRINTER: emulator.target}, discover_devices=False,
+                                mode=ESCPOS_TEXT, logo_path='')
+        started = time.perf_counter()
+        printed = _print_batch(backend, BENCH_PRINTER, sample_tasks(count, 'Emulated'))
+        emulator.wait_for_receipts(printed, timeout=60)
+        elapsed = time.perf_counter() - started
+        _record(results, f'e2e.emulator.{ESCPOS_TEXT}', len(emulator.receipts) / elapsed, RATE)
+
+
+def _modes() -> List[str]:
+    import raster
+    return [ESCPOS_TEXT, ESCPOS_RASTER] if raster.available() else [ESCPOS_TEXT]
+
+
+def _print_batch(backend: EscPosBackend, printer_name: str, tasks: List[str]) -> int:
+    printer_utils.set_backend(backend)
+    try:
+        results = printer_utils.print_batch(printer_name, tasks)
+    finally:
+        printer_utils.set_backend(None)
+    return sum(result.ok for result in results)
+
+
+def _print_rate(backend: EscPosBackend, printer_name: str, count: int) -> float:
+    started = time.perf_counter()
+    printed = _print_batch(backend, printer_name, sample_tasks(count, 'Printed'))
+    return printed / (time.perf_counter() - started)
+
+
+def compare(results: Results, baseline: Results, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    Return a description of every metric more than ``threshold`` worse than the baseline.
+
+    Times are worse when higher and rates when lower. Metrics missing from
+    either side are not compared.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or base.get('unit') != current['unit'] or not base['value']:
+            continue
+        change = current['value'] / base['value'] - 1
+        worse = change if current['unit'] == SECONDS else -change
+        if worse > threshold:
+            regressions.append(f"{name}: {base['value']:.6g} -> {current['value']:.6g} "
+                               f"{current['unit']} ({change:+.0%})")
+    return regressions
+
+
+def run(quick: bool = False, latency: float = 0.0, gui: bool = True) -> dict:
+    """Run every benchmark and return the report that is written as JSON."""
+    results: Results = {}
+    skipped: Dict[str, str] = {}
+    if gui:
+        bench_startup(results, skipped, 1 if quick else 5)
+        bench_task_list(results, skipped, QUICK_LIST_SIZES if quick else LIST_SIZES)
+    bench_task_store(results, QUICK_LIST_SIZES if quick else LIST_SIZES)
+    bench_receipts(results, 20 if quick else 100)
+    bench_end_to_end(results, QUICK_E2E_TASKS if quick else E2E_TASKS, latency)
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': quick,
+            'latency': latency,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='benchmarks', description="Benchmark Receipt Task Printer.")
+    parser.add_argument('-o', '--output', help="write results as JSON to OUTPUT")
+    parser.add_argument('-b', '--baseline', help="compare with results saved by an earlier --output")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"fractional slowdown reported as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds the fake printer takes per receipt (default: 0)")
+    parser.add_argument('--quick', action='store_true', help="fewer sizes and repetitions")
+    parser.add_argument('--no-gui', action='store_true', help="skip startup and task list benchmarks")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    report = run(args.quick, args.latency, not args.no_gui)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report['results'], baseline['results'], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+ESC/POS command encoding for Receipt Task Printer.
+Builds raw byte streams understood by RONGTA and other ESC/POS thermal printers.
+"""
+
+from typing import List
+
+from receipt_layout import FontSpec, wrap_text
+
+ESC = b'\x1b'
+GS = b'\x1d'
+LF = b'\n'
+
+INIT = ESC + b'@'
+ALIGN_LEFT = ESC + b'a\x00'
+ALIGN_CENTER = ESC + b'a\x01'
+BOLD_ON = ESC + b'E\x01'
+BOLD_OFF = ESC + b'E\x00'
+SIZE_NORMAL = GS + b'!\x00'
+SIZE_DOUBLE = GS + b'!\x11'  # Double width and double height
+
+# Thermal printers ship with a single-byte code page; CP437 is the factory default.
+TEXT_ENCODING = 'cp437'
+
+# 80 mm printers print 72 mm: 576 dots at 203 DPI
+PRINT_WIDTH_DOTS = 576
+# Printer-resident Font A is 12x24 dots; SIZE_DOUBLE doubles both dimensions
+FONT_A = FontSpec('Font A', 24, fixed_width=12)
+FONT_A_DOUBLE = FontSpec('Font A', 48, bold=True, fixed_width=24)
+
+# Lines fed after the timestamp, matching the bottom padding of the GDI layout.
+BOTTOM_FEED_LINES = 5
+
+
+def encode_text(text: str) -> bytes:
+    """Encode text for the printer code page, replacing unsupported characters."""
+    return text.encode(TEXT_ENCODING, errors='replace')
+
+
+def feed(lines: int) -> bytes:
+    """Return the command to print the buffer and feed the given number of lines."""
+    return ESC + b'd' + bytes([max(0, min(lines, 255))])
+
+
+def feed_dots(dots: int) -> bytes:
+    """Return commands to print the buffer and feed paper by ``dots`` motion units (one dot row)."""
+    parts = []
+    while dots > 0:
+        step = min(dots, 255)
+        parts.append(ESC + b'J' + bytes([step]))
+        dots -= step
+    return b''.join(parts)
+
+
+def cut(feed_lines: int = 0) -> bytes:
+    """Return the command to feed the given number of lines and partially cut."""
+    return GS + b'VB' + bytes([max(0, min(feed_lines, 255))])
+
+
+def raster_header(width_bytes: int, height: int, mode: int = 0) -> bytes:
+    """Return the ``GS v 0`` header for a raster image of the given size."""
+    return GS + b'v0' + bytes([mode]) + width_bytes.to_bytes(2, 'little') + height.to_bytes(2, 'little')
+
+
+def encode_receipt(task: str, time_str: str) -> bytes:
+    """Encode a task receipt: large centered task at the top, timestamp below."""
+    # Wrap on word boundaries ourselves; the printer would break mid-word
+    task_lines = wrap_text(task, FONT_A_DOUBLE, PRINT_WIDTH_DOTS)
+    parts: List[bytes] = [
+        INIT,
+        ALIGN_CENTER, SIZE_DOUBLE, BOLD_ON,
+        encode_text('\n'.join(task_lines)), LF,
+        BOLD_OFF, SIZE_NORMAL, ALIGN_LEFT,
+        LF,
+        encode_text(time_str), LF,
+        feed(BOTTOM_FEED_LINES),
+        cut(),
+    ]
+    return b''.join(parts)
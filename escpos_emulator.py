@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+ESC/POS printer emulator for Receipt Task Printer.
+A stand-in for a networked RONGTA printer: listens on TCP (port 9100 by default)
+or reads a capture file, parses the ESC/POS stream and records each cut receipt
+as text, and as a PNG when numpy and Pillow are installed.
+
+The emulator can simulate paper speed, a bounded receive buffer and busy,
+offline and paper-out states, and answers ``DLE EOT`` status requests, so the
+print path can be tested and benchmarked end to end without hardware.
+"""
+
+import argparse
+import logging
+import os
+import select
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import escpos
+from receipt_layout import FontSpec
+
+logger = logging.getLogger(__name__)
+
+DLE = 0x10
+EOT = 0x04
+ESC = 0x1b
+GS = 0x1d
+LF = 0x0a
+
+DEFAULT_PORT = 9100
+DEFAULT_BUFFER_SIZE = 4096  # Bytes of print data the printer holds before it stops reading
+DOTS_PER_MM = 8  # 203 DPI
+LINE_SPACING_DOTS = 6  # Gap under each text line with the default ESC 2 spacing
+
+# Printer states
+ONLINE = 'online'
+BUSY = 'busy'  # Keeps answering status requests but prints nothing until online again
+PAPER_OUT = 'paper-out'  # As busy, and the paper sensor reports paper end
+OFFLINE = 'offline'  # Connections are closed as soon as they are accepted
+STATES = (ONLINE, BUSY, PAPER_OUT, OFFLINE)
+
+# DLE EOT replies: bits 1 and 4 are always set
+_STATUS_FIXED = 0x12
+_STATUS_OFFLINE = 0x08  # n=1: printer offline
+_STATUS_PAPER_STOP = 0x20  # n=2: printing stopped by paper end
+_STATUS_PAPER_END = 0x60  # n=4: paper roll sensor reports paper end
+
+# Commands with a fixed number of parameter bytes, keyed by (prefix, command byte)
+_FIXED_PARAMS = {
+    (ESC, ord('a')): 1, (ESC, ord('E')): 1, (ESC, ord('d')): 1, (ESC, ord('J')): 1,
+    (ESC, ord('!')): 1, (ESC, ord('-')): 1, (ESC, ord('2')): 0, (ESC, ord('3')): 1,
+    (ESC, ord('t')): 1, (ESC, ord('M')): 1, (ESC, ord('@')): 0,
+    (GS, ord('!')): 1, (GS, ord('B')): 1, (GS, ord('L')): 2, (GS, ord('W')): 2,
+}
+
+
+@dataclass
+class EmulatedReceipt:
+    """One receipt, from initialization or the previous cut up to a cut."""
+
+    number: int
+    lines: List[str] = field(default_factory=list)
+    # Printed elements in paper order: ('text', text, align, bold, width, height),
+    # ('feed', dots) or ('image', bitmap)
+    elements: List[tuple] = field(default_factory=list)
+    images: int = 0
+
+    @property
+    def text(self) -> str:
+        """The printed text, one line per printed line, without trailing blank lines."""
+        return '\n'.join(self.lines).rstrip('\n ')
+
+    @property
+    def height_dots(self) -> int:
+        return sum(_element_height(element) for element in self.elements)
+
+
+def _element_height(element: tuple) -> int:
+    if element[0] == 'text':
+        return escpos.FONT_A.height * element[5] + LINE_SPACING_DOTS
+    if element[0] == 'feed':
+        return element[1]
+    return element[1].shape[0]
+
+
+def render_png(receipt: EmulatedReceipt, path: str, width: int = escpos.PRINT_WIDTH_DOTS) -> None:
+    """Draw a receipt as the printer would and save it as a PNG (needs numpy and Pillow)."""
+    import raster
+    canvas = raster.np.zeros((max(1, receipt.height_dots), width), dtype=bool)
+    y = 0
+    for element in receipt.elements:
+        if element[0] == 'text':
+            _, text, align, bold, _, height = element
+            if text:
+                spec = FontSpec(escpos.FONT_A.name, escpos.FONT_A.height * height, bold)
+                glyphs = raster.render_line(text, spec)
+                x = {0: 0, 1: (width - glyphs.shape[1]) // 2, 2: width - glyphs.shape[1]}.get(align, 0)
+                raster.blit(canvas, glyphs, max(0, x), y)
+        elif element[0] == 'image':
+            raster.blit(canvas, element[1], 0, y)
+        y += _element_height(element)
+    raster.Image.fromarray(~canvas).save(path)
+
+
+def _command_length(buf: bytearray, pos: int) -> int:
+    """
+    Bytes in the command or character at ``pos``, counting parameters and
+    image data; 0 while too few bytes have arrived to tell.
+    """
+    byte = buf[pos]
+    available = len(buf) - pos
+    if byte == DLE:
+        return 3
+    if byte not in (ESC, GS):
+        return 1
+    if available < 2:
+        return 0
+    key = (byte, buf[pos + 1])
+    if key == (GS, ord('v')):
+        if available < 8:
+            return 0
+        return 8 + (buf[pos + 4] | buf[pos + 5] << 8) * (buf[pos + 6] | buf[pos + 7] << 8)
+    if key == (GS, ord('V')):
+        if available < 3:
+            return 0
+        return 4 if buf[pos + 2] in (65, 66) else 3
+    return 2 + _FIXED_PARAMS.get(key, 0)
+
+
+class RealTimeScanner:
+    """
+    Finds ``DLE EOT n`` status requests in a stream as it arrives, in any split.
+
+    Commands are framed as ``EscPosParser`` frames them, so parameter bytes and
+    raster image data that happen to contain ``DLE EOT`` are not answered.
+    Image data is skipped by its declared length rather than buffered.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip = 0  # Bytes still to come of a command whose start has been scanned
+
+    def feed(self, data: bytes) -> List[int]:
+        """Return the ``n`` of every status request completed by ``data``."""
+        skipped = min(self._skip, len(data))
+        self._skip -= skipped
+        buf = self._buffer
+        buf += memoryview(data)[skipped:]
+        requests = []
+        pos = 0
+        while pos < len(buf):
+            length = _command_length(buf, pos)
+            if not length:
+                break
+            if len(buf) - pos < length:
+                if buf[pos] == DLE:
+                    break  # Wait for the n of the request
+                self._skip = length - (len(buf) - pos)
+                pos = len(buf)
+                break
+            if buf[pos] == DLE and buf[pos + 1] == EOT:
+                requests.append(buf[pos + 2])
+            pos += length
+        del buf[:pos]
+        return requests
+
+
+class EscPosParser:
+    """
+    Incremental ESC/POS parser: feed it bytes as they arrive, in any split.
+
+    Calls ``on_receipt`` for every cut and ``on_status`` with the ``n`` of each
+    ``DLE EOT n`` request. ``on_dots`` reports paper movement, for speed simulation.
+    """
+
+    def __init__(self, on_receipt: Callable[[EmulatedReceipt], None],
+                 on_status: Optional[Callable[[int], None]] = None,
+                 on_dots: Optional[Callable[[int], None]] = None):
+        self.on_receipt = on_receipt
+        self.on_status = on_status
+        self.on_dots = on_dots
+        self._buffer = bytearray()
+        self._line = bytearray()
+        self._count = 0
+        self._receipt = EmulatedReceipt(1)
+        self._reset_modes()
+
+    def _reset_modes(self) -> None:
+        self.align = 0
+        self.bold = False
+        self.width = 1
+        self.height = 1
+
+    def feed(self, data: bytes) -> None:
+        self._buffer += data
+        pos = 0
+        while pos < len(self._buffer):
+            used = self._parse(pos)
+            if used == 0:
+                break  # Incomplete command; wait for more data
+            pos += used
+        del self._buffer[:pos]
+
+    def _parse(self, pos: int) -> int:
+        """Handle the command or character at ``pos``; return bytes consumed, 0 if incomplete."""
+        buf = self._buffer
+        length = _command_length(buf, pos)
+        if not length or len(buf) - pos < length:
+            return 0
+        byte = buf[pos]
+        if byte == LF:
+            self._print_line()
+        elif byte == DLE:
+            if buf[pos + 1] == EOT and self.on_status is not None:
+                self.on_status(buf[pos + 2])
+        elif byte not in (ESC, GS):
+            if byte >= 0x20:
+                self._line.append(byte)
+        else:
+            self._command(buf, pos, length)
+        return length
+
+    def _command(self, buf: bytearray, pos: int, length: int) -> None:
+        byte, command = buf[pos], chr(buf[pos + 1])
+        arg = buf[pos + 2] if length > 2 else 0
+        if byte == GS and command == 'v':
+            self._raster(bytes(buf[pos + 8:pos + length]), buf[pos + 4] | buf[pos + 5] << 8,
+                         buf[pos + 6] | buf[pos + 7] << 8)
+        elif byte == GS and command == 'V':
+            if length == 4:
+                self._feed(buf[pos + 3] * (escpos.FONT_A.height + LINE_SPACING_DOTS))
+            self._cut()
+        elif byte == ESC and command == '@':
+            self._line.clear()
+            self._reset_modes()
+        elif byte == ESC and command == 'a':
+            self.align = arg % 48 if arg >= 48 else arg
+        elif byte == ESC and command == 'E':
+            self.bold = bool(arg & 1)
+        elif byte == ESC and command == 'd':
+            self._print_line(only_if_pending=True)
+            for _ in range(arg):
+                self._print_line()
+        elif byte == ESC and command == 'J':
+            self._print_line(only_if_pending=True)
+            self._feed(arg)
+        elif byte == GS and command == '!':
+            self.width = (arg >> 4) + 1
+            self.height = (arg & 0x0f) + 1
+
+    def _raster(self, data: bytes, width_bytes: int, rows: int) -> None:
+        self._print_line(only_if_pending=True)
+        import raster  # Only raster receipts need numpy
+        if raster.available():
+            packed = raster.np.frombuffer(data, dtype=raster.np.uint8).reshape(rows, width_bytes)
+            bitmap = raster.np.unpackbits(packed, axis=1).astype(bool)
+        else:
+            bitmap = _ImageSize(rows, width_bytes * 8)
+        self._receipt.elements.append(('image', bitmap))
+        self._receipt.images += 1
+        self._dots(rows)
+
+    def _print_line(self, only_if_pending: bool = False) -> None:
+        if only_if_pending and not self._line:
+            return
+        text = self._line.decode(escpos.TEXT_ENCODING, errors='replace')
+        self._line.clear()
+        self._receipt.lines.append(text)
+        element = ('text', text, self.align, self.bold, self.width, self.height)
+        self._receipt.elements.append(element)
+        self._dots(_element_height(element))
+
+    def _feed(self, dots: int) -> None:
+        if dots:
+            self._receipt.elements.append(('feed', dots))
+            self._dots(dots)
+
+    def _dots(self, dots: int) -> None:
+        if self.on_dots is not None:
+            self.on_dots(dots)
+
+    def _cut(self) -> None:
+        self._print_line(only_if_pending=True)
+        receipt, self._count = self._receipt, self._count + 1
+        self._receipt = EmulatedReceipt(self._count + 1)
+        self.on_receipt(receipt)
+
+
+@dataclass
+class _ImageSize:
+    """Stands in for an image bitmap when numpy is not installed; only the shape is kept."""
+
+    rows: int
+    cols: int
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, self.cols
+
+
+def parse_stream(data: bytes) -> List[EmulatedReceipt]:
+    """Parse a complete ESC/POS stream, such as a capture file, into its cut receipts."""
+    receipts: List[EmulatedReceipt] = []
+    EscPosParser(receipts.append).feed(data)
+    return receipts
+
+
+class EscPosEmulator:
+    """
+    A TCP printer that handles one connection at a time, like the real thing.
+
+    ``paper_speed`` is in mm/s (None prints instantly). Print data is held in a
+    buffer of ``buffer_size`` bytes; while the printer is busy or the buffer is
+    full it stops reading, so the sender sees TCP backpressure.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 output_dir: Optional[str] = None, paper_speed: Optional[float] = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, state: str = ONLINE):
+        if state not in STATES:
+            raise ValueError(f"Unknown printer state: {state}")
+        self.host = host
+        self.port = port
+        self.output_dir = output_dir
+        self.paper_speed = paper_speed
+        self.buffer_size = buffer_size
+        self.state = state
+        self.receipts: List[EmulatedReceipt] = []
+        self.connections = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'EscPosEmulator':
+        """Start listening; ``port`` is updated when it was 0 (any free port)."""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(5)
+        self._sock.settimeout(0.1)
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, name='escpos-emulator', daemon=True)
+        self._thread.start()
+        logger.info("ESC/POS emulator listening on %s:%s", self.host, self.port)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        if self._sock is not None:
+            self._sock.close()
+
+    def __enter__(self) -> 'EscPosEmulator':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def target(self) -> str:
+        """The ``tcp://`` target for ``RECEIPT_PRINTERS`` or ``EscPosBackend``."""
+        return f"tcp://{self.host}:{self.port}"
+
+    def set_state(self, state: str) -> None:
+        if state not in STATES:
+            raise ValueError(f"Unknown printer state: {state}")
+        self.state = state
+        logger.info("Emulated printer is now %s", state)
+
+    def wait_for_receipts(self, count: int, timeout: float = 5.0) -> bool:
+        """Block until ``count`` receipts have been cut; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self.receipts) >= count, timeout)
+
+    def status_byte(self, n: int) -> int:
+        """Return the reply to ``DLE EOT n`` for the current state."""
+        status = _STATUS_FIXED
+        if n == 1 and self.state != ONLINE:
+            status |= _STATUS_OFFLINE
+        elif n == 2 and self.state == PAPER_OUT:
+            status |= _STATUS_PAPER_STOP
+        elif n == 4 and self.state == PAPER_OUT:
+            status |= _STATUS_PAPER_END
+        return status
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            with conn:
+                self.connections += 1
+                if self.state == OFFLINE:
+                    continue
+                try:
+                    self._handle(conn)
+                except OSError as e:
+                    logger.info("Emulator connection ended: %s", e)
+
+    def _handle(self, conn: socket.socket) -> None:
+        """Read into the print buffer, answer status in real time and print at paper speed."""
+        pending = bytearray()
+        closed = False
+        parser = EscPosParser(self._on_receipt, on_dots=self._on_dots)
+        scanner = RealTimeScanner()
+        while not self._stop.is_set() and not (closed and not pending):
+            if self.state == OFFLINE:
+                return
+            can_read = not closed and len(pending) < self.buffer_size
+            readable, _, _ = select.select([conn] if can_read else [], [], [], 0.01)
+            if readable:
+                data = conn.recv(self.buffer_size - len(pending))
+                if not data:
+                    closed = True
+                # Status requests are real-time: answered on arrival, even while busy
+                replies = bytes(self.status_byte(n) for n in scanner.feed(data))
+                if replies:
+                    conn.sendall(replies)  # In one segment, so Nagle does not hold back the later bytes
+                pending += data
+            elif not can_read and self.state != ONLINE:
+                time.sleep(0.01)
+            if pending and self.state == ONLINE:
+                chunk = bytes(pending[:512])
+                del pending[:512]
+                parser.feed(chunk)
+
+    def _on_dots(self, dots: int) -> None:
+        if self.paper_speed:
+            time.sleep(dots / (self.paper_speed * DOTS_PER_MM))
+
+    def _on_receipt(self, receipt: EmulatedReceipt) -> None:
+        with self._cond:
+            receipt.number = len(self.receipts) + 1
+            self.receipts.append(receipt)
+            self._cond.notify_all()
+        if self.output_dir:
+            save_receipt(receipt, self.output_dir)
+
+
+def save_receipt(receipt: EmulatedReceipt, output_dir: str) -> str:
+    """Write a receipt as ``receipt_NNNN.txt`` (and ``.png`` when possible); return the base path."""
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"receipt_{receipt.number:04d}")
+    with open(base + '.txt', 'w', encoding='utf-8') as f:
+        f.write(receipt.text + '\n')
+    import raster
+    if raster.available():
+        render_png(receipt, base + '.png')
+    return base
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='escpos_emulator',
+                                     description="Emulate a networked ESC/POS receipt printer.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--out', help="directory to save receipts as text and PNG")
+    parser.add_argument('--speed', type=float, help="paper speed in mm/s (default: instant)")
+    parser.add_argument('--buffer', type=int, default=DEFAULT_BUFFER_SIZE, help="receive buffer in bytes")
+    parser.add_argument('--state', choices=STATES, default=ONLINE)
+    parser.add_argument('--file', help="parse a capture file instead of listening")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            receipts = parse_stream(f.read())
+        for receipt in receipts:
+            if args.out:
+                save_receipt(receipt, args.out)
+            print(f"--- receipt {receipt.number} ---\n{receipt.text}")
+        return 0
+
+    emulator = EscPosEmulator(args.host, args.port, args.out, args.speed, args.buffer, args.state)
+    emulator.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+    print(f"{len(emulator.receipts)} receipt(s) printed", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,44 +2,84 @@
 """
 Receipt Task Printer - Main Application
 A simple GUI application for printing tasks to RONGTA receipt printers.
+Run with ``--cli`` to print from arguments or stdin without the GUI.
 """
 
+import sys
+
+if __name__ == "__main__" and '--cli' in sys.argv[1:]:
+    # Headless mode is dispatched before tkinter is imported
+    import receipt_cli
+    sys.exit(receipt_cli.main([arg for arg in sys.argv[1:] if arg != '--cli']))
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import logging
-from datetime import datetime
-from typing import List
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
 
-# Add printer_utils import
+import app_logging
+import print_metrics
+import printer_status
 import printer_utils
+import task_import
+from print_journal import JOURNAL_ENV_VAR, PrintJournal
+from print_scheduler import ALL_PRINTERS, FanOutScheduler
+from print_worker import FINISHED, PROGRESS, RETRY, PrintEvent, PrintWorker
+from task_schedule import SCHEDULE_ENV_VAR, ScheduledJob, TaskScheduler, load_schedule
+from task_store import FAILED, TaskStore
+from task_list_view import VirtualListbox
+from ui_updates import UiUpdates
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('receipt_tasks.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+PRINT_POLL_INTERVAL_MS = 100
+PRINTER_SCAN_POLL_MS = 50
+IMPORT_CHUNK_INTERVAL_MS = 1  # Lets the window redraw and handle input between import chunks
+SCHEDULE_MAX_WAIT_MS = 60000  # Longest timer for the next scheduled job, so clock changes and sleep are caught up
+
 
 class ReceiptTaskApp:
     """Main application class for the Receipt Task Printer."""
     
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, journal: Optional[PrintJournal] = None):
         self.root = root
         self.root.title("Receipt Task Printer")
         self.root.geometry("500x600")
         self.root.resizable(True, True)
         
-        # Initialize task storage
-        self.tasks: List[str] = []
+        # Initialize task storage: task IDs are assigned by the journal when there is one
+        self.tasks = TaskStore()
+        self.journal = journal
+        
+        # Printing runs on a background worker so the window stays responsive
+        self.print_worker = PrintWorker(journal)
+        self.print_worker.start()
+        self._pause_message: Optional[str] = None
         
         # Create GUI components
         self._create_widgets()
         self._setup_layout()
+        # Model changes are drawn once per frame, however many arrive
+        self.ui = UiUpdates(self.root, self._refresh_listbox, self._update_ui_state, self.status_var.set)
+        self._replay_journal()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after(PRINT_POLL_INTERVAL_MS, self._poll_print_worker)
+        
+        # Printer enumeration can be slow, so it runs while the window is shown
+        self._printer_scan: Optional[Future] = None
+        self._printer_scan_refresh = False
+        self._scan_printers()
+        
+        # Scheduled printing wakes the loop once, when the next job is due
+        self.schedule = TaskScheduler()
+        self._schedule_timer: Optional[str] = None
+        self._load_schedule()
         
         logger.info("Application initialized successfully")
     
@@ -65,8 +105,12 @@ class ReceiptTaskApp:
             state="readonly",
             width=40
         )
-        self._populate_printers()
         self.printer_combo.bind('<<ComboboxSelected>>', self._on_printer_selected)
+        self.rescan_button = ttk.Button(
+            self.printer_frame,
+            text="Rescan",
+            command=lambda: self._scan_printers(refresh=True)
+        )
         
         # Task entry section
         self.entry_frame = ttk.LabelFrame(self.main_frame, text="Add New Task", padding="10")
@@ -77,6 +121,7 @@ class ReceiptTaskApp:
             font=("Arial", 10)
         )
         self.task_entry.bind('<Return>', self._add_task)
+        self.task_entry.bind('<<Paste>>', self._on_paste)
         
         self.add_button = ttk.Button(
             self.entry_frame, 
@@ -84,6 +129,12 @@ class ReceiptTaskApp:
             command=self._add_task
         )
         
+        self.import_button = ttk.Button(
+            self.entry_frame,
+            text="Import...",
+            command=self._import_file
+        )
+        
         # Task list section
         self.list_frame = ttk.LabelFrame(self.main_frame, text="Task List", padding="10")
         
@@ -95,15 +146,20 @@ class ReceiptTaskApp:
             height=15,
             width=60,
             font=("Arial", 10),
-            selectmode=tk.SINGLE
+            selectmode=tk.EXTENDED
         )
         
         self.scrollbar = ttk.Scrollbar(
             self.listbox_frame, 
-            orient=tk.VERTICAL, 
-            command=self.task_listbox.yview
+            orient=tk.VERTICAL
+        )
+        # Only the rows on screen are kept in the listbox; the view maps them to tasks
+        self.task_view = VirtualListbox(
+            self.task_listbox,
+            self.scrollbar,
+            lambda: len(self.tasks),
+            self._row_text
         )
-        self.task_listbox.configure(yscrollcommand=self.scrollbar.set)
         
         # Control buttons
         self.button_frame = ttk.Frame(self.main_frame)
@@ -127,6 +183,20 @@ class ReceiptTaskApp:
             command=self._remove_selected
         )
         
+        self.retry_button = ttk.Button(
+            self.button_frame,
+            text="Retry Failed",
+            command=self._retry_failed,
+            state=tk.DISABLED
+        )
+        
+        self.cancel_button = ttk.Button(
+            self.button_frame,
+            text="Cancel Printing",
+            command=self._cancel_printing,
+            state=tk.DISABLED
+        )
+        
         # Status bar
         self.status_var = tk.StringVar()
         self.status_var.set("Ready - Enter tasks to begin")
@@ -152,6 +222,7 @@ class ReceiptTaskApp:
         self.printer_frame.grid(row=1, column=0, sticky="ew", pady=(0, 5))
         self.printer_label.grid(row=0, column=0, sticky="w")
         self.printer_combo.grid(row=0, column=1, sticky="ew", padx=(5, 0))
+        self.rescan_button.grid(row=0, column=2, padx=(5, 0))
         self.printer_frame.columnconfigure(1, weight=1)
         
         # Entry frame
@@ -160,6 +231,7 @@ class ReceiptTaskApp:
         
         self.task_entry.grid(row=0, column=0, sticky="ew", padx=(0, 5))
         self.add_button.grid(row=0, column=1)
+        self.import_button.grid(row=0, column=2, padx=(5, 0))
         
         # List frame
         self.list_frame.grid(row=3, column=0, sticky="nsew", pady=(0, 10))
@@ -179,8 +251,10 @@ class ReceiptTaskApp:
         self.button_frame.grid(row=4, column=0, pady=(0, 10))
         
         self.print_button.grid(row=0, column=0, padx=(0, 5))
-        self.clear_button.grid(row=0, column=1, padx=(0, 5))
-        self.remove_button.grid(row=0, column=2)
+        self.retry_button.grid(row=0, column=1, padx=(0, 5))
+        self.clear_button.grid(row=0, column=2, padx=(0, 5))
+        self.remove_button.grid(row=0, column=3, padx=(0, 5))
+        self.cancel_button.grid(row=0, column=4)
         
         # Status bar
         self.status_bar.grid(row=5, column=0, sticky="ew")
@@ -193,40 +267,127 @@ class ReceiptTaskApp:
             messagebox.showwarning("Empty Task", "Please enter a task description.")
             return
         
-        if len(task_text) > 100:
-            messagebox.showwarning("Task Too Long", "Task description must be 100 characters or less.")
-            return
-        
         # Add task to list
-        self.tasks.append(task_text)
-        self.task_listbox.insert(tk.END, f"{len(self.tasks)}. {task_text}")
+        self._store_tasks([task_text])
+        self.ui.refresh(len(self.tasks) - 1)
         
         # Clear entry and update UI
         self.task_entry.delete(0, tk.END)
-        self._update_ui_state()
+        self.ui.update_state()
         
-        logger.info(f"Task added: {task_text}")
-        self.status_var.set(f"Task added. Total tasks: {len(self.tasks)}")
+        logger.info("Task added: %s", task_text)
+        self.ui.status(f"Task added. Total tasks: {len(self.tasks)}")
+    
+    def _on_paste(self, event=None):
+        """Paste several lines as one task each; a single line pastes into the entry as usual."""
+        try:
+            text = self.root.clipboard_get()
+        except tk.TclError:
+            return None
+        if '\n' not in text.strip():
+            return None
+        self._import_tasks(task_import.read_tasks(text.splitlines()), "the clipboard")
+        return "break"
+
+    def _import_file(self):
+        """Import tasks from a text file, one per line, or from a column of a CSV file."""
+        path = filedialog.askopenfilename(
+            title="Import Tasks",
+            filetypes=[("Text and CSV files", "*.txt *.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        column = header = None
+        if task_import.is_csv(path):
+            answer = simpledialog.askstring(
+                "CSV Column", "Column with the tasks (number or header name):",
+                initialvalue="1", parent=self.root
+            )
+            if not answer or not answer.strip():
+                return
+            column = task_import.parse_column(answer)
+            if isinstance(column, int):
+                header = self._ask_csv_header(path)
+        source = None
+        try:
+            source = task_import.open_tasks(path)
+            tasks = task_import.file_tasks(source, path, column, header)
+        except (OSError, ValueError) as e:
+            if source is not None:
+                source.close()
+            logger.error("Failed to import %s: %s", path, e)
+            messagebox.showerror("Import Failed", f"Cannot import {os.path.basename(path)}: {e}")
+            return
+        self._import_tasks(tasks, os.path.basename(path), source)
+
+    def _ask_csv_header(self, path: str) -> bool:
+        """Ask whether a CSV file's first row is a header, suggesting what the file looks like."""
+        try:
+            detected = task_import.file_has_header(path)
+        except OSError:
+            detected = False  # The import reports the error
+        return messagebox.askyesno(
+            "CSV Header", "Does the first row hold column names? If so it is not imported as a task.",
+            default=messagebox.YES if detected else messagebox.NO, parent=self.root
+        )
+
+    def _import_tasks(self, tasks, source_name: str, source=None):
+        """Add tasks from an iterable in chunks, one chunk per turn of the Tk loop."""
+        self.import_button.config(state=tk.DISABLED)
+        self.ui.status(f"Importing tasks from {source_name}...")
+        chunks = task_import.chunked(tasks, task_import.IMPORT_CHUNK_SIZE)
+        self._import_chunk(chunks, source_name, source, 0)
+
+    def _import_chunk(self, chunks, source_name: str, source, imported: int):
+        """Add the next chunk of an import with one list update, one log line and one status update."""
+        error = None
+        try:
+            chunk = next(chunks, None)
+        except Exception as e:  # Malformed CSV or a read error part way through
+            chunk, error = None, e
+        if chunk is None:
+            if source is not None:
+                source.close()
+            self.import_button.config(state=tk.NORMAL)
+            if error is not None:
+                logger.error("Import from %s stopped after %d task(s): %s", source_name, imported, error)
+                messagebox.showerror("Import Failed", f"Import from {source_name} stopped after "
+                                                      f"{imported} task(s): {error}")
+            self.ui.status(f"Imported {imported} task(s) from {source_name}. "
+                           f"Total tasks: {len(self.tasks)}")
+            return
+        start = len(self.tasks)
+        self._store_tasks(chunk)
+        self.ui.refresh(start)
+        self.ui.update_state()
+        imported += len(chunk)
+        logger.info("Imported %d task(s) from %s (%d so far)", len(chunk), source_name, imported)
+        self.ui.status(f"Importing tasks from {source_name}... {imported} so far")
+        self.root.after(IMPORT_CHUNK_INTERVAL_MS, self._import_chunk, chunks, source_name, source, imported)
     
     def _remove_selected(self):
-        """Remove the selected task from the list."""
-        selection = self.task_listbox.curselection()
+        """Remove the selected tasks from the list."""
+        selection = self.task_view.selection()
         
         if not selection:
             messagebox.showinfo("No Selection", "Please select a task to remove.")
             return
         
-        index = selection[0]
-        
-        # Remove from internal list and listbox
-        removed_task = self.tasks.pop(index)
-        self.task_listbox.delete(index)
+        # Remove from the task store and the journal
+        removed = self.tasks.remove_at(selection)
+        if self.journal is not None:
+            self.journal.remove([task.id for task in removed])
         
-        # Refresh listbox display
-        self._refresh_listbox()
+        # Redraw only the rows from the first removed one down, to renumber them
+        self.ui.refresh(min(selection))
+        self.ui.update_state()
         
-        logger.info(f"Task removed: {removed_task}")
-        self.status_var.set(f"Task removed. Total tasks: {len(self.tasks)}")
+        if len(removed) == 1:
+            logger.info("Task removed: %s", removed[0].text)
+            self.ui.status(f"Task removed. Total tasks: {len(self.tasks)}")
+        else:
+            logger.info("%d tasks removed", len(removed))
+            self.ui.status(f"{len(removed)} tasks removed. Total tasks: {len(self.tasks)}")
     
     def _clear_all(self):
         """Clear all tasks from the list."""
@@ -240,18 +401,28 @@ class ReceiptTaskApp:
         )
         
         if result:
-            self.tasks.clear()
-            self.task_listbox.delete(0, tk.END)
-            self._update_ui_state()
+            removed_ids = self.tasks.clear()
+            if self.journal is not None:
+                self.journal.remove(removed_ids)
+            self.ui.refresh()
+            self.ui.update_state()
             
             logger.info("All tasks cleared")
-            self.status_var.set("All tasks cleared")
+            self.ui.status("All tasks cleared")
     
-    def _refresh_listbox(self):
-        """Refresh the listbox display with current task numbers."""
-        self.task_listbox.delete(0, tk.END)
-        for i, task in enumerate(self.tasks, 1):
-            self.task_listbox.insert(tk.END, f"{i}. {task}")
+    def _refresh_listbox(self, start: int = 0):
+        """Redraw the visible rows from task ``start`` on, with task numbers and failure marks."""
+        self.task_view.refresh(start)
+
+    def _row_text(self, index: int) -> str:
+        task = self.tasks.task_at(index)
+        mark = " [failed]" if task.status == FAILED else ""
+        return f"{index + 1}. {task.text}{mark}"
+
+    def _store_tasks(self, tasks: List[str]) -> List[int]:
+        """Add new tasks to the end of the list, recording them in the journal when there is one."""
+        task_ids = self.journal.add(tasks) if self.journal is not None else None
+        return self.tasks.add(tasks, task_ids)
     
     def _update_ui_state(self):
         """Update UI state based on current task count."""
@@ -263,30 +434,79 @@ class ReceiptTaskApp:
             self.print_button.config(state=tk.DISABLED)
             self.clear_button.config(state=tk.DISABLED)
             self.remove_button.config(state=tk.DISABLED)
+        self.retry_button.config(state=tk.NORMAL if self.tasks.count(FAILED) else tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL if self.print_worker.busy else tk.DISABLED)
     
-    def _populate_printers(self):
-        """Populate the printer dropdown with available printers."""
+    def _scan_printers(self, refresh: bool = False):
+        """Enumerate printers on a background thread and populate the dropdown when done."""
+        if self._printer_scan is not None and not self._printer_scan.done():
+            return
+        self.rescan_button.config(state=tk.DISABLED)
+        if refresh:
+            self.ui.status("Searching for printers...")
+        scan: Future = Future()
+        
+        def run():
+            try:
+                scan.set_result(self._enumerate_printers(refresh))
+            except Exception as e:
+                scan.set_exception(e)
+        
+        # Daemon thread: a hung network enumeration must not keep the app alive
+        threading.Thread(target=run, name='printer-scan', daemon=True).start()
+        self._printer_scan = scan
+        self._printer_scan_refresh = refresh
+        self.root.after(PRINTER_SCAN_POLL_MS, self._check_printer_scan)
+
+    @staticmethod
+    def _enumerate_printers(refresh: bool) -> Tuple[List[str], Optional[str]]:
+        """Return available printers and the RONGTA printer among them (worker thread)."""
+        printers = printer_utils.list_printers(refresh=refresh)
+        return printers, printer_utils.find_rongta_printer(printers)
+
+    def _check_printer_scan(self):
+        """Apply a finished printer scan, or check again shortly."""
+        if not self._printer_scan.done():
+            self.root.after(PRINTER_SCAN_POLL_MS, self._check_printer_scan)
+            return
+        self.rescan_button.config(state=tk.NORMAL)
         try:
-            printers = printer_utils.list_printers()
-            self.printer_combo['values'] = printers
-            rongta = printer_utils.find_rongta_printer()
+            printers, rongta = self._printer_scan.result()
+        except Exception as e:
+            logger.error("Failed to list printers: %s", e)
+            self.printer_combo['values'] = []
+            self.printer_var.set("")
+            messagebox.showerror("Printer Error", f"Could not list printers: {e}")
+            return
+        self._populate_printers(printers, rongta)
+        logger.info("Found %s printer(s)", len(printers))
+        if self._printer_scan_refresh:
+            self.ui.status(f"Found {len(printers)} printer(s)")
+
+    def _populate_printers(self, printers: List[str], rongta: Optional[str]):
+        """Populate the printer dropdown, keeping the current choice if it is still available."""
+        # Several RONGTA units can share jobs through the scheduler
+        pool = printer_utils.find_rongta_printers(printers)
+        if self.print_worker.scheduler is not None:
+            self.print_worker.scheduler.update_printers(pool)
+        elif len(pool) > 1:
+            self.print_worker.scheduler = FanOutScheduler(pool)
+        if len(pool) > 1:
+            printers = printers + [ALL_PRINTERS]
+        self.printer_combo['values'] = printers
+        if self.printer_var.get() not in printers:
             if rongta:
                 self.printer_var.set(rongta)
             elif printers:
                 self.printer_var.set(printers[0])
             else:
                 self.printer_var.set("")
-        except Exception as e:
-            logger.error(f"Failed to list printers: {e}")
-            self.printer_combo['values'] = []
-            self.printer_var.set("")
-            messagebox.showerror("Printer Error", f"Could not list printers: {e}")
 
     def _on_printer_selected(self, event=None):
         """Handle printer selection change."""
         selected = self.printer_var.get()
-        logger.info(f"Printer selected: {selected}")
-        self.status_var.set(f"Printer selected: {selected}")
+        logger.info("Printer selected: %s", selected)
+        self.ui.status(f"Printer selected: {selected}")
     
     def _print_tasks(self):
         """Print all tasks to the selected printer."""
@@ -297,30 +517,192 @@ class ReceiptTaskApp:
         if not self.tasks:
             messagebox.showinfo("No Tasks", "There are no tasks to print.")
             return
-        errors = []
-        for i, task in enumerate(self.tasks, 1):
-            try:
-                printer_utils.print_task(printer_name, task, datetime.now())
-            except Exception as e:
-                logger.error(f"Error printing task {i}: {e}")
-                errors.append((i, str(e)))
+        self._submit_tasks(printer_name, self.tasks.ids())
+
+    def _retry_failed(self):
+        """Print again only the tasks whose last attempt failed."""
+        printer_name = self.printer_var.get()
+        if not printer_name:
+            messagebox.showerror("No Printer", "Please select a printer before printing.")
+            return
+        failed_ids = self.tasks.ids_with_status(FAILED)
+        if not failed_ids:
+            messagebox.showinfo("No Failed Tasks", "There are no failed tasks to retry.")
+            return
+        self._submit_tasks(printer_name, failed_ids)
+
+    def _submit_tasks(self, printer_name: str, task_ids: List[int]):
+        """Move the given tasks from the list into a print job."""
+        # Submitted tasks leave the list; unprinted ones come back when the job ends
+        selected = self.tasks.take(task_ids, printer_name)
+        self.print_worker.submit(printer_name, [task.text for task in selected],
+                                 [task.id for task in selected])
+        self.ui.refresh()
+        self.ui.update_state()
+        self.ui.status(f"Printing {len(selected)} task(s)...")
+
+    def _cancel_printing(self):
+        """Cancel the running print job and any queued ones."""
+        if self.print_worker.cancel_all():
+            self.ui.status("Cancelling printing...")
+
+    def _poll_print_worker(self):
+        """Apply progress reported by the print worker, then poll again."""
+        for event in self.print_worker.poll_events():
+            if event.kind == PROGRESS:
+                self.ui.status(f"Printing task {event.done} of {event.total}...")
+            elif event.kind == RETRY:
+                self.ui.status(
+                    f"{len(event.results)} task(s) failed; retrying in {event.delay:g} s..."
+                )
+            elif event.kind == FINISHED:
+                self._on_print_finished(event)
+        self._show_printer_pause()
+        self.root.after(PRINT_POLL_INTERVAL_MS, self._poll_print_worker)
+
+    def _show_printer_pause(self):
+        """Say in the status bar why printing is paused, and when it resumes."""
+        paused = printer_status.board.not_ready() if self.print_worker.busy else {}
+        if paused:
+            causes = "; ".join(f"{name}: {status}" for name, status in sorted(paused.items()))
+            message = f"Printing paused - {causes}. Printing resumes when the printer is ready."
+        else:
+            message = None
+        if message == self._pause_message:
+            return
+        if message is not None:
+            self.ui.status(message)
+        elif self.print_worker.busy:
+            self.ui.status("Printer ready, printing resumed...")
+        self._pause_message = message
+
+    def _on_print_finished(self, event: PrintEvent):
+        """Report a finished print job; printed tasks are done, the rest return to the list."""
+        job = event.job
+        errors = [(result.index, result.error) for result in event.results if not result.ok]
+        if not job.cancelled:
+            # Without a cancel, a task missing from the results was dropped by a batch that stopped early
+            attempted = {result.index for result in event.results}
+            errors += [(i, "Not attempted: the print job stopped early")
+                       for i in range(1, len(job.tasks) + 1) if i not in attempted]
+        for i, error in errors:
+            logger.error("Error printing task %s: %s", i, error)
+        printed = {result.index for result in event.results if result.ok}
+        unprinted = [i for i in range(1, len(job.tasks) + 1) if i not in printed]
+        self.tasks.remove(job.task_ids[i - 1] for i in printed)
+        # Unprinted tasks go back to the front, ahead of tasks added meanwhile
+        self.tasks.restore([job.task_ids[i - 1] for i in unprinted])
+        self.tasks.set_status((job.task_ids[i - 1] for i, _ in errors), FAILED)
+        self.ui.refresh()
         if errors:
-            msg = f"{len(errors)} task(s) failed to print. See log for details."
+            failed = ", ".join(str(i) for i, _ in errors)
+            msg = (f"{len(errors)} task(s) failed to print (#{failed}). "
+                   f"{len(printed)} printed. See log for details.")
             messagebox.showerror("Print Error", msg)
-            self.status_var.set(msg)
+            self.ui.status(msg + self._metrics_summary(job.printer_name))
+        elif unprinted:
+            logger.info("Print job %s cancelled; %s task(s) returned to the list", job.job_id, len(unprinted))
+            self.ui.status(
+                f"Printing cancelled. {len(printed)} printed, {len(unprinted)} returned to the list."
+                + self._metrics_summary(job.printer_name)
+            )
         else:
-            messagebox.showinfo("Print Complete", f"All {len(self.tasks)} tasks printed successfully.")
-            self.status_var.set(f"All {len(self.tasks)} tasks printed.")
-            self.tasks.clear()
-            self.task_listbox.delete(0, tk.END)
-            self._update_ui_state()
+            messagebox.showinfo("Print Complete", f"All {len(job.tasks)} tasks printed successfully.")
+            self.ui.status(f"All {len(job.tasks)} tasks printed." + self._metrics_summary(job.printer_name))
+        self.ui.update_state()
+
+    @staticmethod
+    def _metrics_summary(printer_name: str) -> str:
+        """Phase timings to append to the status bar, when print metrics are enabled."""
+        metrics = print_metrics.metrics
+        if not metrics.enabled:
+            return ""
+        names = metrics.printers() if printer_name == ALL_PRINTERS else [printer_name]
+        return "".join(f" | {metrics.summary(name)}" for name in names)
+
+    def _load_schedule(self):
+        """Schedule the jobs in the file named by RECEIPT_SCHEDULE, if any."""
+        path = os.environ.get(SCHEDULE_ENV_VAR)
+        if not path:
+            return
+        try:
+            load_schedule(path, self.schedule)
+        except (OSError, ValueError) as e:
+            logger.error("Could not load schedule %s: %s", path, e)
+            messagebox.showerror("Schedule Error", f"Could not load schedule {path}:\n{e}")
+            return
+        self._arm_schedule()
+        if self.schedule:
+            job = self.schedule.jobs()[0]
+            due = time.strftime('%Y-%m-%d %H:%M', time.localtime(self.schedule.due_time(job.id)))
+            self.ui.status(f"{len(self.schedule)} scheduled job(s); next: {job.name} at {due}")
+
+    def _arm_schedule(self):
+        """Set the one timer that runs the next due job; call after the schedule changes."""
+        if self._schedule_timer is not None:
+            self.root.after_cancel(self._schedule_timer)
+            self._schedule_timer = None
+        due = self.schedule.next_due()
+        if due is None:
+            return
+        delay_ms = min(max(0, int((due - time.time()) * 1000)), SCHEDULE_MAX_WAIT_MS)
+        self._schedule_timer = self.root.after(delay_ms, self._run_schedule)
+
+    def _run_schedule(self):
+        """Print the jobs that are due, then wait for the next one."""
+        self._schedule_timer = None
+        for job in self.schedule.pop_due():
+            self._print_scheduled(job)
+        self._arm_schedule()
+
+    def _print_scheduled(self, job: ScheduledJob):
+        """Add a due job's tasks to the list and print them, to its printer or the selected one."""
+        task_ids = self._store_tasks(list(job.tasks))
+        self.ui.refresh(len(self.tasks) - len(task_ids))
+        printer_name = job.printer or self.printer_var.get()
+        logger.info("Scheduled job %s is due: %d task(s) for %s", job.name, len(task_ids), printer_name or "no printer")
+        if not printer_name:
+            self.ui.update_state()
+            self.ui.status(f"{job.name}: {len(task_ids)} task(s) added; select a printer to print them")
+            return
+        self._submit_tasks(printer_name, task_ids)
+
+    def _replay_journal(self):
+        """Restore tasks that were not printed before the application last exited."""
+        if self.journal is None:
+            return
+        unprinted = self.journal.unprinted()
+        if not unprinted:
+            return
+        self.tasks.add([task for _, task in unprinted], [task_id for task_id, _ in unprinted])
+        self.ui.refresh()
+        self.ui.update_state()
+        logger.info("Restored %s unprinted task(s) from %s", len(unprinted), self.journal.path)
+        self.ui.status(f"Restored {len(unprinted)} unprinted task(s) from the last session")
+
+    def _on_close(self):
+        """Stop the print worker and close the window."""
+        if self.print_worker.busy and not messagebox.askyesno(
+            "Printing In Progress", "Printing is still in progress. Cancel it and exit?"
+        ):
+            return
+        self.print_worker.stop(timeout=5)
+        self.ui.cancel()
+        if self.print_worker.scheduler is not None:
+            self.print_worker.scheduler.close(timeout=5)
+        printer_utils.close_backend()
+        if self.journal is not None:
+            self.journal.close()
+        self.root.destroy()
 
 
 def main():
     """Main entry point for the application."""
+    app_logging.setup_logging()
     try:
         root = tk.Tk()
-        app = ReceiptTaskApp(root)
+        journal_path = os.environ.get(JOURNAL_ENV_VAR)
+        app = ReceiptTaskApp(root, PrintJournal(journal_path) if journal_path else None)
         
         # Set focus to task entry
         app.task_entry.focus()
@@ -329,9 +711,11 @@ def main():
         root.mainloop()
         
     except Exception as e:
-        logger.error(f"Application failed to start: {e}")
+        logger.error("Application failed to start: %s", e)
         messagebox.showerror("Error", f"Failed to start application: {e}")
 
 
 if __name__ == "__main__":
+    # Raster batches render in worker processes; needed for frozen Windows builds
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
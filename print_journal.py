@@ -0,0 +1,196 @@
+"""
+Durable print journal for Receipt Task Printer.
+Records every task as queued, printed or failed in SQLite (WAL mode) so work in
+progress survives a crash, and only unprinted tasks are restored on restart.
+
+Writes are group committed: callers append to an in-memory log and return
+immediately, and a writer thread commits everything accumulated in one
+transaction every ``COMMIT_INTERVAL`` seconds. A crash can therefore lose at
+most the last interval of updates; at worst a receipt printed just before the
+crash is offered again. Updates in a commit that fails are kept and written
+with the next one.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_ENV_VAR = 'RECEIPT_JOURNAL'  # Path of the journal database; unset disables journaling
+COMMIT_INTERVAL = 0.05  # Seconds of updates grouped into one commit
+
+QUEUED = 'queued'
+PRINTED = 'printed'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    task TEXT NOT NULL,
+    state TEXT NOT NULL,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state);
+"""
+
+_INSERT = "INSERT INTO tasks (id, task, state, updated) VALUES (?, ?, '" + QUEUED + "', ?)"
+_UPDATE = "UPDATE tasks SET state = ?, error = ?, updated = ? WHERE id = ?"
+_DELETE = "DELETE FROM tasks WHERE id = ?"
+
+
+class PrintJournal:
+    """
+    Append-mostly task journal with group commit.
+
+    Task IDs are assigned here, synchronously, so callers can refer to a task
+    before its insert has been committed. All methods are thread safe.
+    """
+
+    def __init__(self, path: str, commit_interval: float = COMMIT_INTERVAL):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.commits = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL never corrupts the database; a power cut may drop the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Printed tasks are never replayed, so they are dropped when the journal is reopened
+        self._conn.execute("DELETE FROM tasks WHERE state = ?", (PRINTED,))
+        last_id = self._conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0]
+        self._next_id = (last_id or 0) + 1
+        self._ops: List[Tuple[str, tuple]] = []
+        self._written = 0  # Operations handed to the writer
+        self._committed = 0  # Operations known to be committed
+        self._attempts = 0  # Commits tried, successful or not
+        self._error: Optional[sqlite3.Error] = None  # Why the last commit failed
+        self._closed = False
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._db_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='print-journal', daemon=True)
+        self._thread.start()
+
+    def add(self, tasks: Sequence[str]) -> List[int]:
+        """Record tasks as queued and return their IDs."""
+        now = time.time()
+        with self._cond:
+            ids = list(range(self._next_id, self._next_id + len(tasks)))
+            self._next_id += len(tasks)
+            self._append([(_INSERT, (task_id, task, now)) for task_id, task in zip(ids, tasks)])
+        return ids
+
+    def mark_printed(self, task_id: int) -> None:
+        self.mark(task_id, None)
+
+    def mark_failed(self, task_id: int, error: str) -> None:
+        self.mark(task_id, error)
+
+    def mark(self, task_id: int, error: Optional[str]) -> None:
+        """Record a print result: printed when ``error`` is None, failed otherwise."""
+        state = PRINTED if error is None else FAILED
+        with self._cond:
+            self._append([(_UPDATE, (state, error, time.time(), task_id))])
+
+    def remove(self, task_ids: Sequence[int]) -> None:
+        """Forget tasks the user removed; they will not be replayed."""
+        with self._cond:
+            self._append([(_DELETE, (task_id,)) for task_id in task_ids])
+
+    def unprinted(self) -> List[Tuple[int, str]]:
+        """Return ``(id, task)`` for every queued or failed task, oldest first."""
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT id, task FROM tasks WHERE state != ? ORDER BY id", (PRINTED,)
+            ).fetchall()
+        return [(task_id, task) for task_id, task in rows]
+
+    def flush(self) -> None:
+        """
+        Block until every update made so far is committed.
+
+        Raises the sqlite3.Error if a commit fails meanwhile; the updates are
+        kept, so a later flush tries them again.
+        """
+        with self._cond:
+            target = self._written
+            if self._committed < target:
+                self._flush_requested = True
+                self._cond.notify_all()
+            attempts = self._attempts
+            while self._committed < target and self._thread.is_alive():
+                if self._attempts != attempts and self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def close(self) -> None:
+        """Commit outstanding updates and close the database."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._conn.close()
+
+    def _append(self, ops: List[Tuple[str, tuple]]) -> None:
+        if self._closed:
+            raise RuntimeError("Print journal is closed")
+        self._ops.extend(ops)
+        self._written += len(ops)
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ops and not self._closed:
+                    self._cond.wait()
+                # Let further updates pile up so they share one commit
+                deadline = time.monotonic() + self.commit_interval
+                while not self._closed and not self._flush_requested:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flush_requested = False
+                ops, self._ops = self._ops, []
+                closing = self._closed
+                target = self._written
+            # Callers keep appending while the transaction is written
+            error = None
+            if ops:
+                with self._db_lock:
+                    error = self._commit(ops)
+            with self._cond:
+                self._attempts += 1
+                self._error = error
+                if error is None:
+                    self._committed = target
+                else:
+                    # Nothing was written; keep the updates, ahead of newer ones, for the next commit
+                    self._ops[:0] = ops
+                self._cond.notify_all()
+            if closing:
+                if error is not None:
+                    logger.error("Closed print journal with %s update(s) not written", len(ops))
+                return
+
+    def _commit(self, ops: List[Tuple[str, tuple]]) -> Optional[sqlite3.Error]:
+        """Write ``ops`` in one transaction; returns the error if it was rolled back."""
+        try:
+            self._conn.execute("BEGIN")
+            for sql, params in ops:
+                self._conn.execute(sql, params)
+            self._conn.execute("COMMIT")
+            self.commits += 1
+            return None
+        except sqlite3.Error as e:
+            logger.error("Failed to write print journal: %s", e)
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            return e
@@ -0,0 +1,241 @@
+"""
+Print timing metrics for Receipt Task Printer.
+Records how long each phase of printing takes on each printer, the bytes sent
+and the receipts printed or failed, aggregated into latency histograms.
+
+Metrics are reported as a one-line summary per printer (status bar and
+``receipt_cli --stats``) and in the Prometheus text format, written to a file
+after every job so a node exporter textfile collector can pick them up.
+
+Metrics are off unless ``RECEIPT_METRICS`` or ``RECEIPT_METRICS_FILE`` is set;
+timing a phase then costs one attribute check and returns a shared no-op timer.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENV_VAR = 'RECEIPT_METRICS'  # Any non-empty value enables metrics
+METRICS_FILE_ENV_VAR = 'RECEIPT_METRICS_FILE'  # Prometheus text file; setting it enables metrics
+
+# Phases of printing, in the order they happen
+OPEN = 'open'  # OpenPrinter, or opening the device, file or socket
+DC = 'dc'  # Creating the GDI device context and fonts
+RENDER = 'render'  # Drawing one receipt, or waiting for it to be encoded
+SEND = 'send'  # Writing one receipt to the printer
+SPOOL = 'spool'  # EndDoc handing the document to the spooler
+JOB = 'job'  # One whole print_batch call
+PHASES = (OPEN, DC, RENDER, SEND, SPOOL, JOB)
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds, as Prometheus exposes them."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the ``q`` quantile (0 when empty)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class _Timer:
+    __slots__ = ('metrics', 'printer', 'phase', 'started')
+
+    def __init__(self, metrics: 'PrintMetrics', printer: str, phase: str):
+        self.metrics = metrics
+        self.printer = printer
+        self.phase = phase
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.printer, self.phase, time.perf_counter() - self.started)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class PrintMetrics:
+    """
+    Per-printer phase latencies, bytes sent and receipt outcomes. Thread safe.
+
+    ``path`` is where ``export`` writes the Prometheus text; None keeps the
+    metrics in memory only.
+    """
+
+    def __init__(self, enabled: bool = False, path: Optional[str] = None):
+        self.enabled = enabled or bool(path)
+        self.path = path
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._bytes: Dict[str, int] = {}
+        self._receipts: Dict[Tuple[str, bool], int] = {}
+
+    @classmethod
+    def from_environment(cls) -> 'PrintMetrics':
+        path = os.environ.get(METRICS_FILE_ENV_VAR) or None
+        return cls(bool(os.environ.get(METRICS_ENV_VAR)), path)
+
+    def enable(self, path: Optional[str] = None) -> None:
+        self.enabled = True
+        if path:
+            self.path = path
+
+    def time(self, printer: str, phase: str):
+        """Return a context manager that records the time spent in its block."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, printer, phase)
+
+    def observe(self, printer: str, phase: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._latency.get((printer, phase))
+            if histogram is None:
+                histogram = self._latency[(printer, phase)] = Histogram()
+            histogram.observe(seconds)
+
+    def add_bytes(self, printer: str, nbytes: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._bytes[printer] = self._bytes.get(printer, 0) + nbytes
+
+    def count_results(self, printer: str, oks: Iterable[bool]) -> None:
+        """Count receipts printed (True) and failed (False) on a printer."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for ok in oks:
+                self._receipts[(printer, ok)] = self._receipts.get((printer, ok), 0) + 1
+
+    def histogram(self, printer: str, phase: str) -> Optional[Histogram]:
+        with self._lock:
+            return self._latency.get((printer, phase))
+
+    def printers(self) -> List[str]:
+        with self._lock:
+            names = {printer for printer, _ in self._latency}
+            names.update(self._bytes)
+            names.update(printer for printer, _ in self._receipts)
+        return sorted(names)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latency.clear()
+            self._bytes.clear()
+            self._receipts.clear()
+
+    def summary(self, printer: str) -> str:
+        """One line for the status bar: outcomes, bytes and median/p95 per phase."""
+        with self._lock:
+            printed = self._receipts.get((printer, True), 0)
+            failed = self._receipts.get((printer, False), 0)
+            sent = self._bytes.get(printer, 0)
+            phases = [(phase, self._latency[(printer, phase)]) for phase in PHASES
+                      if (printer, phase) in self._latency]
+        parts = [f"{printer}: {printed} printed, {failed} failed, {sent} bytes"]
+        parts.extend(f"{phase} p50 {_format_seconds(h.quantile(0.5))} p95 {_format_seconds(h.quantile(0.95))}"
+                     for phase, h in phases)
+        return '; '.join(parts)
+
+    def render_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            latency = sorted(self._latency.items())
+            sent = sorted(self._bytes.items())
+            receipts = sorted(self._receipts.items())
+        lines = [
+            '# HELP receipt_print_phase_seconds Time spent in each phase of printing.',
+            '# TYPE receipt_print_phase_seconds histogram',
+        ]
+        for (printer, phase), h in latency:
+            labels = f'printer="{_escape(printer)}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip(h.bounds, h.counts):
+                cumulative += count
+                lines.append(f'receipt_print_phase_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'receipt_print_phase_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+            lines.append(f'receipt_print_phase_seconds_sum{{{labels}}} {h.sum:.6f}')
+            lines.append(f'receipt_print_phase_seconds_count{{{labels}}} {h.count}')
+        lines.append('# HELP receipt_print_bytes_total Bytes sent to each printer.')
+        lines.append('# TYPE receipt_print_bytes_total counter')
+        for printer, nbytes in sent:
+            lines.append(f'receipt_print_bytes_total{{printer="{_escape(printer)}"}} {nbytes}')
+        lines.append('# HELP receipt_print_receipts_total Receipts printed or failed on each printer.')
+        lines.append('# TYPE receipt_print_receipts_total counter')
+        for (printer, ok), count in receipts:
+            result = 'printed' if ok else 'failed'
+            lines.append(f'receipt_print_receipts_total{{printer="{_escape(printer)}",result="{result}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self) -> None:
+        """Rewrite the Prometheus text file, if there is one; never raises."""
+        if not self.enabled or not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render_prometheus())
+            # Replaced atomically so a scraper never reads a half-written file
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning("Failed to write print metrics to %s: %s", self.path, e)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds == float('inf'):
+        return f">{LATENCY_BUCKETS[-1]:g} s"
+    return f"{seconds * 1000:g} ms" if seconds < 1 else f"{seconds:g} s"
+
+
+metrics = PrintMetrics.from_environment()
@@ -0,0 +1,60 @@
+"""
+Render/transmit pipelining for Receipt Task Printer.
+Keeps the next receipts rendering while the current one is being sent, so the
+printer is not left idle waiting for the CPU during large batches.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, Iterator, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class InlineExecutor(Executor):
+    """Executor that runs each call immediately; used when a pool is not worth starting."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def pipeline(items: Sequence[T], submit: Callable[[T], Future], depth: int,
+             cancel_event: Optional[threading.Event] = None) -> Iterator[Tuple[T, Future]]:
+    """
+    Yield ``(item, future)`` pairs in order while later items are already rendering.
+
+    At most ``depth`` renders are queued behind the item being consumed, which
+    acts as a bounded queue between the render and transmit stages and keeps
+    memory flat however long the batch is. Once ``cancel_event`` is set no
+    further items are submitted; renders not yet consumed are cancelled when the
+    consumer stops.
+    """
+    pending: Deque[Tuple[T, Future]] = deque()
+    remaining = iter(items)
+
+    def fill():
+        while len(pending) < max(1, depth):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                item = next(remaining)
+            except StopIteration:
+                return
+            pending.append((item, submit(item)))
+
+    try:
+        fill()
+        while pending:
+            item, future = pending.popleft()
+            # Top up before handing the item over, so renders overlap its transmission
+            fill()
+            yield item, future
+    finally:
+        for _, future in pending:
+            future.cancel()
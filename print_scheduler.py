@@ -0,0 +1,324 @@
+"""
+Multi-printer fan-out for Receipt Task Printer.
+Spreads tasks over a pool of printers, each driven by its own thread, so total
+throughput grows with the number of printers.
+
+Tasks go to the least-loaded healthy printer, or to each printer in turn, unless
+a routing rule names a printer for them. A printer that fails several tasks in a
+row is taken out of the pool for a while and its work is sent elsewhere.
+"""
+
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, wait
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Pattern, Sequence, Set, Tuple
+
+import printer_utils
+from printer_utils import ResultCallback, TaskResult
+
+logger = logging.getLogger(__name__)
+
+ALL_PRINTERS = "All printers"  # Printer choice that prints through the scheduler
+
+LEAST_LOADED = 'least-loaded'
+ROUND_ROBIN = 'round-robin'
+POLICIES = (LEAST_LOADED, ROUND_ROBIN)
+
+ROUTES_ENV_VAR = 'RECEIPT_ROUTES'  # e.g. "^BAR=RONGTA Bar;^KITCHEN=RONGTA Kitchen"
+MAX_CONSECUTIVE_FAILURES = 3  # Failures in a row that take a printer out of the pool
+UNHEALTHY_COOLDOWN = 60.0  # Seconds before an unhealthy printer is tried again
+MAX_ATTEMPTS = 3  # Printers a task is tried on before it is reported as failed
+MAX_BATCH = 20  # Tasks sent to one printer per job
+
+BatchPrinter = Callable[..., List[TaskResult]]  # (printer_name, tasks, cancel_event=None)
+Route = Tuple[Pattern[str], str]
+
+
+def parse_routes(spec: str) -> List[Route]:
+    """Parse ``pattern=printer;...`` routing rules; patterns are regular expressions."""
+    routes = []
+    for entry in spec.split(';'):
+        pattern, sep, printer = entry.strip().rpartition('=')
+        if sep and pattern and printer.strip():
+            routes.append((re.compile(pattern), printer.strip()))
+    return routes
+
+
+@dataclass
+class _Item:
+    task: str
+    future: Future
+    tried: Set[str] = field(default_factory=set)
+    error: Optional[str] = None  # Error from the last printer that tried it
+    cancel_event: Optional[threading.Event] = None  # The print job's cancel flag
+
+
+@dataclass
+class _Printer:
+    """Scheduling state of one printer in the pool."""
+
+    name: str
+    queue: Deque[_Item] = field(default_factory=deque)
+    batch: List[_Item] = field(default_factory=list)  # Items being printed now
+    failures: int = 0  # Consecutive
+    down_until: float = 0.0
+    printed: int = 0
+    failed: int = 0
+    removed: bool = False
+    thread: Optional[threading.Thread] = None
+
+    @property
+    def load(self) -> int:
+        return len(self.queue) + len(self.batch)
+
+    def healthy(self, now: float) -> bool:
+        return not self.removed and now >= self.down_until
+
+
+class FanOutScheduler:
+    """
+    Dispatches tasks across printers and reports each task's result through a Future.
+
+    ``print_batch`` defaults to ``printer_utils.print_batch`` and is called from
+    one thread per printer with the job's ``cancel_event``; pass a fake to
+    simulate printers in tests.
+    """
+
+    def __init__(self, printers: Iterable[str], policy: str = LEAST_LOADED,
+                 routes: Optional[List[Route]] = None, print_batch: Optional[BatchPrinter] = None,
+                 max_failures: int = MAX_CONSECUTIVE_FAILURES, cooldown: float = UNHEALTHY_COOLDOWN,
+                 max_attempts: int = MAX_ATTEMPTS, max_batch: int = MAX_BATCH):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.policy = policy
+        if routes is None:
+            routes = parse_routes(os.environ.get(ROUTES_ENV_VAR, ''))
+        self.routes = routes
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.max_batch = max_batch
+        self._print_batch = print_batch or printer_utils.print_batch
+        self._printers: Dict[str, _Printer] = {}
+        self._turn = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.update_printers(printers)
+
+    def update_printers(self, printers: Iterable[str]) -> None:
+        """Add new printers to the pool and retire ones no longer listed."""
+        names = list(dict.fromkeys(printers))
+        with self._cond:
+            for name in names:
+                if name not in self._printers or self._printers[name].removed:
+                    printer = _Printer(name)
+                    printer.thread = threading.Thread(target=self._run, args=(printer,),
+                                                      name=f'printer-{name}', daemon=True)
+                    self._printers[name] = printer
+                    printer.thread.start()
+            for name, printer in list(self._printers.items()):
+                if name not in names:
+                    printer.removed = True
+                    del self._printers[name]
+                    self._requeue(printer)
+            self._cond.notify_all()
+
+    def printers(self) -> List[str]:
+        """Return the printers currently in the pool, including unhealthy ones."""
+        with self._cond:
+            return list(self._printers)
+
+    def healthy_printers(self) -> List[str]:
+        with self._cond:
+            now = time.monotonic()
+            return [name for name, printer in self._printers.items() if printer.healthy(now)]
+
+    def stats(self) -> Dict[str, Tuple[int, int, int]]:
+        """Return ``(printed, failed, load)`` per printer."""
+        with self._cond:
+            return {name: (p.printed, p.failed, p.load) for name, p in self._printers.items()}
+
+    def submit(self, task: str, cancel_event: Optional[threading.Event] = None) -> Future:
+        """
+        Queue a task on the chosen printer; the future resolves to ``(printer, error)``.
+
+        Once ``cancel_event`` is set the task is not started, and a printer
+        part way through its batch stops; the future then raises CancelledError.
+        """
+        item = _Item(task, Future(), cancel_event=cancel_event)
+        with self._cond:
+            self._dispatch(item)
+        return item.future
+
+    def print_batch(self, tasks: Sequence[str], timestamp=None,
+                    on_result: Optional[ResultCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+        """
+        Print tasks across the pool and return their results in task order.
+
+        Mirrors ``printer_utils.print_batch``. Results are reported as printers
+        finish, so ``on_result`` is not called in index order. Cancelling stops
+        every printer after its current receipt; tasks not printed by then are
+        missing from the results.
+        """
+        futures = {self.submit(task, cancel_event): index for index, task in enumerate(tasks, 1)}
+        results: Dict[int, TaskResult] = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled() or future.exception() is not None:
+                    continue  # Cancelled before it started or part way through a printer's batch
+                index = futures[future]
+                printer_name, error = future.result()
+                result = TaskResult(index, tasks[index - 1], error)
+                results[index] = result
+                if on_result is not None:
+                    on_result(result)
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+        return [results[index] for index in sorted(results)]
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the printer threads and settle every task's future.
+
+        Queued tasks are cancelled. Batches part way through are stopped
+        through their job's cancel event and waited for, up to ``timeout``
+        seconds; tasks still not finished then are failed.
+        """
+        with self._cond:
+            self._closed = True
+            printers = list(self._printers.values())
+            for printer in printers:
+                for item in printer.queue:
+                    self._stop(item)
+                printer.queue.clear()
+                for item in printer.batch:
+                    if item.cancel_event is not None:
+                        item.cancel_event.set()
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for printer in printers:
+            if printer.thread is not None and printer.thread is not threading.current_thread():
+                printer.thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            for printer in printers:
+                for item in printer.batch:
+                    self._stop(item)
+
+    @staticmethod
+    def _stop(item: _Item) -> None:
+        """Cancel an item's future, or fail it if it is already running."""
+        if item.future.cancel():
+            item.future.set_running_or_notify_cancel()  # Wakes callers waiting on it
+        elif not item.future.done():
+            item.future.set_result((None, item.error or "Printing stopped: the printer pool was closed"))
+
+    def _choose(self, item: _Item) -> Optional[_Printer]:
+        now = time.monotonic()
+        candidates = [p for p in self._printers.values() if p.healthy(now) and p.name not in item.tried]
+        if not candidates:
+            return None
+        for pattern, name in self.routes:
+            if pattern.search(item.task):
+                routed = [p for p in candidates if p.name == name]
+                if routed:
+                    return routed[0]
+                logger.warning("Route printer %s unavailable; sending task to the pool", name)
+                break
+        if self.policy == ROUND_ROBIN:
+            return candidates[next(self._turn) % len(candidates)]
+        return min(candidates, key=lambda p: (p.load, p.printed + p.failed))
+
+    def _dispatch(self, item: _Item) -> None:
+        """Queue an item on a printer, or fail it when no printer can take it (lock held)."""
+        if self._closed:
+            self._stop(item)
+            return
+        printer = self._choose(item)
+        if printer is None:
+            item.future.set_result((None, item.error or "No healthy printer available"))
+            return
+        printer.queue.append(item)
+        self._cond.notify_all()
+
+    def _requeue(self, printer: _Printer) -> None:
+        """Move a printer's queued items to other printers (lock held)."""
+        items = list(printer.queue)
+        printer.queue.clear()
+        for item in items:
+            if not item.future.cancelled():
+                self._dispatch(item)
+
+    def _run(self, printer: _Printer) -> None:
+        while True:
+            with self._cond:
+                while not printer.queue and not printer.removed and not self._closed:
+                    self._cond.wait()
+                if printer.removed or self._closed:
+                    return
+                batch = []
+                while printer.queue and len(batch) < self.max_batch:
+                    # A batch holds one job's tasks, so that job's cancel can stop it part way
+                    if batch and printer.queue[0].cancel_event is not batch[0].cancel_event:
+                        break
+                    item = printer.queue.popleft()
+                    # Items moved from a failed printer are already running
+                    if not (item.future.running() or item.future.set_running_or_notify_cancel()):
+                        continue
+                    if item.cancel_event is not None and item.cancel_event.is_set():
+                        item.future.set_exception(CancelledError())
+                    else:
+                        batch.append(item)
+                printer.batch = batch
+            if not batch:
+                continue
+            tasks = [item.task for item in batch]
+            cancel_event = batch[0].cancel_event
+            try:
+                results = self._print_batch(printer.name, tasks, cancel_event=cancel_event)
+            except Exception as e:
+                logger.error("Printing on %s failed: %s", printer.name, e)
+                results = [TaskResult(i, task, str(e)) for i, task in enumerate(tasks, 1)]
+            errors = {result.index: result.error for result in results}
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            with self._cond:
+                printer.batch = []
+                for index, item in enumerate(batch, 1):
+                    if item.future.done():
+                        continue  # Failed by close() after waiting too long for this batch
+                    if index not in errors and cancelled:
+                        item.future.set_exception(CancelledError())  # Not run; it returns to the list
+                    else:
+                        self._complete(printer, item, errors.get(index, "Not attempted"))
+
+    def _complete(self, printer: _Printer, item: _Item, error: Optional[str]) -> None:
+        """Record one task's outcome on a printer (lock held)."""
+        if error is None:
+            printer.printed += 1
+            printer.failures = 0
+            item.future.set_result((printer.name, None))
+            return
+        printer.failed += 1
+        printer.failures += 1
+        item.tried.add(printer.name)
+        item.error = error
+        if printer.failures >= self.max_failures and printer.down_until <= time.monotonic():
+            printer.down_until = time.monotonic() + self.cooldown
+            # One more failure after the cooldown takes it out again
+            printer.failures = self.max_failures - 1
+            logger.warning("Printer %s removed from the pool for %g s: %s", printer.name, self.cooldown, error)
+            self._requeue(printer)
+        if len(item.tried) < self.max_attempts and self._choose(item) is not None:
+            logger.info("Task failed on %s; trying another printer", printer.name)
+            self._dispatch(item)
+        else:
+            item.future.set_result((printer.name, error))
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Network job submission for Receipt Task Printer.
+An asyncio server that lets several stations queue tasks onto one printer.
+
+Clients connect over TCP and send one task per line, either as plain text or as
+a JSON object ``{"task": "..."}``. Each task is acknowledged as soon as it is
+queued and reported again once it has printed. Replies use the same format as
+the request::
+
+    QUEUED 12               {"id": 12, "status": "queued"}
+    PRINTED 12              {"id": 12, "status": "printed"}
+    FAILED 12 Out of paper  {"id": 12, "status": "failed", "error": "Out of paper"}
+    BUSY queue full         {"status": "busy", "error": "queue full"}
+    ERROR line too long     {"status": "error", "error": "line too long"}
+
+Tasks from all connections feed one serialized printer queue. Admission is
+limited overall and per connection, and ``BUSY`` replies tell a client to back
+off and retry, so a burst from one station cannot starve the others; queued
+work is taken from connections in round-robin order.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+import printer_utils
+from printer_utils import TaskResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9310
+MAX_QUEUED = 1000  # Tasks waiting across all connections
+MAX_PER_CLIENT = 50  # Tasks one connection may have waiting
+MAX_CLIENTS = 64
+MAX_BATCH = 20  # Tasks sent to the printer per job
+MAX_LINE_BYTES = 4096
+
+BatchPrinter = Callable[[str, Sequence[str]], List[TaskResult]]
+
+
+@dataclass
+class _Client:
+    """One connected station and the tasks it has waiting."""
+
+    client_id: int
+    writer: asyncio.StreamWriter
+    pending: Deque["_Submission"] = field(default_factory=deque)
+
+    def send(self, reply: str) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(reply.encode('utf-8') + b'\n')
+
+
+@dataclass
+class _Submission:
+    job_id: int
+    client: _Client
+    task: str
+    use_json: bool
+
+
+def _reply(use_json: bool, status: str, job_id: Optional[int] = None, error: Optional[str] = None) -> str:
+    if use_json:
+        message = {'status': status} if job_id is None else {'id': job_id, 'status': status}
+        if error is not None:
+            message['error'] = error
+        return json.dumps(message)
+    parts = [status.upper()]
+    if job_id is not None:
+        parts.append(str(job_id))
+    if error is not None:
+        parts.append(error)
+    return ' '.join(parts)
+
+
+class PrintServer:
+    """
+    Accepts tasks from many connections and prints them through one queue.
+
+    ``print_batch`` is called on a worker thread, one batch at a time; it
+    defaults to ``printer_utils.print_batch`` and can be replaced with a fake
+    printer for testing.
+    """
+
+    def __init__(self, printer_name: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 max_queued: int = MAX_QUEUED, max_per_client: int = MAX_PER_CLIENT,
+                 max_clients: int = MAX_CLIENTS, max_batch: int = MAX_BATCH,
+                 print_batch: Optional[BatchPrinter] = None):
+        self.printer_name = printer_name
+        self.host = host
+        self.port = port
+        self.max_queued = max_queued
+        self.max_per_client = max_per_client
+        self.max_clients = max_clients
+        self.max_batch = max_batch
+        self._print_batch = print_batch or printer_utils.print_batch
+        self._clients: Dict[int, _Client] = {}
+        # Connections with waiting tasks, in the order they will next be served
+        self._ready: Deque[_Client] = deque()
+        self._queued = 0
+        self._ids = itertools.count(1)
+        self._client_ids = itertools.count(1)
+        self._work = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    @property
+    def queued(self) -> int:
+        """Number of accepted tasks not yet sent to the printer."""
+        return self._queued
+
+    async def start(self) -> None:
+        """Start listening; ``port`` is updated when it was 0 (any free port)."""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                  limit=MAX_LINE_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        logger.info("Print server listening on %s:%s for %s", self.host, self.port, self.printer_name)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop accepting connections and stop printing; queued tasks are dropped."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+        for client in list(self._clients.values()):
+            client.writer.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if len(self._clients) >= self.max_clients:
+            writer.write(_reply(False, 'busy', error='too many connections').encode('utf-8') + b'\n')
+            writer.close()
+            return
+        client = _Client(next(self._client_ids), writer)
+        self._clients[client.client_id] = client
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Over-long line; the stream cannot be resynchronized
+                    client.send(_reply(False, 'error', error='line too long'))
+                    break
+                if not line:
+                    break
+                self._submit(client, line.decode('utf-8', errors='replace').strip())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Tasks already acknowledged still print after the station disconnects
+            del self._clients[client.client_id]
+            writer.close()
+
+    def _submit(self, client: _Client, line: str) -> None:
+        if not line:
+            return
+        use_json = line.startswith('{')
+        if use_json:
+            try:
+                task = json.loads(line).get('task')
+            except (ValueError, AttributeError):
+                task = None
+            if not isinstance(task, str):
+                client.send(_reply(True, 'error', error='expected {"task": "..."}'))
+                return
+            task = task.strip()
+            if not task:
+                client.send(_reply(True, 'error', error='empty task'))
+                return
+        else:
+            task = line
+        if self._queued >= self.max_queued:
+            client.send(_reply(use_json, 'busy', error='queue full'))
+            return
+        if len(client.pending) >= self.max_per_client:
+            client.send(_reply(use_json, 'busy', error='too many pending tasks'))
+            return
+        submission = _Submission(next(self._ids), client, task, use_json)
+        if not client.pending:
+            self._ready.append(client)
+        client.pending.append(submission)
+        self._queued += 1
+        self._work.set()
+        client.send(_reply(use_json, 'queued', submission.job_id))
+
+    def _next_batch(self) -> List[_Submission]:
+        """Take up to ``max_batch`` tasks, one per connection in turn."""
+        batch: List[_Submission] = []
+        while self._ready and len(batch) < self.max_batch:
+            client = self._ready.popleft()
+            batch.append(client.pending.popleft())
+            if client.pending:
+                self._ready.append(client)
+        self._queued -= len(batch)
+        return batch
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._work.wait()
+            self._work.clear()
+            while self._ready:
+                batch = self._next_batch()
+                tasks = [submission.task for submission in batch]
+                try:
+                    results = await loop.run_in_executor(
+                        None, partial(self._print_batch, self.printer_name, tasks))
+                except Exception as e:
+                    logger.error("Print batch failed: %s", e)
+                    results = [TaskResult(i, task, str(e)) for i, task in enumerate(tasks, 1)]
+                errors = {result.index: result.error for result in results}
+                for index, submission in enumerate(batch, 1):
+                    error = errors.get(index, 'not attempted')
+                    status = 'printed' if error is None else 'failed'
+                    submission.client.send(_reply(submission.use_json, status, submission.job_id, error))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='print_server',
+                                     description="Accept tasks over TCP and print them on one printer.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument('-p', '--printer', help="printer name or target (default: first RONGTA printer)")
+    parser.add_argument('--max-queued', type=int, default=MAX_QUEUED, help="tasks waiting across all stations")
+    parser.add_argument('--max-per-client', type=int, default=MAX_PER_CLIENT,
+                        help="tasks one connection may have waiting")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    printer_name = args.printer or printer_utils.find_rongta_printer()
+    if not printer_name:
+        print("No RONGTA printer found; choose one with --printer", file=sys.stderr)
+        return 2
+    server = PrintServer(printer_name, args.host, args.port, args.max_queued, args.max_per_client)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        printer_utils.close_backend()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
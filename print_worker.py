@@ -0,0 +1,216 @@
+"""
+Background print worker for Receipt Task Printer.
+Runs print jobs on a dedicated thread so the GUI stays responsive while receipts print.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import printer_utils
+from print_journal import PrintJournal
+from print_scheduler import ALL_PRINTERS, FanOutScheduler
+from printer_utils import TaskResult
+
+logger = logging.getLogger(__name__)
+
+PROGRESS = 'progress'
+RETRY = 'retry'
+FINISHED = 'finished'
+
+# Failed tasks are retried with exponential backoff: 1 s, 2 s, 4 s, ... capped
+PRINT_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+
+@dataclass
+class PrintJob:
+    """A batch of tasks submitted to the worker for one printer."""
+
+    job_id: int
+    printer_name: str
+    tasks: List[str]
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    task_ids: Optional[List[int]] = None  # Task IDs, parallel to ``tasks``
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+@dataclass
+class PrintEvent:
+    """
+    Notification from the worker thread.
+
+    ``progress`` events carry the result of one task; ``retry`` events announce
+    that ``results`` (the failures so far) will be attempted again after
+    ``delay`` seconds; ``finished`` events carry the final result of every task
+    of the job. Tasks missing from a finished job's results were never attempted,
+    because the job was cancelled or the printer stopped part way through.
+    """
+
+    kind: str
+    job: PrintJob
+    result: Optional[TaskResult] = None
+    results: List[TaskResult] = field(default_factory=list)
+    delay: float = 0.0
+
+    @property
+    def done(self) -> int:
+        return self.result.index if self.result else len(self.results)
+
+    @property
+    def total(self) -> int:
+        return len(self.job.tasks)
+
+
+class PrintWorker:
+    """
+    Prints submitted jobs one at a time on a background thread.
+
+    Events are queued for the owner to collect with ``poll_events`` from its own
+    thread (the Tk loop polls via ``root.after``); the worker never touches widgets.
+    Tasks that fail are retried up to ``max_retries`` times with exponential
+    backoff; the wait happens on the worker thread and ends early on cancel.
+    With a ``journal``, each result is recorded as soon as the printer reports it.
+    Jobs for ``ALL_PRINTERS`` are spread over the printers of ``scheduler``.
+    """
+
+    def __init__(self, journal: Optional[PrintJournal] = None, max_retries: int = PRINT_RETRIES,
+                 retry_delay: float = RETRY_BASE_DELAY, max_retry_delay: float = RETRY_MAX_DELAY):
+        self.journal = journal
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.scheduler: Optional[FanOutScheduler] = None
+        self._jobs: "queue.Queue[Optional[PrintJob]]" = queue.Queue()
+        self._events: "queue.Queue[PrintEvent]" = queue.Queue()
+        self._pending: Dict[int, PrintJob] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(target=self._run, name='print-worker', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Cancel outstanding jobs and wait for the worker thread to exit."""
+        self.cancel_all()
+        self._jobs.put(None)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def busy(self) -> bool:
+        """True while any submitted job has not finished."""
+        with self._lock:
+            return bool(self._pending)
+
+    def submit(self, printer_name: str, tasks: List[str],
+               task_ids: Optional[List[int]] = None) -> PrintJob:
+        """Queue a batch of tasks for printing and return its job."""
+        job = PrintJob(next(self._ids), printer_name, list(tasks),
+                       task_ids=list(task_ids) if task_ids is not None else None)
+        with self._lock:
+            self._pending[job.job_id] = job
+        self._jobs.put(job)
+        logger.info("Queued print job %s with %s task(s) for %s", job.job_id, len(job.tasks), printer_name)
+        return job
+
+    def cancel_all(self) -> int:
+        """Cancel the running job and every queued job; return how many were cancelled."""
+        with self._lock:
+            jobs = list(self._pending.values())
+        for job in jobs:
+            job.cancel_event.set()
+        if jobs:
+            logger.info("Cancelling %s print job(s)", len(jobs))
+        return len(jobs)
+
+    def poll_events(self) -> List[PrintEvent]:
+        """Return all events produced since the last call without blocking."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def wait_idle(self) -> None:
+        """Block until every submitted job has finished."""
+        self._jobs.join()
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                self._process(job)
+            finally:
+                self._jobs.task_done()
+
+    def retry_delay_for(self, attempt: int) -> float:
+        """Return the backoff before retry number ``attempt`` (1-based)."""
+        return min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+
+    def _process(self, job: PrintJob) -> None:
+        # Latest result per task, keyed by the task's index in the job
+        results: Dict[int, TaskResult] = {}
+        indices = list(range(1, len(job.tasks) + 1))
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                failed = [results[i] for i in indices]
+                delay = self.retry_delay_for(attempt)
+                logger.info("Retrying %s task(s) of job %s in %g s", len(failed), job.job_id, delay)
+                self._events.put(PrintEvent(RETRY, job, results=failed, delay=delay))
+                if job.cancel_event.wait(delay):
+                    break
+            if job.cancelled:
+                break
+            for result in self._print(job, indices):
+                results[result.index] = result
+            indices = [i for i in indices if i in results and not results[i].ok]
+            if not indices:
+                break
+        with self._lock:
+            self._pending.pop(job.job_id, None)
+        self._events.put(PrintEvent(FINISHED, job, results=[results[i] for i in sorted(results)]))
+
+    def _print(self, job: PrintJob, indices: List[int]) -> List[TaskResult]:
+        """Print the tasks at the given job indices, reporting results by job index."""
+        tasks = [job.tasks[i - 1] for i in indices]
+
+        def in_job(result: TaskResult) -> TaskResult:
+            return TaskResult(indices[result.index - 1], result.task, result.error)
+
+        def on_result(result: TaskResult) -> None:
+            self._on_result(job, in_job(result))
+
+        try:
+            if job.printer_name == ALL_PRINTERS:
+                if self.scheduler is None:
+                    raise RuntimeError("No printers to share the job between")
+                results = self.scheduler.print_batch(tasks, on_result=on_result, cancel_event=job.cancel_event)
+            else:
+                results = printer_utils.print_batch(job.printer_name, tasks, on_result=on_result,
+                                                    cancel_event=job.cancel_event)
+        except Exception as e:
+            logger.error("Print job %s failed: %s", job.job_id, e)
+            results = [TaskResult(i, task, str(e)) for i, task in enumerate(tasks, 1)]
+            for result in results:
+                self._journal_result(job, in_job(result))
+        return [in_job(result) for result in results]
+
+    def _on_result(self, job: PrintJob, result: TaskResult) -> None:
+        self._journal_result(job, result)
+        self._events.put(PrintEvent(PROGRESS, job, result))
+
+    def _journal_result(self, job: PrintJob, result: TaskResult) -> None:
+        if self.journal is not None and job.task_ids is not None:
+            self.journal.mark(job.task_ids[result.index - 1], result.error)
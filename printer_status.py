@@ -0,0 +1,115 @@
+"""
+Printer status for Receipt Task Printer.
+Parses ESC/POS real-time status replies (``DLE EOT``) and keeps the last known
+state of every printer, so sending can pause while a printer is out of paper,
+has its cover open, is offline or has a full buffer, and the GUI can say why.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+STATUS_ENV_VAR = 'RECEIPT_STATUS_POLL'  # Set to 0 to send without status checks
+
+# DLE EOT n: 1 printer status, 2 offline cause, 4 paper roll sensor
+STATUS_QUERY = bytes([0x10, 0x04, 1, 0x10, 0x04, 2, 0x10, 0x04, 4])
+REPLY_BYTES = 3
+
+FIRST_REPLY_TIMEOUT = 2.0  # Seconds an idle printer gets to answer before status is assumed unsupported
+POLL_INTERVAL = 0.5  # Seconds between status queries while paused
+REPLY_TIMEOUT = 5.0  # Seconds before an unanswered query is taken as lost and sent again
+MAX_PAUSE = 600.0  # Seconds a printer may stay unavailable before its remaining receipts fail
+
+_FIXED_MASK = 0x93  # Bits 0, 1, 4 and 7 of every status byte...
+_FIXED_BITS = 0x12  # ...are 0, 1, 1 and 0
+_OFFLINE = 0x08  # n=1
+_COVER_OPEN = 0x04  # n=2
+_PAPER_STOP = 0x20  # n=2
+_ERROR = 0x40  # n=2
+_PAPER_NEAR_END = 0x0c  # n=4
+_PAPER_END = 0x60  # n=4
+
+
+@dataclass(frozen=True)
+class PrinterStatus:
+    """What a printer last reported; ``busy`` means it is not taking data, e.g. with a full buffer."""
+
+    offline: bool = False
+    cover_open: bool = False
+    paper_out: bool = False
+    error: bool = False
+    busy: bool = False
+    paper_near_end: bool = False  # A warning only; printing continues
+
+    @property
+    def ready(self) -> bool:
+        return not (self.offline or self.cover_open or self.paper_out or self.error or self.busy)
+
+    def __str__(self) -> str:
+        # Most specific cause first; a printer with its cover open also reports offline
+        if self.paper_out:
+            return "out of paper"
+        if self.cover_open:
+            return "cover open"
+        if self.error:
+            return "printer error"
+        if self.offline:
+            return "offline"
+        if self.busy:
+            return "busy"
+        return "paper low" if self.paper_near_end else "ready"
+
+
+READY = PrinterStatus()
+BUSY = PrinterStatus(busy=True)
+
+
+def is_status_byte(byte: int) -> bool:
+    return byte & _FIXED_MASK == _FIXED_BITS
+
+
+def parse_status(reply: bytes) -> PrinterStatus:
+    """Decode the replies to ``STATUS_QUERY``: one byte each for DLE EOT 1, 2 and 4."""
+    if len(reply) != REPLY_BYTES or not all(is_status_byte(byte) for byte in reply):
+        raise ValueError(f"Not a DLE EOT status reply: {reply!r}")
+    printer, cause, paper = reply
+    return PrinterStatus(
+        offline=bool(printer & _OFFLINE),
+        cover_open=bool(cause & _COVER_OPEN),
+        paper_out=bool(cause & _PAPER_STOP) or paper & _PAPER_END == _PAPER_END,
+        error=bool(cause & _ERROR),
+        paper_near_end=paper & _PAPER_NEAR_END == _PAPER_NEAR_END,
+    )
+
+
+def polling_enabled() -> bool:
+    return os.environ.get(STATUS_ENV_VAR, '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+class StatusBoard:
+    """Last known status of each printer, written by print threads and read by the GUI."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statuses: Dict[str, PrinterStatus] = {}
+
+    def update(self, printer_name: str, status: PrinterStatus) -> None:
+        with self._lock:
+            self._statuses[printer_name] = status
+
+    def get(self, printer_name: str) -> Optional[PrinterStatus]:
+        with self._lock:
+            return self._statuses.get(printer_name)
+
+    def not_ready(self) -> Dict[str, PrinterStatus]:
+        """Printers whose last status holds printing back."""
+        with self._lock:
+            return {name: status for name, status in self._statuses.items() if not status.ready}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statuses.clear()
+
+
+board = StatusBoard()
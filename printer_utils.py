@@ -1,87 +1,858 @@
 """
 Printer utility functions for Receipt Task Printer.
-Handles printer detection, selection, and printing using win32print.
+Handles printer detection, selection, and printing through pluggable backends:
+Windows GDI via win32print, or raw ESC/POS byte streams to a device, file or socket.
 """
 
-import win32print
-import win32ui
-import win32con
+import glob
+import os
+import socket
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Set, Tuple
 import logging
 
+try:
+    import win32print
+    import win32ui
+    import win32con
+    import win32gui
+except ImportError:  # Not on Windows, or pywin32 is not installed
+    win32print = win32ui = win32con = win32gui = None
+
+import escpos
+import print_metrics
+import printer_status
+import receipt_template
+from print_metrics import DC, JOB, OPEN, RENDER, SEND, SPOOL
+from print_pipeline import InlineExecutor, pipeline
+from printer_status import PrinterStatus
+from receipt_layout import FontSpec, paginate
+from receipt_template import DEFAULT_TEMPLATE, TEMPLATE_ENV_VAR, CompiledTemplate
+
 logger = logging.getLogger(__name__)
 
 RECEIPT_WIDTH_MM = 80
 RECEIPT_DPI = 203  # Typical for thermal printers
 RECEIPT_WIDTH_PX = int(RECEIPT_WIDTH_MM / 25.4 * RECEIPT_DPI)
 MARGIN_PX = 20
+BOTTOM_PADDING_PX = DEFAULT_TEMPLATE.spec.bottom_padding  # Blank space fed below the timestamp
+
+TASK_FONT = DEFAULT_TEMPLATE.task_font
+TIME_FONT = DEFAULT_TEMPLATE.text_font
+
+RAW_PRINTER_PORT = 9100  # Standard port for raw (JetDirect) printing
+SEND_CHUNK_BYTES = 4096  # Raw socket writes; about one printer receive buffer
+SEND_POLL_INTERVAL = 0.5  # Seconds a raw socket write waits before checking for a stall
+BACKEND_ENV_VAR = 'RECEIPT_PRINTER_BACKEND'
+PRINTERS_ENV_VAR = 'RECEIPT_PRINTERS'
+MODE_ENV_VAR = 'RECEIPT_ESCPOS_MODE'
+COMPRESSION_ENV_VAR = 'RECEIPT_RASTER_COMPRESSION'
+LOGO_ENV_VAR = 'RECEIPT_LOGO'
+DEVICE_GLOB = '/dev/usb/lp*'
+PRINTER_CACHE_TTL = 60.0  # Seconds before printer enumeration is repeated
+PIPELINE_MIN_TASKS = 8  # Smaller raster batches are not worth starting render processes for
+RENDER_PROCESSES = max(1, (os.cpu_count() or 2) - 1)  # Leave a core for the GUI and sending
+
+# ESC/POS modes: printer-resident fonts, or receipts rendered to raster images
+ESCPOS_TEXT = 'text'
+ESCPOS_RASTER = 'raster'
+
+
+@dataclass
+class TaskResult:
+    """Outcome of printing one task in a batch; ``index`` is 1-based."""
+
+    index: int
+    task: str
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class TransferStats:
+    """Bytes written to a printer and the time spent writing them."""
+
+    receipts: int = 0
+    bytes_sent: int = 0
+    wire_seconds: float = 0.0
+
+    def record(self, nbytes: int, seconds: float) -> None:
+        self.receipts += 1
+        self.bytes_sent += nbytes
+        self.wire_seconds += seconds
+
+    @property
+    def bytes_per_receipt(self) -> float:
+        return self.bytes_sent / self.receipts if self.receipts else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.receipts} receipt(s), {self.bytes_sent} bytes "
+                f"({self.bytes_per_receipt:.0f}/receipt), {self.wire_seconds:.3f} s on the wire")
+
+
+ResultCallback = Callable[[TaskResult], None]
+
+
+def _failed_results(tasks: Sequence[str], error: str, start: int = 1,
+                    on_result: Optional[ResultCallback] = None) -> List[TaskResult]:
+    """Return a failed result for every task, numbering from ``start``."""
+    results = [TaskResult(index, task, error) for index, task in enumerate(tasks, start)]
+    if on_result is not None:
+        for result in results:
+            on_result(result)
+    return results
+
+
+def _record(results: List[TaskResult], result: TaskResult,
+            on_result: Optional[ResultCallback]) -> None:
+    """Append a task result and report it to the progress callback, if any."""
+    results.append(result)
+    if on_result is not None:
+        on_result(result)
+
+
+def _is_cancelled(cancel_event: Optional[threading.Event]) -> bool:
+    return cancel_event is not None and cancel_event.is_set()
+
+
+class PrinterBackend:
+    """Interface implemented by every printer backend."""
+
+    name = 'base'
+
+    def list_printers(self) -> List[str]:
+        """Return a list of available printer names."""
+        raise NotImplementedError
+
+    def print_task(self, printer_name: str, task: str, timestamp: datetime) -> None:
+        """Print a single task with timestamp to the specified printer."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any printer resources held between jobs."""
+
+    def print_batch(self, printer_name: str, tasks: Sequence[str],
+                    timestamp: Optional[datetime] = None,
+                    on_result: Optional[ResultCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+        """
+        Print several tasks, one receipt each, reporting the outcome per task.
+
+        ``on_result`` is called with each result as soon as it is known. When
+        ``cancel_event`` is set, no further receipts are started and only the
+        results for tasks already attempted are returned.
+
+        The default implementation prints one job per task; backends override
+        it to open the printer once for the whole batch.
+        """
+        results: List[TaskResult] = []
+        for index, task in enumerate(tasks, 1):
+            if _is_cancelled(cancel_event):
+                break
+            try:
+                self.print_task(printer_name, task, timestamp or datetime.now())
+                _record(results, TaskResult(index, task), on_result)
+            except Exception as e:
+                _record(results, TaskResult(index, task, str(e)), on_result)
+        return results
+
+
+class Win32PrinterSession:
+    """
+    Printer handle, device context and fonts for one Windows printer.
+
+    Creating these per receipt costs spooler round trips and leaks GDI font
+    handles, so a session is opened once and reused for consecutive documents
+    until ``close`` releases everything.
+    """
+
+    def __init__(self, printer_name: str, template_path: Optional[str] = None):
+        self.printer_name = printer_name
+        self.template_path = template_path
+        self.lock = threading.Lock()  # One document at a time per device context
+        metrics = print_metrics.metrics
+        with metrics.time(printer_name, OPEN):
+            self.hprinter = win32print.OpenPrinter(printer_name)
+        self.hdc = None
+        self.fonts: Dict[FontSpec, object] = {}
+        try:
+            with metrics.time(printer_name, DC):
+                self.hdc = win32ui.CreateDC()
+                self.hdc.CreatePrinterDC(printer_name)
+                self.page_height = self.hdc.GetDeviceCaps(win32con.VERTRES)
+                for spec in (TIME_FONT, TASK_FONT):
+                    self._font(spec)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def closed(self) -> bool:
+        return self.hprinter is None
+
+    def print_document(self, tasks: Sequence[str], timestamp: Optional[datetime],
+                       on_result: Optional[ResultCallback],
+                       cancel_event: Optional[threading.Event]) -> List[TaskResult]:
+        """Print the tasks as the pages of one spooler document."""
+        results: List[TaskResult] = []
+        metrics = print_metrics.metrics
+        # Compiled once and reused until the template file changes
+        template = receipt_template.load_template(self.template_path)
+        self.hdc.StartDoc('Receipt Tasks')
+        for index, task in enumerate(tasks, 1):
+            if _is_cancelled(cancel_event):
+                logger.info("Batch on %s cancelled after %s task(s)", self.printer_name, len(results))
+                break
+            try:
+                with metrics.time(self.printer_name, RENDER):
+                    self._draw_receipt(template, task, timestamp or datetime.now())
+                logger.info("Printed task to %s: %s", self.printer_name, task)
+                _record(results, TaskResult(index, task), on_result)
+            except Exception as e:
+                logger.error("Failed to print task %s: %s", index, e)
+                _record(results, TaskResult(index, task, str(e)), on_result)
+        with metrics.time(self.printer_name, SPOOL):
+            self.hdc.EndDoc()
+        return results
+
+    def _draw_receipt(self, template: CompiledTemplate, task: str, timestamp: datetime) -> None:
+        """Draw one receipt, starting a new page whenever the layout overflows one."""
+        lines, _ = template.layout(task, template.format_time(timestamp), template.task_font,
+                                   template.text_font, RECEIPT_WIDTH_PX, MARGIN_PX)
+        pages = paginate(lines, self.page_height, MARGIN_PX)
+        for number, page in enumerate(pages, 1):
+            self.hdc.StartPage()
+            for line in page:
+                self.hdc.SelectObject(self._font(line.font))
+                self.hdc.TextOut(line.x, line.y, line.text)
+            if number == len(pages):
+                # Draw a blank line below the last one to force the bottom paper feed
+                last = page[-1]
+                self.hdc.TextOut(MARGIN_PX, last.y + last.font.height + template.spec.bottom_padding, " ")
+            self.hdc.EndPage()
+
+    def _font(self, spec: FontSpec):
+        """Return the GDI font for a spec, created on first use and kept for the session."""
+        font = self.fonts.get(spec)
+        if font is None:
+            font = self.fonts[spec] = win32ui.CreateFont({
+                'name': spec.name,
+                'height': spec.height,
+                'weight': win32con.FW_BOLD if spec.bold else win32con.FW_NORMAL
+            })
+        return font
+
+    def close(self) -> None:
+        """Release the device context, fonts and printer handle; safe to call twice."""
+        if self.hdc is not None:
+            self.hdc.DeleteDC()
+            self.hdc = None
+        # Fonts are deleted after the DC so none is still selected into it
+        for font in self.fonts.values():
+            win32gui.DeleteObject(font.GetSafeHandle())
+        self.fonts = {}
+        if self.hprinter is not None:
+            win32print.ClosePrinter(self.hprinter)
+            self.hprinter = None
+
+
+class Win32Backend(PrinterBackend):
+    """Prints through the Windows spooler, rendering text with GDI."""
+
+    name = 'win32'
+
+    def __init__(self):
+        if win32print is None:
+            raise RuntimeError("The win32 backend requires pywin32 on Windows")
+        self._sessions: Dict[str, Win32PrinterSession] = {}
+        self._sessions_lock = threading.Lock()
+        self.template_path = os.environ.get(TEMPLATE_ENV_VAR) or None
+
+    def list_printers(self) -> List[str]:
+        printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
+        return [p[2] for p in printers]
+
+    def print_task(self, printer_name: str, task: str, timestamp: datetime) -> None:
+        result = self.print_batch(printer_name, [task], timestamp)[0]
+        if not result.ok:
+            raise RuntimeError(result.error)
+
+    def print_batch(self, printer_name: str, tasks: Sequence[str],
+                    timestamp: Optional[datetime] = None,
+                    on_result: Optional[ResultCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+        """Print all tasks as pages of a single spooler document, reusing the printer session."""
+        try:
+            session = self._session(printer_name)
+        except Exception as e:
+            logger.error("Failed to open printer %s: %s", printer_name, e)
+            return _failed_results(tasks, str(e), on_result=on_result)
+        reported: List[TaskResult] = []
+        with session.lock:
+            try:
+                return session.print_document(tasks, timestamp, lambda result: _record(reported, result, on_result),
+                                              cancel_event)
+            except Exception as e:
+                # Tasks already reported keep their results, so no task is reported twice.
+                # The session may be unusable now, so the next batch starts afresh.
+                logger.error("Failed to print batch on %s: %s", printer_name, e)
+                self._discard_session(printer_name, session)
+                if _is_cancelled(cancel_event):
+                    return reported
+                return reported + _failed_results(tasks[len(reported):], str(e), len(reported) + 1, on_result)
+
+    def _session(self, printer_name: str) -> Win32PrinterSession:
+        """Return the open session for a printer, opening one if needed."""
+        with self._sessions_lock:
+            session = self._sessions.get(printer_name)
+            if session is None:
+                session = Win32PrinterSession(printer_name, self.template_path)
+                self._sessions[printer_name] = session
+            return session
+
+    def _discard_session(self, printer_name: str, session: Win32PrinterSession) -> None:
+        with self._sessions_lock:
+            if self._sessions.get(printer_name) is session:
+                del self._sessions[printer_name]
+        try:
+            session.close()
+        except Exception as e:
+            logger.warning("Failed to release printer session for %s: %s", printer_name, e)
+
+    def close(self) -> None:
+        """Release every open printer session, waiting for documents in progress."""
+        with self._sessions_lock:
+            sessions = list(self._sessions.items())
+        for printer_name, session in sessions:
+            with session.lock:
+                self._discard_session(printer_name, session)
+
+
+class _SocketSink:
+    """
+    Writable wrapper around a TCP connection to a raw printer port.
+
+    Data goes out as fast as the printer takes it. ``timeout`` bounds the
+    connect, but a write only fails once the printer has taken nothing for
+    ``stall_timeout`` seconds, so a slow printer working through a long batch
+    never times out. ``on_stall(True)`` is called when the printer stops
+    taking data and ``on_stall(False)`` when it starts again.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float,
+                 stall_timeout: float = printer_status.MAX_PAUSE):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        # Status queries are tiny; without this they wait for the previous receipt to be acknowledged
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock.settimeout(SEND_POLL_INTERVAL)
+        self.stall_timeout = stall_timeout
+        self.on_stall: Optional[Callable[[bool], None]] = None
+        self._reply = bytearray()
+        self._query_sent: Optional[float] = None  # When the query awaiting a reply was sent
+        self.status_answered = False  # Whether the printer has answered a status query
+
+    def write(self, data: bytes) -> int:
+        view = memoryview(data)
+        stalled_since = None
+        while view:
+            try:
+                sent = self._sock.send(view[:SEND_CHUNK_BYTES])
+            except socket.timeout:
+                now = time.monotonic()
+                if stalled_since is None:
+                    stalled_since = now
+                    if self.on_stall is not None:
+                        self.on_stall(True)
+                elif now - stalled_since > self.stall_timeout:
+                    raise TimeoutError(f"Printer took no data for {self.stall_timeout:g} s")
+                continue
+            view = view[sent:]
+            if stalled_since is not None:
+                stalled_since = None
+                if self.on_stall is not None:
+                    self.on_stall(False)
+        return len(data)
+
+    def query_status(self, timeout: float) -> Optional[PrinterStatus]:
+        """
+        Ask for real-time status and wait up to ``timeout`` seconds for the reply.
 
+        Returns None when the reply has not arrived, e.g. while the printer's
+        buffer is full; the query stays pending and a later call picks up its
+        reply rather than asking again. A query left unanswered for
+        ``REPLY_TIMEOUT`` seconds is taken as lost or cut short and sent again,
+        after dropping whatever part of its reply did arrive.
+        """
+        if self._query_sent is not None and time.monotonic() - self._query_sent > printer_status.REPLY_TIMEOUT:
+            logger.debug("Status reply lost after %d byte(s); asking again", len(self._reply))
+            self._query_sent = None
+        if self._query_sent is None:
+            self._drain_replies()
+            self.write(printer_status.STATUS_QUERY)
+            self._query_sent = time.monotonic()
+        deadline = time.monotonic() + timeout
+        while len(self._reply) < printer_status.REPLY_BYTES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self._sock.settimeout(min(remaining, SEND_POLL_INTERVAL))
+            try:
+                data = self._sock.recv(64)
+            except socket.timeout:
+                continue
+            finally:
+                self._sock.settimeout(SEND_POLL_INTERVAL)
+            self._add_reply_bytes(data)
+        reply = bytes(self._reply[:printer_status.REPLY_BYTES])
+        self._reply.clear()
+        self._query_sent = None
+        self.status_answered = True
+        return printer_status.parse_status(reply)
 
-def list_printers() -> List[str]:
-    """Return a list of available printer names."""
-    printers = win32print.EnumPrinters(win32print.PRINTER_ENUM_LOCAL | win32print.PRINTER_ENUM_CONNECTIONS)
-    return [p[2] for p in printers]
+    def _drain_replies(self) -> None:
+        """Drop reply bytes of earlier queries, so they cannot be taken for the reply to the next one."""
+        self._sock.settimeout(0)
+        try:
+            while True:
+                self._add_reply_bytes(self._sock.recv(64))
+        except (BlockingIOError, socket.timeout):
+            pass
+        finally:
+            self._sock.settimeout(SEND_POLL_INTERVAL)
+        self._reply.clear()
 
+    def _add_reply_bytes(self, data: bytes) -> None:
+        if not data:
+            raise ConnectionError("Printer closed the connection")
+        # Skip anything that cannot be a status byte, so one stray byte cannot misalign replies
+        self._reply += bytes(byte for byte in data if printer_status.is_status_byte(byte))
 
-def find_rongta_printer() -> Optional[str]:
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_target(target: str, timeout: float = 10.0):
+    """
+    Open a writable sink for a raw printer target.
+
+    Targets are either ``tcp://host[:port]`` for network printers (port 9100 by
+    default), or a filesystem path such as ``/dev/usb/lp0`` or a capture file.
+    A ``file://`` prefix on paths is accepted and stripped.
+    """
+    if target.startswith('tcp://'):
+        address = target[len('tcp://'):].rstrip('/')
+        host, _, port = address.rpartition(':')
+        if not host or not port.isdigit():
+            host, port = address, str(RAW_PRINTER_PORT)
+        return _SocketSink(host, int(port), timeout)
+    if target.startswith('file://'):
+        target = target[len('file://'):]
+    # Append so that a capture file accumulates receipts; devices ignore the mode.
+    return open(target, 'ab')
+
+
+def parse_targets(spec: str) -> Dict[str, str]:
+    """
+    Parse a printer target specification of the form ``Name=target;Other=target``.
+
+    Entries without a name use the target itself as the printer name.
+    """
+    targets: Dict[str, str] = {}
+    for entry in spec.split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, target = entry.partition('=')
+        if not sep:
+            name, target = entry, entry
+        targets[name.strip()] = target.strip()
+    return targets
+
+
+def _encode_receipt(mode: str, logo_path: Optional[str], compression: Optional[str],
+                    template_path: Optional[str], task: str, timestamp: datetime) -> bytes:
+    """Encode one ESC/POS receipt; a module-level function so render processes can run it."""
+    # Each process compiles the template once, and again only after the file changes
+    template = receipt_template.load_template(template_path)
+    if mode == ESCPOS_RASTER:
+        import raster  # Loads numpy and Pillow, so text receipts never import it
+        logo = raster.load_image(logo_path, escpos.PRINT_WIDTH_DOTS) if logo_path else None
+        return raster.encode_receipt_raster(task, template.format_time(timestamp), template.task_font,
+                                            template.text_font, escpos.PRINT_WIDTH_DOTS, MARGIN_PX,
+                                            logo, compression, template)
+    return template.encode(task, timestamp)
+
+
+class EscPosBackend(PrinterBackend):
+    """Sends raw ESC/POS byte streams to device files, capture files or TCP sockets."""
+
+    name = 'escpos'
+
+    def __init__(self, printers: Optional[Dict[str, str]] = None, timeout: float = 10.0,
+                 discover_devices: bool = True, mode: Optional[str] = None,
+                 logo_path: Optional[str] = None, compression: Optional[str] = None,
+                 template_path: Optional[str] = None, status_polling: Optional[bool] = None,
+                 max_pause: float = printer_status.MAX_PAUSE):
+        if printers is None:
+            printers = parse_targets(os.environ.get(PRINTERS_ENV_VAR, ''))
+        if mode is None:
+            mode = os.environ.get(MODE_ENV_VAR, '').strip().lower() or ESCPOS_TEXT
+        if mode not in (ESCPOS_TEXT, ESCPOS_RASTER):
+            raise ValueError(f"Unknown ESC/POS mode: {mode}")
+        if compression is None:
+            compression = os.environ.get(COMPRESSION_ENV_VAR, '').strip().lower() or None
+        if mode == ESCPOS_RASTER:
+            import raster  # Loads numpy and Pillow, so only raster mode pays for it
+            if not raster.available():
+                raise RuntimeError("Raster mode requires the numpy and Pillow packages")
+            compression = compression or raster.COMPRESSION_AUTO
+            if compression not in raster.COMPRESSIONS:
+                raise ValueError(f"Unknown raster compression: {compression}")
+        self.printers: Dict[str, str] = dict(printers)
+        self.timeout = timeout
+        self.discover_devices = discover_devices
+        self.mode = mode
+        self.logo_path = logo_path if logo_path is not None else os.environ.get(LOGO_ENV_VAR) or None
+        self.compression = compression
+        if template_path is None:
+            template_path = os.environ.get(TEMPLATE_ENV_VAR) or None
+        self.template_path = template_path
+        if status_polling is None:
+            status_polling = printer_status.polling_enabled()
+        self.status_polling = status_polling
+        self.max_pause = max_pause
+        # Printers known to answer status queries or not; shared by the scheduler's printer threads
+        self._status_printers: Set[str] = set()
+        self._no_status_printers: Set[str] = set()
+        self._status_lock = threading.Lock()
+        self._render_pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._transfer_stats: Dict[str, TransferStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def list_printers(self) -> List[str]:
+        names = list(self.printers)
+        if self.discover_devices:
+            known_targets = set(self.printers.values())
+            names.extend(path for path in sorted(glob.glob(DEVICE_GLOB)) if path not in known_targets)
+        return names
+
+    def resolve_target(self, printer_name: str) -> str:
+        """Return the raw target for a printer name; unknown names are used as targets."""
+        return self.printers.get(printer_name, printer_name)
+
+    def encode_receipt(self, task: str, timestamp: datetime) -> bytes:
+        """Encode one receipt as printer-font text or as a raster image, per the backend mode."""
+        return _encode_receipt(self.mode, self.logo_path, self.compression, self.template_path,
+                               task, timestamp)
+
+    def _render_executor(self, count: int) -> Tuple[Executor, int]:
+        """
+        Return the executor that renders a batch of ``count`` receipts and its pipeline depth.
+
+        Raster batches large enough to repay the start-up cost render in a
+        process pool while earlier receipts are sent. Text receipts take
+        microseconds to encode, so they are rendered inline.
+        """
+        if self.mode != ESCPOS_RASTER or count < PIPELINE_MIN_TASKS:
+            return InlineExecutor(), 1
+        with self._pool_lock:
+            if self._render_pool is None:
+                self._render_pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES)
+            return self._render_pool, 2 * RENDER_PROCESSES
+
+    def _reset_render_pool(self) -> None:
+        with self._pool_lock:
+            pool, self._render_pool = self._render_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Stop the render process pool, if one was started."""
+        self._reset_render_pool()
+
+    def print_task(self, printer_name: str, task: str, timestamp: datetime) -> None:
+        metrics = print_metrics.metrics
+        with metrics.time(printer_name, RENDER):
+            data = self.encode_receipt(task, timestamp)
+        try:
+            with metrics.time(printer_name, OPEN):
+                sink = self._open(printer_name)
+            with sink:
+                self._wait_until_ready(printer_name, sink)
+                self._send(printer_name, sink, data)
+            logger.info("Printed task to %s: %s", printer_name, task)
+        except Exception as e:
+            logger.error("Failed to print task: %s", e)
+            raise
+
+    def print_batch(self, printer_name: str, tasks: Sequence[str],
+                    timestamp: Optional[datetime] = None,
+                    on_result: Optional[ResultCallback] = None,
+                    cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+        """Stream every receipt, each ending in a cut, over a single connection."""
+        results: List[TaskResult] = []
+        metrics = print_metrics.metrics
+        try:
+            with metrics.time(printer_name, OPEN):
+                sink = self._open(printer_name)
+        except Exception as e:
+            logger.error("Failed to open printer %s: %s", printer_name, e)
+            return _failed_results(tasks, str(e), on_result=on_result)
+        executor, depth = self._render_executor(len(tasks))
+
+        def render(item: Tuple[int, str]) -> Future:
+            return executor.submit(_encode_receipt, self.mode, self.logo_path, self.compression,
+                                   self.template_path, item[1], timestamp or datetime.now())
+
+        stages = pipeline(list(enumerate(tasks, 1)), render, depth, cancel_event)
+        with sink, closing(stages):
+            for (index, task), rendered in stages:
+                if _is_cancelled(cancel_event):
+                    logger.info("Batch on %s cancelled after %s task(s)", printer_name, len(results))
+                    break
+                try:
+                    # With the render pool ahead of the printer this wait is close to zero
+                    with metrics.time(printer_name, RENDER):
+                        data = rendered.result()
+                except Exception as e:
+                    if isinstance(e, BrokenExecutor):
+                        self._reset_render_pool()
+                    logger.error("Failed to render task %s: %s", index, e)
+                    _record(results, TaskResult(index, task, str(e)), on_result)
+                    continue
+                try:
+                    if not self._wait_until_ready(printer_name, sink, cancel_event):
+                        logger.info("Batch on %s cancelled after %s task(s)", printer_name, len(results))
+                        break
+                    self._send(printer_name, sink, data)
+                except Exception as e:
+                    # A broken stream cannot carry the remaining receipts either.
+                    logger.error("Failed to print task %s: %s", index, e)
+                    _record(results, TaskResult(index, task, str(e)), on_result)
+                    results.extend(_failed_results(tasks[index:], str(e), index + 1, on_result))
+                    break
+                logger.info("Printed task to %s: %s", printer_name, task)
+                _record(results, TaskResult(index, task), on_result)
+        return results
+
+    def _open(self, printer_name: str) -> BinaryIO:
+        sink = open_target(self.resolve_target(printer_name), self.timeout)
+        if isinstance(sink, _SocketSink):
+            sink.stall_timeout = self.max_pause
+            sink.on_stall = lambda stalled: self._report_status(
+                printer_name, printer_status.BUSY if stalled else printer_status.READY)
+        return sink
+
+    def _wait_until_ready(self, printer_name: str, sink: BinaryIO,
+                          cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        Hold the next receipt until the printer reports it can print; False if cancelled meanwhile.
+
+        Only raw TCP printers are asked. The reply to a query only arrives once
+        the printer has read it, so waiting for it also keeps the printer's
+        buffer from overrunning. Raises RuntimeError when the printer stays
+        unavailable for ``max_pause`` seconds.
+        """
+        if not self.status_polling or not isinstance(sink, _SocketSink):
+            return True
+        with self._status_lock:
+            if printer_name in self._no_status_printers:
+                return True
+        started = time.monotonic()
+        status = None
+        while True:
+            with self._status_lock:
+                answered_before = printer_name in self._status_printers
+            reply = sink.query_status(printer_status.POLL_INTERVAL if answered_before
+                                      else printer_status.FIRST_REPLY_TIMEOUT)
+            if reply is None and not answered_before:
+                with self._status_lock:
+                    if printer_name in self._status_printers:
+                        continue  # Another thread heard from it meanwhile; it is just slow to answer
+                    self._no_status_printers.add(printer_name)
+                logger.info("Printer %s does not answer status queries; printing without them", printer_name)
+                return True
+            if reply is not None:
+                with self._status_lock:
+                    self._status_printers.add(printer_name)
+                    self._no_status_printers.discard(printer_name)
+                status = reply
+            elif status is None:
+                status = printer_status.BUSY  # Still working through its buffer
+            self._report_status(printer_name, status)
+            if status.ready:
+                return True
+            if time.monotonic() - started > self.max_pause:
+                raise RuntimeError(f"Printer not ready: {status}")
+            if cancel_event is not None:
+                if cancel_event.wait(printer_status.POLL_INTERVAL):
+                    return False
+            else:
+                time.sleep(printer_status.POLL_INTERVAL)
+
+    @staticmethod
+    def _report_status(printer_name: str, status: PrinterStatus) -> None:
+        previous = printer_status.board.get(printer_name)
+        printer_status.board.update(printer_name, status)
+        if not status.ready and (previous is None or previous.ready):
+            logger.warning("Printing to %s paused: %s", printer_name, status)
+        elif status.ready and previous is not None and not previous.ready:
+            logger.info("Printer %s ready again", printer_name)
+        elif status.paper_near_end and (previous is None or not previous.paper_near_end):
+            logger.warning("Printer %s: paper low", printer_name)
+
+    def _send(self, printer_name: str, sink: BinaryIO, data: bytes) -> None:
+        """Write one receipt and record its size and time on the wire."""
+        started = time.perf_counter()
+        self._write(sink, data)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._transfer_stats.setdefault(printer_name, TransferStats()).record(len(data), elapsed)
+        metrics = print_metrics.metrics
+        if metrics.enabled:
+            metrics.observe(printer_name, SEND, elapsed)
+            metrics.add_bytes(printer_name, len(data))
+
+    @staticmethod
+    def _write(sink: BinaryIO, data: bytes) -> None:
+        sink.write(data)
+        sink.flush()
+
+    def transfer_stats(self) -> Dict[str, TransferStats]:
+        """Return a snapshot of bytes sent and wire time per printer since the backend was created."""
+        with self._stats_lock:
+            return {name: TransferStats(**vars(stats)) for name, stats in self._transfer_stats.items()}
+
+
+_BACKENDS = {
+    Win32Backend.name: Win32Backend,
+    EscPosBackend.name: EscPosBackend,
+}
+_backend: Optional[PrinterBackend] = None
+_printer_cache: Optional[Tuple[float, List[str]]] = None
+_printer_cache_lock = threading.Lock()
+
+
+def create_backend(name: Optional[str] = None) -> PrinterBackend:
+    """
+    Create a printer backend by name.
+
+    Without a name, ``RECEIPT_PRINTER_BACKEND`` is consulted, falling back to
+    the win32 backend when pywin32 is available and ESC/POS otherwise.
+    """
+    name = name or os.environ.get(BACKEND_ENV_VAR, '').strip().lower()
+    if not name:
+        name = Win32Backend.name if win32print is not None else EscPosBackend.name
+    try:
+        backend_class = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown printer backend: {name}") from None
+    return backend_class()
+
+
+def get_backend() -> PrinterBackend:
+    """Return the active printer backend, creating the default one on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+        logger.info("Using %s printer backend", _backend.name)
+    return _backend
+
+
+def set_backend(backend: Optional[PrinterBackend]) -> None:
+    """Replace the active printer backend; ``None`` restores the default on next use."""
+    global _backend
+    if _backend is not None and _backend is not backend:
+        _backend.close()
+    _backend = backend
+    invalidate_printer_cache()
+
+
+def close_backend() -> None:
+    """Release printer resources held by the active backend, if one was created."""
+    if _backend is not None:
+        _backend.close()
+
+
+def invalidate_printer_cache() -> None:
+    """Forget the cached printer list so the next lookup enumerates again."""
+    global _printer_cache
+    with _printer_cache_lock:
+        _printer_cache = None
+
+
+def list_printers(refresh: bool = False) -> List[str]:
+    """
+    Return a list of available printer names.
+
+    Enumeration can take seconds with network printer connections, so the result
+    is cached for ``PRINTER_CACHE_TTL`` seconds; pass ``refresh=True`` to rescan.
+    Concurrent callers share a single enumeration.
+    """
+    global _printer_cache
+    with _printer_cache_lock:
+        now = time.monotonic()
+        if not refresh and _printer_cache is not None and now - _printer_cache[0] < PRINTER_CACHE_TTL:
+            return list(_printer_cache[1])
+        printers = get_backend().list_printers()
+        _printer_cache = (time.monotonic(), printers)
+        return list(printers)
+
+
+def find_rongta_printers(printers: Optional[List[str]] = None) -> List[str]:
+    """Return the names of all RONGTA printers found."""
+    if printers is None:
+        printers = list_printers()
+    return [name for name in printers if 'rongta' in name.lower()]
+
+
+def find_rongta_printer(printers: Optional[List[str]] = None) -> Optional[str]:
     """Return the name of the first RONGTA printer found, or None if not found."""
-    for name in list_printers():
-        if 'rongta' in name.lower():
-            return name
-    return None
+    found = find_rongta_printers(printers)
+    return found[0] if found else None
 
 
 def print_task(printer_name: str, task: str, timestamp: datetime) -> None:
     """Print a single task with timestamp to the specified printer."""
-    # Prepare receipt text
-    time_str = timestamp.strftime('%Y-%m-%d %H:%M')
-    # Use Device Context for raw printing
-    hprinter = win32print.OpenPrinter(printer_name)
+    metrics = print_metrics.metrics
+    ok = False
     try:
-        hdc = win32ui.CreateDC()
-        hdc.CreatePrinterDC(printer_name)
-        hdc.StartDoc('Receipt Task')
-        hdc.StartPage()
-
-        # Fonts
-        font_time = win32ui.CreateFont({
-            'name': 'Arial',
-            'height': 20,
-            'weight': win32con.FW_NORMAL
-        })
-        font_task = win32ui.CreateFont({
-            'name': 'Arial',
-            'height': 44,  # Increased from 40 to 44 (4 points larger)
-            'weight': win32con.FW_BOLD
-        })
-
-        # Draw task (centered, large) - now at the top
-        hdc.SelectObject(font_task)
-        # Center horizontally
-        text_size = hdc.GetTextExtent(task)
-        x = max(MARGIN_PX, (RECEIPT_WIDTH_PX - text_size[0]) // 2)
-        y = MARGIN_PX + 20  # Start task closer to top
-        hdc.TextOut(x, y, task)
-
-        # Draw timestamp (bottom, small)
-        hdc.SelectObject(font_time)
-        time_y = y + text_size[1] + 40  # Position timestamp below task
-        hdc.TextOut(MARGIN_PX, time_y, time_str)
-
-        # Add extra bottom padding by advancing the Y position and printing blank lines
-        bottom_padding_px = 120  # Increased bottom padding (was less before)
-        y_end = time_y + 20 + bottom_padding_px  # Add padding below timestamp
-        # Optionally, draw a blank line at the bottom to force paper feed
-        hdc.SelectObject(font_time)
-        hdc.TextOut(MARGIN_PX, y_end, " ")
-
-        hdc.EndPage()
-        hdc.EndDoc()
-        hdc.DeleteDC()
-        logger.info(f"Printed task to {printer_name}: {task}")
-    except Exception as e:
-        logger.error(f"Failed to print task: {e}")
-        raise
+        with metrics.time(printer_name, JOB):
+            get_backend().print_task(printer_name, task, timestamp)
+        ok = True
     finally:
-        win32print.ClosePrinter(hprinter) 
\ No newline at end of file
+        if metrics.enabled:
+            metrics.count_results(printer_name, [ok])
+            metrics.export()
+
+
+def print_batch(printer_name: str, tasks: Sequence[str],
+                timestamp: Optional[datetime] = None,
+                on_result: Optional[ResultCallback] = None,
+                cancel_event: Optional[threading.Event] = None) -> List[TaskResult]:
+    """Print every task as its own receipt within one print job, reporting per-task results."""
+    metrics = print_metrics.metrics
+    with metrics.time(printer_name, JOB):
+        results = get_backend().print_batch(printer_name, tasks, timestamp, on_result, cancel_event)
+    if metrics.enabled:
+        metrics.count_results(printer_name, (result.ok for result in results))
+        metrics.export()
+    return results
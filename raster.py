@@ -0,0 +1,254 @@
+"""
+1-bit raster receipt rendering for Receipt Task Printer.
+Renders receipts to packed NumPy bitmaps and encodes them as ESC/POS ``GS v 0``
+raster images, for logos, non-Latin scripts and exact fonts.
+
+Requires the optional ``numpy`` and ``Pillow`` packages; Pillow is only used to
+rasterize glyphs, all compositing and bit packing is done with NumPy.
+"""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Raster mode is optional
+    np = Image = ImageDraw = ImageFont = None
+
+import escpos
+from receipt_layout import FontSpec, PlacedLine, layout_receipt, register_font_metrics
+from receipt_template import CompiledTemplate
+
+logger = logging.getLogger(__name__)
+
+# Printers buffer a limited amount of image data, so tall images go out in bands
+BAND_ROWS = 256
+INK_THRESHOLD = 128  # Grey levels at or above this print as black
+
+# Raster encodings. ``compact`` turns blank row runs into paper feeds and trims
+# blank columns from the right of each band; ``auto`` keeps whichever is smaller.
+COMPRESSION_NONE = 'none'
+COMPRESSION_COMPACT = 'compact'
+COMPRESSION_AUTO = 'auto'
+COMPRESSIONS = (COMPRESSION_NONE, COMPRESSION_COMPACT, COMPRESSION_AUTO)
+# Shorter blank runs stay in the image; a feed plus a new band header costs more
+MIN_BLANK_ROWS = 8
+
+# Font files tried for each family before falling back to a bundled font
+_FONT_FILES = {
+    ('Arial', False): ['arial.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf'],
+    ('Arial', True): ['arialbd.ttf', 'Arial Bold.ttf', 'LiberationSans-Bold.ttf', 'DejaVuSans-Bold.ttf'],
+}
+_FONT_DIRS = [
+    os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts'),
+    '/usr/share/fonts/truetype/msttcorefonts',
+    '/usr/share/fonts/truetype/liberation',
+    '/usr/share/fonts/truetype/dejavu',
+    '/Library/Fonts',
+]
+_MEASURE_SIZE = 1000  # Point size used to derive width tables, in 1/1000 em
+# Files of substitute families, so their layout specs resolve to the same file
+_substitute_files: Dict[Tuple[str, bool], List[str]] = {}
+
+
+def available() -> bool:
+    """Return True if the optional raster dependencies are installed."""
+    return np is not None
+
+
+def _require() -> None:
+    if np is None:
+        raise RuntimeError("Raster printing requires the numpy and Pillow packages")
+
+
+def _open_font_file(spec: FontSpec, size: int):
+    key = (spec.name, spec.bold)
+    for filename in _FONT_FILES.get(key) or _substitute_files.get(key, []):
+        for directory in [''] + _FONT_DIRS:
+            try:
+                return ImageFont.truetype(os.path.join(directory, filename), size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=None)
+def resolve_font(spec: FontSpec) -> Tuple[FontSpec, "ImageFont.FreeTypeFont"]:
+    """
+    Return the layout font and the Pillow font used to draw ``spec``.
+
+    When the requested family is not installed, a substitute is loaded and its
+    measured width table registered under its own family name, so wrapping
+    matches the glyphs that are actually drawn. The substitute's file is
+    recorded too, so the layout font resolves to that same file when lines
+    are drawn.
+    """
+    _require()
+    reference = _open_font_file(spec, _MEASURE_SIZE)
+    family = reference.getname()[0]
+    if family == spec.name:
+        layout_spec = spec
+    else:
+        ascent, descent = reference.getmetrics()
+        widths = {chr(code): round(reference.getlength(chr(code))) for code in range(32, 127)}
+        register_font_metrics(family, spec.bold, widths, (ascent + descent) / _MEASURE_SIZE)
+        layout_spec = FontSpec(family, spec.height, spec.bold)
+        if isinstance(getattr(reference, 'path', None), str):
+            _substitute_files[(family, spec.bold)] = [reference.path]
+        logger.info("Font %s not found; rendering with %s", spec.name, family)
+    ascent, descent = reference.getmetrics()
+    # FontSpec heights are cell heights (ascent + descent); Pillow sizes are em sizes
+    size = max(1, round(spec.height * _MEASURE_SIZE / (ascent + descent)))
+    return layout_spec, _open_font_file(spec, size)
+
+
+@lru_cache(maxsize=512)
+def render_line(text: str, spec: FontSpec) -> "np.ndarray":
+    """
+    Rasterize one line of text to a boolean bitmap ``spec.height`` rows tall.
+
+    Results are cached, so repeated elements such as headers, footers and the
+    timestamp of the current minute are only rasterized once. The returned array
+    is read-only.
+    """
+    _, font = resolve_font(spec)
+    width = max(1, int(font.getlength(text)) + 1)
+    image = Image.new('L', (width, spec.height), 0)
+    ImageDraw.Draw(image).text((0, 0), text, fill=255, font=font)
+    bitmap = np.asarray(image) >= INK_THRESHOLD
+    bitmap.flags.writeable = False
+    return bitmap
+
+
+@lru_cache(maxsize=32)
+def _load_image(path: str, mtime: float, width: int) -> "np.ndarray":
+    image = Image.open(path).convert('L')
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))))
+    # Dark pixels print; transparent or light ones do not
+    bitmap = np.asarray(image) < INK_THRESHOLD
+    bitmap.flags.writeable = False
+    return bitmap
+
+
+def load_image(path: str, width: int) -> "np.ndarray":
+    """Load a logo or other image as a bitmap no wider than ``width``, cached until the file changes."""
+    _require()
+    return _load_image(path, os.path.getmtime(path), width)
+
+
+def compose(lines: List[PlacedLine], width: int, height: int) -> "np.ndarray":
+    """Draw placed lines onto a blank boolean canvas, clipping at the edges."""
+    _require()
+    canvas = np.zeros((height, width), dtype=bool)
+    for line in lines:
+        glyphs = render_line(line.text, line.font)
+        blit(canvas, glyphs, line.x, line.y)
+    return canvas
+
+
+def blit(canvas: "np.ndarray", bitmap: "np.ndarray", x: int, y: int) -> None:
+    """OR a bitmap onto the canvas at (x, y), clipping at the edges."""
+    rows = min(bitmap.shape[0], canvas.shape[0] - y)
+    cols = min(bitmap.shape[1], canvas.shape[1] - x)
+    if rows > 0 and cols > 0:
+        canvas[y:y + rows, x:x + cols] |= bitmap[:rows, :cols]
+
+
+def render_receipt(task: str, time_str: str, task_font: FontSpec, time_font: FontSpec,
+                   width: int, margin: int, logo: Optional["np.ndarray"] = None,
+                   template: Optional[CompiledTemplate] = None) -> "np.ndarray":
+    """
+    Render a receipt to a boolean bitmap ``width`` pixels wide.
+
+    The layout matches the GDI receipt: an optional centered logo, the wrapped
+    task centered below it and the timestamp underneath, or the lines of a
+    receipt template when one is given.
+    """
+    _require()
+    task_spec, _ = resolve_font(task_font)
+    time_spec, _ = resolve_font(time_font)
+    if template is not None:
+        lines, bottom = template.layout(task, time_str, task_spec, time_spec, width, margin)
+    else:
+        lines, bottom = layout_receipt(task, time_str, task_spec, time_spec, width, margin)
+    top = 0
+    if logo is not None:
+        top = logo.shape[0] + margin
+        lines = [PlacedLine(line.text, line.x, line.y + top, line.font) for line in lines]
+    canvas = compose(lines, width, bottom + top)
+    if logo is not None:
+        blit(canvas, logo, max(0, (width - logo.shape[1]) // 2), margin)
+    return canvas
+
+
+def pack_bits(bitmap: "np.ndarray") -> "np.ndarray":
+    """Pack a boolean bitmap into bytes, most significant bit leftmost, padding rows to whole bytes."""
+    _require()
+    return np.packbits(bitmap, axis=1)
+
+
+def encode_raster(bitmap: "np.ndarray", band_rows: int = BAND_ROWS,
+                  compression: str = COMPRESSION_NONE) -> bytes:
+    """Encode a boolean bitmap as ``GS v 0`` raster commands using the given compression."""
+    packed = pack_bits(bitmap)
+    if compression == COMPRESSION_NONE:
+        return _encode_bands(packed, band_rows, trim=False)
+    if compression == COMPRESSION_COMPACT:
+        return _encode_compact(packed, band_rows)
+    if compression == COMPRESSION_AUTO:
+        plain = _encode_bands(packed, band_rows, trim=False)
+        compact = _encode_compact(packed, band_rows)
+        return compact if len(compact) < len(plain) else plain
+    raise ValueError(f"Unknown raster compression: {compression}")
+
+
+def _encode_bands(packed: "np.ndarray", band_rows: int, trim: bool) -> bytes:
+    """Emit one ``GS v 0`` command per band, optionally trimming blank right-hand columns."""
+    parts = []
+    for start in range(0, packed.shape[0], band_rows):
+        band = packed[start:start + band_rows]
+        if trim:
+            inked = np.flatnonzero(band.any(axis=0))
+            width_bytes = int(inked[-1]) + 1 if inked.size else 1
+            band = np.ascontiguousarray(band[:, :width_bytes])
+        parts.append(escpos.raster_header(band.shape[1], band.shape[0]))
+        parts.append(band.tobytes())
+    return b''.join(parts)
+
+
+def _encode_compact(packed: "np.ndarray", band_rows: int) -> bytes:
+    """Send inked sections as trimmed bands and replace long blank runs with paper feeds."""
+    inked = packed.any(axis=1)
+    # Boundaries of runs of rows that are all inked or all blank
+    edges = np.flatnonzero(np.diff(inked.astype(np.int8))) + 1
+    bounds = [0, *edges.tolist(), len(inked)]
+    parts = []
+    section_start = 0
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if not inked[start] and end - start >= MIN_BLANK_ROWS:
+            if section_start < start:
+                parts.append(_encode_bands(packed[section_start:start], band_rows, trim=True))
+            parts.append(escpos.feed_dots(end - start))
+            section_start = end
+    if section_start < len(inked):
+        parts.append(_encode_bands(packed[section_start:], band_rows, trim=True))
+    return b''.join(parts)
+
+
+def encode_receipt_raster(task: str, time_str: str, task_font: FontSpec, time_font: FontSpec,
+                          width: int, margin: int, logo: Optional["np.ndarray"] = None,
+                          compression: str = COMPRESSION_AUTO,
+                          template: Optional[CompiledTemplate] = None) -> bytes:
+    """Encode a complete raster receipt: initialize, image, bottom feed and cut."""
+    bitmap = render_receipt(task, time_str, task_font, time_font, width, margin, logo, template)
+    trailer = (template.trailer if template is not None
+               else escpos.feed(escpos.BOTTOM_FEED_LINES) + escpos.cut())
+    return b''.join([
+        escpos.INIT,
+        encode_raster(bitmap, compression=compression),
+        trailer,
+    ])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Headless command-line mode for Receipt Task Printer.
+Prints tasks given as arguments, read from a file or streamed on stdin, one task
+per line, without importing tkinter. Input is consumed lazily, so memory use
+stays flat however long the stream runs.
+
+Exit status is 0 when every task printed, 1 when any task failed and 2 for
+usage errors or when no printer is available.
+"""
+
+import argparse
+import logging
+import sys
+from typing import Iterable, List, Optional, TextIO
+
+import print_metrics
+import printer_utils
+import task_import
+from task_import import chunked, read_tasks
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130  # Conventional status for Ctrl+C
+
+# Tasks read from arguments or a file are printed this many per job; stdin is
+# printed line by line so tickets come out as soon as they arrive.
+FILE_BATCH_SIZE = 50
+STREAM_BATCH_SIZE = 1
+
+
+def print_stream(printer_name: str, tasks: Iterable[str], batch_size: int,
+                 out: Optional[TextIO] = None) -> int:
+    """Print tasks as they arrive and return the number that failed; failures are reported to ``out``."""
+    out = out or sys.stderr
+    printed = failed = 0
+    for chunk in chunked(tasks, batch_size):
+        results = printer_utils.print_batch(printer_name, chunk)
+        for result in results:
+            if result.ok:
+                printed += 1
+            else:
+                failed += 1
+                print(f"Failed to print {result.task!r}: {result.error}", file=out)
+        # A batch that returns early leaves tasks unattempted; count them as failed
+        for task in chunk[len(results):]:
+            failed += 1
+            print(f"Failed to print {task!r}: not attempted", file=out)
+    print(f"Printed {printed} of {printed + failed} task(s)", file=out)
+    return failed
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='receipt_cli',
+        description="Print tasks as receipts without the GUI, one task per line.",
+    )
+    parser.add_argument('tasks', nargs='*', help="tasks to print; read from stdin when omitted")
+    parser.add_argument('-f', '--file', help="read tasks from FILE, one per line ('-' for stdin)")
+    parser.add_argument('-c', '--column', type=task_import.parse_column,
+                        help="CSV column to read from a .csv FILE, by number or header name (default: 1)")
+    parser.add_argument('--header', action=argparse.BooleanOptionalAction,
+                        help="whether the first row of a .csv FILE holds column names (default: detected)")
+    parser.add_argument('-p', '--printer', help="printer name or target (default: first RONGTA printer)")
+    parser.add_argument('-b', '--batch-size', type=int,
+                        help=f"tasks per print job (default: {FILE_BATCH_SIZE}, "
+                             f"or {STREAM_BATCH_SIZE} when streaming stdin)")
+    parser.add_argument('-l', '--list-printers', action='store_true', help="list printers and exit")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log progress to stderr")
+    parser.add_argument('--stats', action='store_true', help="report phase timings per printer when done")
+    parser.add_argument('--metrics-file', help="write Prometheus metrics to FILE after every job")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None, stdin: Optional[TextIO] = None) -> int:
+    """Run the command line and return the exit status."""
+    args = build_parser().parse_args(argv)
+    stdin = stdin or sys.stdin
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        stream=sys.stderr,
+    )
+
+    if args.list_printers:
+        for name in printer_utils.list_printers():
+            print(name)
+        return EXIT_OK
+
+    if args.tasks and args.file:
+        print("Give tasks as arguments or with --file, not both", file=sys.stderr)
+        return EXIT_USAGE
+
+    printer_name = args.printer or printer_utils.find_rongta_printer()
+    if not printer_name:
+        print("No RONGTA printer found; choose one with --printer", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.stats or args.metrics_file:
+        print_metrics.metrics.enable(args.metrics_file)
+
+    source: Optional[TextIO] = None
+    if args.tasks:
+        tasks: Iterable[str] = read_tasks(args.tasks)
+        batch_size = args.batch_size or FILE_BATCH_SIZE
+    elif args.file and args.file != '-':
+        try:
+            source = task_import.open_tasks(args.file)
+            tasks = task_import.file_tasks(source, args.file, args.column, args.header)
+        except (OSError, ValueError) as e:
+            if source is not None:
+                source.close()
+            print(f"Cannot read {args.file}: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        batch_size = args.batch_size or FILE_BATCH_SIZE
+    else:
+        tasks = read_tasks(stdin)
+        batch_size = args.batch_size or STREAM_BATCH_SIZE
+
+    try:
+        failed = print_stream(printer_name, tasks, batch_size)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    finally:
+        if source is not None:
+            source.close()
+        printer_utils.close_backend()
+        if args.stats:
+            for name in print_metrics.metrics.printers():
+                print(print_metrics.metrics.summary(name), file=sys.stderr)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Receipt layout engine for Receipt Task Printer.
+Wraps, centers and paginates receipt text using precomputed glyph-width tables,
+so layout needs no device context and costs microseconds per receipt.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# Advance widths in 1/1000 em for ASCII 32..126. Arial shares Helvetica's metrics.
+_ASCII = ''.join(chr(code) for code in range(32, 127))
+_ARIAL_REGULAR = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_ARIAL_BOLD = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+_DEFAULT_ADVANCE = 556  # Used for characters outside the table
+
+# GDI font heights are cell heights; Arial's cell (ascent + descent) is 1.117 em.
+_ARIAL_CELL_EM = 1.117
+
+# (family, bold) -> (advance widths in 1/1000 em, cell height in em)
+_WIDTH_TABLES: Dict[Tuple[str, bool], Tuple[Dict[str, int], float]] = {
+    ('Arial', False): (dict(zip(_ASCII, _ARIAL_REGULAR)), _ARIAL_CELL_EM),
+    ('Arial', True): (dict(zip(_ASCII, _ARIAL_BOLD)), _ARIAL_CELL_EM),
+}
+
+
+def register_font_metrics(name: str, bold: bool, widths: Dict[str, int], cell_em: float) -> None:
+    """
+    Register a width table for a font family, e.g. one measured from a font file.
+
+    ``widths`` maps characters to advances in 1/1000 em and ``cell_em`` is the
+    font's ascent plus descent in em. Cached measurements are discarded.
+    """
+    _WIDTH_TABLES[(name, bold)] = (dict(widths), cell_em)
+    text_width.cache_clear()
+
+
+@dataclass(frozen=True)
+class FontSpec:
+    """
+    A font at a given pixel height.
+
+    Proportional fonts are measured from the width tables; fonts with a
+    ``fixed_width`` (printer-resident ESC/POS fonts) advance the same for every
+    character.
+    """
+
+    name: str
+    height: int
+    bold: bool = False
+    fixed_width: int = 0
+
+    def char_width(self, char: str) -> float:
+        if self.fixed_width:
+            return self.fixed_width
+        table, cell_em = _WIDTH_TABLES.get((self.name, self.bold), ({}, _ARIAL_CELL_EM))
+        em_px = self.height / cell_em
+        return table.get(char, _DEFAULT_ADVANCE) * em_px / 1000
+
+
+@dataclass(frozen=True)
+class PlacedLine:
+    """A line of text positioned on the receipt."""
+
+    text: str
+    x: int
+    y: int
+    font: FontSpec
+
+
+@lru_cache(maxsize=4096)
+def text_width(font: FontSpec, text: str) -> int:
+    """Return the rendered width of a single line of text in pixels."""
+    if font.fixed_width:
+        return font.fixed_width * len(text)
+    return round(sum(font.char_width(char) for char in text))
+
+
+def _split_word(word: str, font: FontSpec, max_width: int) -> List[str]:
+    """Break a word that is wider than the line into pieces that fit."""
+    pieces = []
+    start = 0
+    while start < len(word):
+        # Longest prefix that fits; at least one character so progress is guaranteed
+        end = start + 1
+        while end < len(word) and text_width(font, word[start:end + 1]) <= max_width:
+            end += 1
+        pieces.append(word[start:end])
+        start = end
+    return pieces
+
+
+def wrap_text(text: str, font: FontSpec, max_width: int) -> List[str]:
+    """
+    Greedily word-wrap text to lines no wider than ``max_width`` pixels.
+
+    Explicit newlines are kept, runs of spaces collapse, and words wider than a
+    whole line are broken across lines.
+    """
+    lines: List[str] = []
+    space = text_width(font, ' ')
+    for paragraph in text.split('\n'):
+        line = ''
+        line_width = 0
+        for word in paragraph.split():
+            word_width = text_width(font, word)
+            if word_width > max_width:
+                pieces = _split_word(word, font, max_width)
+                if line:
+                    lines.append(line)
+                lines.extend(pieces[:-1])
+                line, line_width = pieces[-1], text_width(font, pieces[-1])
+            elif not line:
+                line, line_width = word, word_width
+            elif line_width + space + word_width <= max_width:
+                line += ' ' + word
+                line_width += space + word_width
+            else:
+                lines.append(line)
+                line, line_width = word, word_width
+        lines.append(line)
+    return lines
+
+
+def center_x(font: FontSpec, text: str, width: int, margin: int) -> int:
+    """Return the x offset that centers a line, never closer to the edge than the margin."""
+    return max(margin, (width - text_width(font, text)) // 2)
+
+
+def layout_receipt(task: str, time_str: str, task_font: FontSpec, time_font: FontSpec,
+                   width: int, margin: int, line_spacing: int = 4) -> Tuple[List[PlacedLine], int]:
+    """
+    Lay out a receipt: the wrapped task centered at the top, the timestamp below it.
+
+    Returns the placed lines and the y coordinate just below the last one.
+    """
+    placed: List[PlacedLine] = []
+    y = margin + 20  # Start task closer to top
+    for line in wrap_text(task, task_font, width - 2 * margin):
+        placed.append(PlacedLine(line, center_x(task_font, line, width, margin), y, task_font))
+        y += task_font.height + line_spacing
+    y += 40 - line_spacing  # Gap between task and timestamp
+    placed.append(PlacedLine(time_str, margin, y, time_font))
+    return placed, y + time_font.height
+
+
+def paginate(lines: List[PlacedLine], page_height: int, margin: int) -> List[List[PlacedLine]]:
+    """
+    Split placed lines into pages of at most ``page_height`` pixels.
+
+    Lines are never split across pages; lines on continuation pages are shifted
+    so the first one starts at the top margin.
+    """
+    pages: List[List[PlacedLine]] = []
+    page: List[PlacedLine] = []
+    offset = 0
+    for line in lines:
+        if page and line.y - offset + line.font.height > page_height - margin:
+            pages.append(page)
+            page = []
+        if not page:
+            # Continuation pages start at the top margin
+            offset = line.y - margin if pages else 0
+        page.append(PlacedLine(line.text, line.x, line.y - offset, line.font))
+    if page:
+        pages.append(page)
+    return pages
@@ -0,0 +1,243 @@
+"""
+Receipt templates for Receipt Task Printer.
+A template describes everything on a receipt around the task: header lines,
+the task body, the timestamp format, footer lines and the paper feed and cut.
+
+Templates are compiled once. Text that does not depend on the task is encoded
+to ESC/POS bytes and laid out up front, leaving a skeleton in which each
+receipt only fills in, wraps and measures the ``{task}`` and ``{time}``
+fields. Template files are JSON, for example::
+
+    {
+        "header": ["KITCHEN"],
+        "body": "{task}",
+        "timestamp": "Ordered {time}",
+        "time_format": "%H:%M",
+        "footer": [],
+        "feed_lines": 3,
+        "cut": true
+    }
+
+Compiled templates are cached and recompiled when the file changes.
+"""
+
+import json
+import os
+import string
+from dataclasses import dataclass, fields
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import escpos
+from receipt_layout import FontSpec, PlacedLine, center_x, wrap_text
+
+TEMPLATE_ENV_VAR = 'RECEIPT_TEMPLATE'  # Path of a JSON template; unset uses the default receipt
+FIELDS = ('task', 'time')  # Placeholders filled in per receipt
+
+LINE_SPACING = 4
+TOP_GAP = 20  # Above the first line, on top of the margin
+TIMESTAMP_GAP = 40  # Between the task and the timestamp
+
+
+@dataclass(frozen=True)
+class TemplateSpec:
+    """
+    The receipt layout as written in a template file; the defaults are the standard receipt.
+
+    ``task_height`` and ``text_height`` are font heights in pixels for GDI and
+    raster receipts; ESC/POS text receipts print the task in the printer's
+    double-size font and other lines in its normal font. ``bottom_padding``
+    (pixels) and ``feed_lines`` are the blank paper left below the last line.
+    """
+
+    header: Tuple[str, ...] = ()
+    body: str = '{task}'
+    timestamp: str = '{time}'  # Empty for no timestamp line
+    time_format: str = '%Y-%m-%d %H:%M'
+    footer: Tuple[str, ...] = ()
+    font: str = 'Arial'
+    task_height: int = 44  # Increased from 40 to 44 (4 points larger)
+    text_height: int = 20
+    bottom_padding: int = 120
+    feed_lines: int = escpos.BOTTOM_FEED_LINES
+    cut: bool = True
+
+
+# Compiled pieces of an ESC/POS receipt: ready bytes, or a function of the field values
+Part = Union[bytes, Callable[[Dict[str, str]], bytes]]
+
+
+def _fields_in(text: str) -> List[str]:
+    try:
+        names = [name for _, name, _, _ in string.Formatter().parse(text) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"Bad template text {text!r}: {e}") from None
+    for name in names:
+        if name not in FIELDS:
+            raise ValueError(f"Unknown template field {{{name}}} in {text!r}; "
+                             f"use {', '.join('{' + field + '}' for field in FIELDS)}")
+    return names
+
+
+class CompiledTemplate:
+    """
+    A template ready to fill in.
+
+    ``encode`` returns a complete ESC/POS receipt and ``layout`` the placed
+    lines of a GDI or raster receipt. Instances are safe to share between
+    threads.
+    """
+
+    def __init__(self, spec: TemplateSpec):
+        self.spec = spec
+        self.task_font = FontSpec(spec.font, spec.task_height, bold=True)
+        self.text_font = FontSpec(spec.font, spec.text_height)
+        self.uses_time = any('time' in _fields_in(text)
+                             for text in (*spec.header, spec.body, spec.timestamp, *spec.footer))
+        self.trailer = escpos.feed(spec.feed_lines) + (escpos.cut() if spec.cut else b'')
+        self._parts = self._compile_escpos()
+        self._static_header = not any(_fields_in(line) for line in spec.header)
+        self._header_layouts: Dict[tuple, Tuple[Tuple[PlacedLine, ...], int]] = {}
+
+    def format_time(self, timestamp: datetime) -> str:
+        return timestamp.strftime(self.spec.time_format) if self.uses_time else ''
+
+    def encode(self, task: str, timestamp: datetime) -> bytes:
+        """Encode one ESC/POS receipt, filling in only the fields of the skeleton."""
+        values = {'task': task, 'time': self.format_time(timestamp)}
+        return b''.join(part if type(part) is bytes else part(values) for part in self._parts)
+
+    def layout(self, task: str, time_str: str, task_font: FontSpec, text_font: FontSpec,
+               width: int, margin: int) -> Tuple[List[PlacedLine], int]:
+        """
+        Lay out a receipt with the given fonts; returns the placed lines and the y just below them.
+
+        The fonts are normally ``task_font`` and ``text_font``, or the fonts a
+        raster renderer substitutes for them. A header without fields is laid
+        out once per font and width.
+        """
+        values = {'task': task, 'time': time_str}
+        header, y = self._layout_header(values, text_font, width, margin)
+        placed = list(header)
+        for line in wrap_text(self.spec.body.format(**values), task_font, width - 2 * margin):
+            placed.append(PlacedLine(line, center_x(task_font, line, width, margin), y, task_font))
+            y += task_font.height + LINE_SPACING
+        if self.spec.timestamp:
+            y += TIMESTAMP_GAP - LINE_SPACING
+            placed.append(PlacedLine(self.spec.timestamp.format(**values), margin, y, text_font))
+            y += text_font.height
+        for line in self.spec.footer:
+            for text in wrap_text(line.format(**values), text_font, width - 2 * margin):
+                y += LINE_SPACING
+                placed.append(PlacedLine(text, center_x(text_font, text, width, margin), y, text_font))
+                y += text_font.height
+        return placed, y
+
+    def _layout_header(self, values: Dict[str, str], font: FontSpec, width: int,
+                       margin: int) -> Tuple[Sequence[PlacedLine], int]:
+        key = (font, width, margin)
+        if self._static_header and key in self._header_layouts:
+            return self._header_layouts[key]
+        placed = []
+        y = margin + TOP_GAP
+        for line in self.spec.header:
+            for text in wrap_text(line.format(**values), font, width - 2 * margin):
+                placed.append(PlacedLine(text, center_x(font, text, width, margin), y, font))
+                y += font.height + LINE_SPACING
+        result = (tuple(placed), y)
+        if self._static_header:
+            self._header_layouts[key] = result
+        return result
+
+    def _compile_escpos(self) -> List[Part]:
+        spec = self.spec
+        parts: List[Part] = [escpos.INIT]
+        if spec.header:
+            parts.append(escpos.ALIGN_CENTER)
+            parts.extend(self._compile_lines(line, escpos.FONT_A) for line in spec.header)
+        # Wrap on word boundaries ourselves; the printer would break mid-word
+        parts += [escpos.ALIGN_CENTER, escpos.SIZE_DOUBLE, escpos.BOLD_ON,
+                  self._compile_lines(spec.body, escpos.FONT_A_DOUBLE),
+                  escpos.BOLD_OFF, escpos.SIZE_NORMAL, escpos.ALIGN_LEFT]
+        if spec.timestamp:
+            parts += [escpos.LF, self._compile_lines(spec.timestamp, None)]
+        if spec.footer:
+            parts.append(escpos.ALIGN_CENTER)
+            parts.extend(self._compile_lines(line, escpos.FONT_A) for line in spec.footer)
+            parts.append(escpos.ALIGN_LEFT)
+        parts.append(self.trailer)
+        return _merge(parts)
+
+    @staticmethod
+    def _compile_lines(text: str, font: Optional[FontSpec]) -> Part:
+        """Encode text ending in a line feed, wrapped to the paper in ``font`` when given."""
+        def encode(values: Dict[str, str]) -> bytes:
+            filled = text.format(**values)
+            if font is not None:
+                filled = '\n'.join(wrap_text(filled, font, escpos.PRINT_WIDTH_DOTS))
+            return escpos.encode_text(filled) + escpos.LF
+
+        return encode if _fields_in(text) else encode({})
+
+
+def _merge(parts: List[Part]) -> List[Part]:
+    """Join runs of ready bytes so filling a receipt joins as few pieces as possible."""
+    merged: List[Part] = []
+    for part in parts:
+        if type(part) is bytes and merged and type(merged[-1]) is bytes:
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return merged
+
+
+def parse_template(data: dict) -> TemplateSpec:
+    """Build a template from the JSON object in a template file."""
+    if not isinstance(data, dict):
+        raise ValueError("A receipt template must be a JSON object")
+    known = {field.name: field for field in fields(TemplateSpec)}
+    unknown = sorted(set(data) - set(known))
+    if unknown:
+        raise ValueError(f"Unknown template keys: {', '.join(unknown)}")
+    values = {}
+    for name, value in data.items():
+        if name in ('header', 'footer'):
+            value = (value,) if isinstance(value, str) else tuple(value)
+            if not all(isinstance(line, str) for line in value):
+                raise ValueError(f"Template {name} must be a string or a list of strings")
+        elif not isinstance(value, type(known[name].default)):
+            raise ValueError(f"Template {name} must be {type(known[name].default).__name__}")
+        values[name] = value
+    return TemplateSpec(**values)
+
+
+def compile_template(spec: TemplateSpec) -> CompiledTemplate:
+    return CompiledTemplate(spec)
+
+
+DEFAULT_TEMPLATE = compile_template(TemplateSpec())
+
+
+@lru_cache(maxsize=8)
+def _load_template(path: str, mtime_ns: int, size: int) -> CompiledTemplate:
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Receipt template {path} is not valid JSON: {e}") from None
+    return compile_template(parse_template(data))
+
+
+def load_template(path: Optional[str] = None) -> CompiledTemplate:
+    """
+    Return the compiled template at ``path``, or the default receipt when there is none.
+
+    A template is compiled once and recompiled only after its file changes;
+    raises OSError or ValueError when the file cannot be read or is not a
+    valid template.
+    """
+    if not path:
+        return DEFAULT_TEMPLATE
+    stat = os.stat(path)
+    return _load_template(path, stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,102 @@
+"""
+Bulk task import for Receipt Task Printer.
+Reads tasks from pasted text, text files (one task per line) or a column of a
+CSV file. Sources are read lazily and handed out in chunks, so a long file is
+never held in memory and the GUI can add each chunk in one step.
+"""
+
+import csv
+import itertools
+import os
+from typing import Iterable, Iterator, List, Optional, TextIO, Union
+
+IMPORT_CHUNK_SIZE = 5000  # Tasks added to the list per UI update
+HEADER_SAMPLE_LINES = 20  # Lines read to guess whether a CSV file starts with a header
+
+Column = Union[int, str]  # 1-based column number, or header name
+
+
+def read_tasks(lines: Iterable[str]) -> Iterator[str]:
+    """Yield one task per non-blank line, stripped the same way the GUI strips input."""
+    for line in lines:
+        task = line.strip()
+        if task:
+            yield task
+
+
+def chunked(tasks: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Yield lists of at most ``size`` tasks without reading ahead of the current list."""
+    iterator = iter(tasks)
+    while True:
+        chunk = list(itertools.islice(iterator, max(1, size)))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_column(text: str) -> Column:
+    """Interpret user input as a 1-based column number, or else a header name."""
+    text = text.strip()
+    return int(text) if text.isdigit() else text
+
+
+def has_header(lines: Iterable[str]) -> bool:
+    """Guess whether CSV lines start with a row of column names; only reliable when some column is numeric."""
+    sample = '\n'.join(line.rstrip('\r\n') for line in itertools.islice(lines, HEADER_SAMPLE_LINES))
+    try:
+        return csv.Sniffer().has_header(sample)
+    except csv.Error:  # Too little to go on, e.g. a single column
+        return False
+
+
+def read_csv_tasks(lines: Iterable[str], column: Column = 1, header: Optional[bool] = None) -> Iterator[str]:
+    """
+    Yield the tasks in one column of CSV data.
+
+    A column given by name is looked up in the header row. With a column
+    number the first row is skipped when ``header`` is true, or when it is
+    None and the first row looks like a header. Short rows and blank cells
+    are skipped.
+    """
+    lines = iter(lines)
+    if header is None and not isinstance(column, str):
+        head = list(itertools.islice(lines, HEADER_SAMPLE_LINES))
+        header = has_header(head)
+        lines = itertools.chain(head, lines)
+    rows = csv.reader(lines)
+    if isinstance(column, str):
+        header = next(rows, [])
+        names = [name.strip().lower() for name in header]
+        if column.strip().lower() not in names:
+            raise ValueError(f"No column named {column!r} in the CSV header")
+        index = names.index(column.strip().lower())
+    else:
+        if column < 1:
+            raise ValueError("CSV column numbers start at 1")
+        index = column - 1
+        if header:
+            next(rows, None)
+    return read_tasks(row[index] for row in rows if len(row) > index)
+
+
+def is_csv(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == '.csv'
+
+
+def file_tasks(source: TextIO, path: str, column: Optional[Column] = None,
+               header: Optional[bool] = None) -> Iterator[str]:
+    """Yield the tasks in an open file: a CSV column for ``.csv`` files, otherwise one per line."""
+    if is_csv(path):
+        return read_csv_tasks(source, 1 if column is None else column, header)
+    return read_tasks(source)
+
+
+def file_has_header(path: str) -> bool:
+    """Guess whether a CSV file starts with a header row; raises OSError when it cannot be read."""
+    with open_tasks(path) as source:
+        return has_header(source)
+
+
+def open_tasks(path: str) -> TextIO:
+    """Open a task file; undecodable bytes are replaced rather than failing the import."""
+    return open(path, encoding='utf-8-sig', errors='replace', newline='')
@@ -0,0 +1,132 @@
+"""
+Virtual task list view for Receipt Task Printer.
+Keeps only the rows on screen in the Tk Listbox, so adding, removing or
+renumbering tasks touches at most a screenful of rows however long the queue
+is. The scrollbar is driven by the length of the backing list rather than by
+the Listbox contents.
+"""
+
+import tkinter.font as tkfont
+from typing import Callable, List, Optional
+
+WHEEL_ROWS = 3  # Rows scrolled per mouse wheel notch
+
+
+class VirtualListbox:
+    """
+    Shows rows ``first`` to ``first + page_rows`` of a backing list in a Listbox.
+
+    ``count`` returns the number of rows and ``row_text(index)`` the text of
+    one row; rows are only formatted while on screen. After changing the
+    backing list, call ``refresh`` with the first index that changed.
+    """
+
+    def __init__(self, listbox, scrollbar, count: Callable[[], int], row_text: Callable[[int], str],
+                 page_rows: Optional[int] = None):
+        self.listbox = listbox
+        self.scrollbar = scrollbar
+        self.count = count
+        self.row_text = row_text
+        self.page_rows = page_rows or int(listbox.cget('height'))
+        self.first = 0
+        self._rendered = 0  # Rows currently in the Listbox, starting at ``first``
+        self._line_height: Optional[int] = None
+
+        listbox.configure(yscrollcommand='')
+        scrollbar.configure(command=self.yview)
+        listbox.bind('<Configure>', self._on_configure)
+        listbox.bind('<MouseWheel>', self._on_wheel)
+        listbox.bind('<Button-4>', self._on_wheel)
+        listbox.bind('<Button-5>', self._on_wheel)
+        listbox.bind('<Up>', self._on_key)
+        listbox.bind('<Down>', self._on_key)
+
+    def refresh(self, start: int = 0) -> None:
+        """Redraw the rows from ``start`` on that are on screen; rows above it are kept."""
+        total = self.count()
+        first = max(0, min(self.first, total - self.page_rows))
+        if first != self.first:
+            self.first = start = first
+        end = min(total, first + self.page_rows)
+        keep = max(0, min(start - first, self._rendered, end - first))
+        if keep < self._rendered:
+            self.listbox.delete(keep, 'end')
+        if first + keep < end:
+            self.listbox.insert('end', *[self.row_text(index) for index in range(first + keep, end)])
+        self._rendered = end - first
+        self._update_scrollbar(total)
+
+    def selection(self) -> List[int]:
+        """Return the backing list indexes of the selected rows."""
+        return [self.first + int(row) for row in self.listbox.curselection()]
+
+    def select(self, index: int) -> None:
+        """Select one row by backing list index, scrolling it into view."""
+        self.see(index)
+        self.listbox.selection_clear(0, 'end')
+        self.listbox.selection_set(index - self.first)
+        self.listbox.activate(index - self.first)
+
+    def see(self, index: int) -> None:
+        if index < self.first:
+            self.scroll_to(index)
+        elif index >= self.first + self.page_rows:
+            self.scroll_to(index - self.page_rows + 1)
+
+    def scroll_to(self, first: int) -> None:
+        """Show rows from ``first`` on, keeping selected rows that stay on screen selected."""
+        first = max(0, min(first, self.count() - self.page_rows))
+        if first == self.first:
+            return
+        selected = self.selection()
+        self.first = first
+        self.refresh(first)
+        for index in selected:
+            if first <= index < first + self._rendered:
+                self.listbox.selection_set(index - first)
+
+    def yview(self, *args) -> None:
+        """Scrollbar command: ``moveto FRACTION`` or ``scroll N units|pages``."""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.count()))
+        elif args[0] == 'scroll':
+            step = int(args[1]) * (self.page_rows if args[2] == 'pages' else 1)
+            self.scroll_to(self.first + step)
+
+    def _update_scrollbar(self, total: int) -> None:
+        if total <= self.page_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self._rendered) / total)
+
+    def _on_wheel(self, event) -> str:
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_to(self.first + (-WHEEL_ROWS if up else WHEEL_ROWS))
+        return 'break'
+
+    def _on_key(self, event) -> Optional[str]:
+        """Scroll the window when the keyboard moves past its first or last row."""
+        selected = self.listbox.curselection()
+        if not selected:
+            return None
+        row = int(selected[0])
+        if event.keysym == 'Up' and row == 0 and self.first > 0:
+            self.select(self.first - 1)
+            return 'break'
+        if event.keysym == 'Down' and row == self._rendered - 1 and self.first + row + 1 < self.count():
+            self.select(self.first + row + 1)
+            return 'break'
+        return None
+
+    def _on_configure(self, event) -> None:
+        """Fit the number of rendered rows to the Listbox height after a resize."""
+        if self._line_height is None:
+            font = tkfont.Font(font=self.listbox.cget('font'))
+            # Tk pads each Listbox line by one pixel plus the selection border
+            self._line_height = (font.metrics('linespace') + 1
+                                 + 2 * int(self.listbox.cget('selectborderwidth')))
+        border = int(self.listbox.cget('borderwidth')) + int(self.listbox.cget('highlightthickness'))
+        rows = max(1, (event.height - 2 * border) // self._line_height)
+        if rows != self.page_rows:
+            self.page_rows = rows
+            self.refresh(self.first + self._rendered)
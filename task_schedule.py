@@ -0,0 +1,314 @@
+"""
+Scheduled printing for Receipt Task Printer.
+Prints fixed sets of tasks at set times: once, or again and again on a
+cron-like rule such as every weekday at 07:30 for an opening checklist.
+
+Due times are kept in a heap, so finding the next job is O(1) and adding or
+running one is O(log n). The GUI sets a single timer for the earliest due
+time instead of polling, so thousands of scheduled jobs cost nothing while
+they wait. Schedule files are JSON, for example::
+
+    [
+        {"name": "Opening checklist", "cron": "30 7 * * mon-sat",
+         "tasks": ["Unlock doors", "Start coffee machine"], "printer": "RONGTA Kitchen"},
+        {"name": "Stock count", "at": "2025-06-01 09:00", "tasks": ["Count the bar stock"]}
+    ]
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_ENV_VAR = 'RECEIPT_SCHEDULE'  # Path of a JSON schedule file
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * sun',
+    '@monthly': '0 0 1 * *',
+}
+_MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+_WEEKDAYS = ('sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat')
+MAX_SEARCH_YEARS = 8  # Long enough for 29 February to come around
+COMPACT_MIN_STALE = 64  # Cancelled heap entries kept before the heap is rebuilt
+
+
+def _parse_field(text: str, low: int, high: int, names: Sequence[str] = (), name_base: int = 0) -> FrozenSet[int]:
+    """Parse one cron field: ``*``, numbers, names, ranges ``a-b``, steps ``/n`` and comma lists."""
+    def number(token: str) -> int:
+        token = token.lower()
+        if token in names:
+            return names.index(token) + name_base
+        if not token.isdigit():
+            raise ValueError(f"Bad cron value {token!r}")
+        return int(token)
+
+    values = set()
+    for part in text.split(','):
+        spec, _, step_text = part.partition('/')
+        step = int(step_text) if step_text.isdigit() else 0
+        if step_text and step < 1:
+            raise ValueError(f"Bad cron step in {part!r}")
+        if spec == '*':
+            first, last = low, high
+        elif '-' in spec:
+            first_text, _, last_text = spec.partition('-')
+            first, last = number(first_text), number(last_text)
+        else:
+            first = number(spec)
+            last = high if step else first
+        if not low <= first <= last <= high:
+            raise ValueError(f"Cron field {part!r} is outside {low}-{high}")
+        values.update(range(first, last + 1, step or 1))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronRule:
+    """
+    When a recurring job is due, as in the five fields of a crontab line.
+
+    Minute, hour, day of month, month and day of week; day of week 0 and 7
+    are Sunday. As in cron, when both day fields are restricted a day that
+    matches either one is due.
+    """
+
+    minutes: Tuple[int, ...]
+    hours: Tuple[int, ...]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]  # Python weekday numbers, Monday is 0
+    any_day: bool
+    any_weekday: bool
+    text: str = ''
+
+    def __str__(self) -> str:
+        return self.text
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, after: datetime) -> datetime:
+        """The first due minute strictly after ``after``."""
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = t.year + MAX_SEARCH_YEARS
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = datetime(t.year + t.month // 12, t.month % 12 + 1, 1)
+            elif not self._day_matches(t):
+                t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+            else:
+                # Jump straight to the next due hour and minute of the day
+                i = bisect_left(self.hours, t.hour)
+                if i == len(self.hours):
+                    t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                    continue
+                if self.hours[i] != t.hour:
+                    t = t.replace(hour=self.hours[i], minute=0)
+                j = bisect_left(self.minutes, t.minute)
+                if j < len(self.minutes):
+                    return t.replace(minute=self.minutes[j])
+                t = t.replace(minute=0) + timedelta(hours=1)
+        raise ValueError(f"Cron rule {self.text!r} is never due")
+
+
+def parse_cron(text: str) -> CronRule:
+    """Parse ``minute hour day month weekday``, or an alias such as ``@daily``."""
+    expanded = ALIASES.get(text.strip().lower(), text)
+    fields = expanded.split()
+    if len(fields) != 5:
+        raise ValueError(f"A cron rule needs five fields (minute hour day month weekday): {text!r}")
+    minute, hour, day, month, weekday = fields
+    weekdays = _parse_field(weekday, 0, 7, _WEEKDAYS)
+    return CronRule(
+        minutes=tuple(sorted(_parse_field(minute, 0, 59))),
+        hours=tuple(sorted(_parse_field(hour, 0, 23))),
+        days=_parse_field(day, 1, 31),
+        months=_parse_field(month, 1, 12, _MONTHS, 1),
+        weekdays=frozenset((cron_day - 1) % 7 for cron_day in weekdays),
+        any_day=day == '*',
+        any_weekday=weekday == '*',
+        text=text.strip(),
+    )
+
+
+@dataclass(frozen=True)
+class ScheduledJob:
+    """Tasks to print when the job is due; ``printer`` None prints to the selected printer."""
+
+    id: int
+    name: str
+    tasks: Tuple[str, ...]
+    printer: Optional[str] = None
+    rule: Optional[CronRule] = None  # None for a one-shot job
+
+
+class TaskScheduler:
+    """
+    One-shot and recurring print jobs ordered by due time.
+
+    Not thread-safe; the GUI uses it from the Tk thread only. Times are
+    seconds since the epoch, as from ``time.time``. A recurring job that
+    missed several due times, e.g. while the computer slept, runs once and is
+    then due at its next time after now.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._heap: List[Tuple[float, int, int]] = []  # (due, insertion order, job id)
+        self._jobs: Dict[int, ScheduledJob] = {}
+        self._due: Dict[int, float] = {}
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._stale = 0  # Heap entries of cancelled jobs, dropped lazily
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def jobs(self) -> List[ScheduledJob]:
+        """Scheduled jobs, soonest first."""
+        return sorted(self._jobs.values(), key=lambda job: self._due[job.id])
+
+    def due_time(self, job_id: int) -> Optional[float]:
+        return self._due.get(job_id)
+
+    def now(self) -> float:
+        """The current time on the scheduler's clock."""
+        return self._clock()
+
+    def add_once(self, when: Union[datetime, float], tasks: Sequence[str], printer: Optional[str] = None,
+                 name: str = '') -> int:
+        """Schedule ``tasks`` to print once at ``when``; returns the job id."""
+        due = when.timestamp() if isinstance(when, datetime) else float(when)
+        return self._add(due, tasks, printer, name, None)
+
+    def add_recurring(self, rule: Union[CronRule, str], tasks: Sequence[str], printer: Optional[str] = None,
+                      name: str = '') -> int:
+        """Schedule ``tasks`` to print every time ``rule`` is due; returns the job id."""
+        if isinstance(rule, str):
+            rule = parse_cron(rule)
+        due = rule.next_after(datetime.fromtimestamp(self.now())).timestamp()
+        return self._add(due, tasks, printer, name, rule)
+
+    def cancel(self, job_id: int) -> bool:
+        """Remove a job; False if there is no such job."""
+        if self._jobs.pop(job_id, None) is None:
+            return False
+        del self._due[job_id]
+        self._stale += 1
+        if self._stale > COMPACT_MIN_STALE and self._stale * 2 >= len(self._heap):
+            self._heap = [entry for entry in self._heap if self._due.get(entry[2]) == entry[0]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+        return True
+
+    def next_due(self) -> Optional[float]:
+        """When the earliest job is due, or None when nothing is scheduled."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[ScheduledJob]:
+        """Take the jobs due by ``now``, in due order; recurring jobs are scheduled again."""
+        now = self.now() if now is None else now
+        due_jobs = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job_id = heapq.heappop(self._heap)
+            job = self._jobs[job_id]
+            due_jobs.append(job)
+            if job.rule is None:
+                del self._jobs[job_id]
+                del self._due[job_id]
+            else:
+                self._push(job_id, job.rule.next_after(datetime.fromtimestamp(now)).timestamp())
+            self._drop_stale()
+        return due_jobs
+
+    def _add(self, due: float, tasks: Sequence[str], printer: Optional[str], name: str,
+             rule: Optional[CronRule]) -> int:
+        tasks = tuple(tasks)
+        if not tasks or not all(task.strip() for task in tasks):
+            raise ValueError("A scheduled job needs at least one task, and no blank ones")
+        job_id = next(self._ids)
+        self._jobs[job_id] = ScheduledJob(job_id, name or f"Scheduled job {job_id}", tasks, printer or None, rule)
+        self._push(job_id, due)
+        return job_id
+
+    def _push(self, job_id: int, due: float) -> None:
+        self._due[job_id] = due
+        heapq.heappush(self._heap, (due, next(self._order), job_id))
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._due.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+            self._stale -= 1
+
+
+def load_schedule(path: str, scheduler: TaskScheduler) -> List[int]:
+    """
+    Add the jobs in a JSON schedule file to ``scheduler``; returns their ids.
+
+    Each entry has ``tasks`` (a string or a list), either ``cron`` or ``at``
+    (``YYYY-MM-DD HH:MM``), and optionally ``name`` and ``printer``. One-shot
+    jobs whose time has passed are skipped. Raises OSError or ValueError when
+    the file cannot be read or an entry is invalid; every entry is checked
+    before any is added, so a bad file adds nothing.
+    """
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Schedule {path} is not valid JSON: {e}") from None
+    if not isinstance(data, list):
+        raise ValueError(f"Schedule {path} must be a JSON list of jobs")
+    now = scheduler.now()
+    entries = []
+    for number, entry in enumerate(data, 1):
+        if not isinstance(entry, dict) or ('cron' in entry) == ('at' in entry):
+            raise ValueError(f"Schedule entry {number} needs either 'cron' or 'at'")
+        unknown = sorted(set(entry) - {'name', 'tasks', 'printer', 'cron', 'at'})
+        if unknown:
+            raise ValueError(f"Schedule entry {number} has unknown keys: {', '.join(unknown)}")
+        tasks = entry.get('tasks')
+        tasks = [tasks] if isinstance(tasks, str) else tasks
+        if (not tasks or not isinstance(tasks, list)
+                or not all(isinstance(task, str) and task.strip() for task in tasks)):
+            raise ValueError(f"Schedule entry {number} needs 'tasks': a string or a list of non-blank strings")
+        name, printer = entry.get('name', ''), entry.get('printer')
+        if 'cron' in entry:
+            try:
+                rule = parse_cron(str(entry['cron']))
+                rule.next_after(datetime.fromtimestamp(now))
+            except ValueError as e:
+                raise ValueError(f"Schedule entry {number}: {e}") from None
+            entries.append((rule, tasks, printer, name))
+            continue
+        try:
+            when = datetime.fromisoformat(str(entry['at']))
+        except ValueError:
+            raise ValueError(f"Schedule entry {number}: 'at' must be YYYY-MM-DD HH:MM, not {entry['at']!r}") from None
+        if when.timestamp() <= now:
+            logger.warning("Skipping schedule entry %s: %s has passed", number, entry['at'])
+            continue
+        entries.append((when, tasks, printer, name))
+    job_ids = []
+    for due, tasks, printer, name in entries:
+        if isinstance(due, CronRule):
+            job_ids.append(scheduler.add_recurring(due, tasks, printer, name))
+        else:
+            job_ids.append(scheduler.add_once(due, tasks, printer, name))
+    logger.info("Loaded %d scheduled job(s) from %s", len(job_ids), path)
+    return job_ids
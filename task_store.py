@@ -0,0 +1,322 @@
+"""
+Task store for Receipt Task Printer.
+Holds the task list in display order, with a stable ID and per-task fields
+(created time, priority, status and target printer) for every task.
+
+Fields live in parallel typed arrays indexed by slot rather than in one object
+per task, and freed slots are reused, so a queue of 100,000 tasks costs little
+more than the task text itself. The display order is a list of blocks of slots
+with a Fenwick tree over the block lengths: finding, inserting or removing the
+task at a position takes O(log n) plus a shift within one block.
+"""
+
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+QUEUED = 0
+PRINTING = 1  # Handed to a print job; out of the list until restored or removed
+FAILED = 2  # Back in the list after its last print attempt failed
+STATUS_NAMES = ('queued', 'printing', 'failed')
+
+NORMAL_PRIORITY = 0  # Priorities are small signed integers, -128 to 127
+ANY_PRINTER = ''
+
+BLOCK_SIZE = 512  # Slots per block of the display order
+
+
+class Task(NamedTuple):
+    """A snapshot of one task's fields."""
+
+    id: int
+    text: str
+    created: float
+    priority: int
+    status: int
+    printer: str  # Target printer, or ANY_PRINTER
+
+
+class TaskStore:
+    """
+    Ordered task list with stable IDs.
+
+    Positions are 0-based indexes into the display order. Tasks taken for
+    printing keep their ID and fields but leave the order until ``restore``
+    puts them back or ``remove`` forgets them. Not thread safe; the GUI uses
+    it from the Tk thread only.
+    """
+
+    def __init__(self, block_size: int = BLOCK_SIZE):
+        self.block_size = max(1, block_size)
+        self._texts: List[Optional[str]] = []
+        self._ids = array('q')
+        self._created = array('d')
+        self._priority = array('b')
+        self._status = array('B')
+        self._printer = array('H')  # Index into _printer_names
+        self._printer_names: List[str] = [ANY_PRINTER]
+        self._printer_index: Dict[str, int] = {ANY_PRINTER: 0}
+        self._free: List[int] = []
+        self._slot_of: Dict[int, int] = {}
+        self._status_counts = [0] * len(STATUS_NAMES)
+        self._next_id = 1
+        self._blocks: List[array] = []
+        self._tree: List[int] = [0]  # Fenwick tree over block lengths, 1-based
+        self._length = 0
+
+    def __len__(self) -> int:
+        """Number of tasks in the list; tasks out for printing are not counted."""
+        return self._length
+
+    def __iter__(self) -> Iterator[int]:
+        """Yield the task IDs in display order."""
+        ids = self._ids
+        for block in self._blocks:
+            for slot in block:
+                yield ids[slot]
+
+    def __contains__(self, task_id: int) -> bool:
+        return task_id in self._slot_of
+
+    def ids(self) -> List[int]:
+        return list(self)
+
+    def texts(self) -> List[str]:
+        texts = self._texts
+        return [texts[slot] for block in self._blocks for slot in block]
+
+    def count(self, status: int) -> int:
+        """Number of tasks with a status, including tasks out for printing."""
+        return self._status_counts[status]
+
+    def ids_with_status(self, status: int) -> List[int]:
+        """IDs of the listed tasks with a status, in display order."""
+        ids, statuses = self._ids, self._status
+        return [ids[slot] for block in self._blocks for slot in block if statuses[slot] == status]
+
+    def add(self, texts: Sequence[str], ids: Optional[Sequence[int]] = None,
+            position: Optional[int] = None, priority: int = NORMAL_PRIORITY,
+            printer: str = ANY_PRINTER, created: Optional[float] = None) -> List[int]:
+        """
+        Add tasks at ``position`` (the end by default) and return their IDs.
+
+        IDs are assigned here unless given, e.g. by the print journal; given
+        IDs must not already be in the store.
+        """
+        if ids is None:
+            ids = range(self._next_id, self._next_id + len(texts))
+        elif len(ids) != len(texts):
+            raise ValueError("One ID is needed per task")
+        if len(set(ids)) < len(ids) or any(task_id in self._slot_of for task_id in ids):
+            raise ValueError("Task IDs must be new and unique")
+        if position is not None and not 0 <= position <= self._length:
+            raise IndexError(f"Task position {position} out of range")
+        created = time.time() if created is None else created
+        printer_index = self._intern(printer)
+        slots = array('I', (self._allocate(task_id, text, created, priority, printer_index)
+                            for task_id, text in zip(ids, texts)))
+        if ids:
+            self._next_id = max(self._next_id, max(ids) + 1)
+        self._insert(self._length if position is None else position, slots)
+        return list(ids)
+
+    def get(self, task_id: int) -> Task:
+        return self._task(self._slot_of[task_id])
+
+    def task_at(self, position: int) -> Task:
+        """The task shown at a position."""
+        block, offset = self._locate(self._check_position(position))
+        return self._task(self._blocks[block][offset])
+
+    def id_at(self, position: int) -> int:
+        block, offset = self._locate(self._check_position(position))
+        return self._ids[self._blocks[block][offset]]
+
+    def set_status(self, task_ids: Iterable[int], status: int) -> None:
+        for task_id in task_ids:
+            slot = self._slot_of[task_id]
+            self._status_counts[self._status[slot]] -= 1
+            self._status_counts[status] += 1
+            self._status[slot] = status
+
+    def set_priority(self, task_ids: Iterable[int], priority: int) -> None:
+        for task_id in task_ids:
+            self._priority[self._slot_of[task_id]] = priority
+
+    def set_printer(self, task_ids: Iterable[int], printer: str) -> None:
+        printer_index = self._intern(printer)
+        for task_id in task_ids:
+            self._printer[self._slot_of[task_id]] = printer_index
+
+    def move(self, position: int, new_position: int) -> None:
+        """Move the task at ``position`` so that it ends up at ``new_position``."""
+        self._check_position(new_position)
+        slot = self._delete(self._check_position(position))
+        self._insert(new_position, array('I', [slot]))
+
+    def remove_at(self, positions: Iterable[int]) -> List[Task]:
+        """Remove the tasks at several positions, e.g. a multiple selection, and return them."""
+        removed = []
+        # From the last position backwards, so earlier positions stay valid
+        for position in sorted(set(positions), reverse=True):
+            slot = self._delete(self._check_position(position))
+            removed.append(self._task(slot))
+            self._release(slot)
+        removed.reverse()
+        return removed
+
+    def remove(self, task_ids: Iterable[int]) -> None:
+        """Forget tasks by ID, whether listed or out for printing; one pass over the list."""
+        slots = {self._slot_of[task_id] for task_id in task_ids if task_id in self._slot_of}
+        if any(self._status[slot] != PRINTING for slot in slots):
+            self._set_order(slot for block in self._blocks for slot in block if slot not in slots)
+        for slot in slots:
+            self._release(slot)
+
+    def clear(self) -> List[int]:
+        """Remove every listed task and return their IDs; tasks out for printing are kept."""
+        ids = self.ids()
+        self.remove(ids)
+        return ids
+
+    def take(self, task_ids: Iterable[int], printer: str = ANY_PRINTER) -> List[Task]:
+        """
+        Take tasks out of the list for printing, in display order.
+
+        They keep their IDs and fields, with status PRINTING and ``printer`` as
+        their target, until ``restore`` or ``remove``.
+        """
+        wanted = set(task_ids)
+        ids = self._ids
+        taken = array('I')
+        kept = array('I')
+        for block in self._blocks:
+            for slot in block:
+                (taken if ids[slot] in wanted else kept).append(slot)
+        if taken:
+            self._set_order(kept)
+            self.set_status((ids[slot] for slot in taken), PRINTING)
+            self.set_printer((ids[slot] for slot in taken), printer)
+        return [self._task(slot) for slot in taken]
+
+    def restore(self, task_ids: Sequence[int], position: int = 0) -> None:
+        """Put tasks taken for printing back in the list as queued, at ``position``."""
+        slots = array('I', (self._slot_of[task_id] for task_id in task_ids))
+        for slot in slots:
+            if self._status[slot] != PRINTING:
+                raise ValueError(f"Task {self._ids[slot]} is already in the list")
+        self.set_status(task_ids, QUEUED)
+        self._insert(position, slots)
+
+    def _task(self, slot: int) -> Task:
+        return Task(self._ids[slot], self._texts[slot], self._created[slot], self._priority[slot],
+                    self._status[slot], self._printer_names[self._printer[slot]])
+
+    def _intern(self, printer: str) -> int:
+        index = self._printer_index.get(printer)
+        if index is None:
+            index = self._printer_index[printer] = len(self._printer_names)
+            self._printer_names.append(printer)
+        return index
+
+    def _allocate(self, task_id: int, text: str, created: float, priority: int, printer_index: int) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._texts[slot] = text
+            self._ids[slot] = task_id
+            self._created[slot] = created
+            self._priority[slot] = priority
+            self._status[slot] = QUEUED
+            self._printer[slot] = printer_index
+        else:
+            slot = len(self._texts)
+            self._texts.append(text)
+            self._ids.append(task_id)
+            self._created.append(created)
+            self._priority.append(priority)
+            self._status.append(QUEUED)
+            self._printer.append(printer_index)
+        self._slot_of[task_id] = slot
+        self._status_counts[QUEUED] += 1
+        return slot
+
+    def _release(self, slot: int) -> None:
+        del self._slot_of[self._ids[slot]]
+        self._status_counts[self._status[slot]] -= 1
+        self._texts[slot] = None
+        self._free.append(slot)
+
+    def _check_position(self, position: int) -> int:
+        if not 0 <= position < self._length:
+            raise IndexError(f"Task position {position} out of range")
+        return position
+
+    def _locate(self, position: int):
+        """Return ``(block, offset)`` of a position; the end maps past the last block."""
+        tree = self._tree
+        block = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = block + step
+            if nxt < len(tree) and tree[nxt] <= position:
+                block = nxt
+                position -= tree[nxt]
+            step >>= 1
+        return block, position
+
+    def _insert(self, position: int, slots: array) -> None:
+        if not slots:
+            return
+        if not 0 <= position <= self._length:
+            raise IndexError(f"Task position {position} out of range")
+        if not self._blocks:
+            self._set_order(slots)
+            return
+        block, offset = self._locate(position)
+        if block == len(self._blocks):
+            block -= 1
+            offset = len(self._blocks[block])
+        slots_in_block = self._blocks[block]
+        slots_in_block[offset:offset] = slots
+        self._length += len(slots)
+        if len(slots_in_block) > 2 * self.block_size:
+            size = self.block_size
+            self._blocks[block:block + 1] = [slots_in_block[i:i + size]
+                                             for i in range(0, len(slots_in_block), size)]
+            self._rebuild_tree()
+        else:
+            self._adjust(block, len(slots))
+
+    def _delete(self, position: int) -> int:
+        block, offset = self._locate(position)
+        slots_in_block = self._blocks[block]
+        slot = slots_in_block.pop(offset)
+        self._length -= 1
+        if slots_in_block:
+            self._adjust(block, -1)
+        else:
+            del self._blocks[block]
+            self._rebuild_tree()
+        return slot
+
+    def _set_order(self, slots: Iterable[int]) -> None:
+        slots = array('I', slots)
+        size = self.block_size
+        self._blocks = [slots[i:i + size] for i in range(0, len(slots), size)]
+        self._length = len(slots)
+        self._rebuild_tree()
+
+    def _adjust(self, block: int, delta: int) -> None:
+        i = block + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _rebuild_tree(self) -> None:
+        tree = [0] * (len(self._blocks) + 1)
+        for i, slots in enumerate(self._blocks, 1):
+            tree[i] += len(slots)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the queued, rotating log setup.
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app_logging
+
+
+class TestAppLogging(unittest.TestCase):
+    """Test cases for app_logging."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'receipt_tasks.log')
+        root = logging.getLogger()
+        saved_handlers, saved_level = root.handlers[:], root.level
+
+        def restore():
+            app_logging.shutdown_logging()
+            root.handlers[:] = saved_handlers
+            root.setLevel(saved_level)
+        self.addCleanup(restore)
+        self.logger = logging.getLogger('test_app_logging')
+
+    def _read(self):
+        app_logging.shutdown_logging()
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_records_are_written_by_listener(self):
+        app_logging.setup_logging(path=self.path, console=False)
+
+        self.logger.info("Task added: %s", "Buy milk")
+        self.logger.debug("Not written")
+
+        lines = self._read()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith(" - INFO - Task added: Buy milk"))
+
+    def test_messages_are_formatted_off_the_logging_thread(self):
+        formatted_on = []
+
+        class Arg:
+            def __str__(self):
+                formatted_on.append(threading.current_thread())
+                return 'arg'
+
+        app_logging.setup_logging(path=self.path, console=False)
+        self.logger.info("Value %s", Arg())
+        self.logger.debug("Disabled %s", Arg())
+        self._read()
+
+        # The size check before each write formats the record as well
+        self.assertTrue(formatted_on)
+        self.assertNotIn(threading.current_thread(), formatted_on)
+
+    def test_json_lines_format(self):
+        app_logging.setup_logging(path=self.path, log_format=app_logging.JSON_LINES, console=False)
+
+        self.logger.warning("Printer %s offline", "RONGTA")
+        try:
+            raise OSError("Out of paper")
+        except OSError:
+            self.logger.exception("Print failed")
+
+        entries = [json.loads(line) for line in self._read()]
+        self.assertEqual(entries[0]['message'], "Printer RONGTA offline")
+        self.assertEqual(entries[0]['level'], 'WARNING')
+        self.assertEqual(entries[0]['logger'], 'test_app_logging')
+        self.assertIn("OSError: Out of paper", entries[1]['exception'])
+
+    def test_log_file_rotates_by_size(self):
+        os.environ[app_logging.MAX_BYTES_ENV_VAR] = '200'
+        os.environ[app_logging.BACKUPS_ENV_VAR] = '2'
+        self.addCleanup(os.environ.pop, app_logging.MAX_BYTES_ENV_VAR)
+        self.addCleanup(os.environ.pop, app_logging.BACKUPS_ENV_VAR)
+        app_logging.setup_logging(path=self.path, console=False)
+
+        for i in range(50):
+            self.logger.info("Task added: %d", i)
+        app_logging.shutdown_logging()
+
+        self.assertEqual(sorted(os.listdir(self.tmp.name)),
+                         ['receipt_tasks.log', 'receipt_tasks.log.1', 'receipt_tasks.log.2'])
+        self.assertLessEqual(os.path.getsize(self.path), 200)
+
+    def test_unknown_format_is_rejected(self):
+        with self.assertRaises(ValueError):
+            app_logging.setup_logging(path=self.path, log_format='xml', console=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
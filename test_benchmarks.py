@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the benchmark harness.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import benchmarks
+from benchmarks import RATE, SECONDS
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for benchmarks."""
+
+    def setUp(self):
+        stderr = patch('sys.stderr', new_callable=io.StringIO)
+        self.stderr = stderr.start()
+        self.addCleanup(stderr.stop)
+
+    def test_compare_flags_slower_times_and_lower_rates(self):
+        baseline = {
+            'layout': {'value': 1.0, 'unit': SECONDS},
+            'encode': {'value': 1.0, 'unit': SECONDS},
+            'e2e': {'value': 100.0, 'unit': RATE},
+            'faster': {'value': 1.0, 'unit': SECONDS},
+        }
+        results = {
+            'layout': {'value': 1.5, 'unit': SECONDS},
+            'encode': {'value': 1.1, 'unit': SECONDS},
+            'e2e': {'value': 50.0, 'unit': RATE},
+            'faster': {'value': 0.1, 'unit': SECONDS},
+            'new': {'value': 1.0, 'unit': SECONDS},
+        }
+
+        regressions = benchmarks.compare(results, baseline, threshold=0.25)
+
+        self.assertEqual([r.split(':')[0] for r in regressions], ['layout', 'e2e'])
+
+    def test_fake_printer_latency_limits_rate(self):
+        backend = benchmarks.FakePrinterBackend(latency=0.01)
+
+        rate = benchmarks._print_rate(backend, benchmarks.BENCH_PRINTER, 5)
+
+        self.assertLess(rate, 100)
+
+    def test_baseline_comparison_sets_exit_status(self):
+        report = {'meta': {}, 'results': {}, 'skipped': {}}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.json')
+            with open(path, 'w') as f:
+                json.dump({'results': {'e2e.fake.text': {'value': 1e9, 'unit': RATE}}}, f)
+            report['results'] = {'e2e.fake.text': {'value': 1.0, 'unit': RATE}}
+            with patch('benchmarks.run', return_value=report):
+                self.assertEqual(benchmarks.main(['--no-gui', '--baseline', path]), 1)
+            report['results'] = {'e2e.fake.text': {'value': 1e9, 'unit': RATE}}
+            output = os.path.join(tmp, 'results.json')
+            with patch('benchmarks.run', return_value=report):
+                self.assertEqual(benchmarks.main(['--no-gui', '-b', path, '-o', output]), 0)
+            with open(output) as f:
+                self.assertEqual(json.load(f)['results'], report['results'])
+        self.assertIn('REGRESSION e2e.fake.text', self.stderr.getvalue())
+
+    def test_receipt_benchmarks_record_every_mode(self):
+        results = {}
+
+        benchmarks.bench_receipts(results, 2)
+        benchmarks.bench_end_to_end(results, 2, latency=0.0)
+
+        for mode in benchmarks._modes():
+            self.assertGreater(results[f'receipt.encode.{mode}']['value'], 0)
+            self.assertGreater(results[f'e2e.fake.{mode}']['value'], 0)
+        self.assertEqual(results['e2e.emulator.text']['unit'], RATE)
+
+
+if __name__ == '__main__':
+    unittest.main()
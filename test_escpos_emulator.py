@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the ESC/POS printer emulator, including end-to-end printing
+through the ESC/POS backend over TCP.
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escpos
+import printer_status
+import printer_utils
+import raster
+from escpos_emulator import (BUSY, OFFLINE, PAPER_OUT, EscPosEmulator, EscPosParser,
+                             RealTimeScanner, parse_stream, save_receipt)
+
+TIMESTAMP = datetime(2025, 1, 2, 3, 4)
+
+
+class TestEscPosParser(unittest.TestCase):
+    """Test cases for parsing ESC/POS streams."""
+
+    def test_text_receipts(self):
+        """Test that each cut ends a receipt and its text is recovered."""
+        data = escpos.encode_receipt("Task 1", "2025-01-02 03:04") + escpos.encode_receipt("Task 2", "x")
+        receipts = parse_stream(data)
+        self.assertEqual([r.text for r in receipts], ["Task 1\n\n2025-01-02 03:04", "Task 2\n\nx"])
+        self.assertEqual([r.number for r in receipts], [1, 2])
+
+    def test_byte_by_byte(self):
+        """Test that commands split across reads are parsed the same."""
+        data = escpos.encode_receipt("A long task that wraps onto a second line", "time")
+        receipts = []
+        parser = EscPosParser(receipts.append)
+        for byte in data:
+            parser.feed(bytes([byte]))
+        self.assertEqual([r.text for r in receipts], [r.text for r in parse_stream(data)])
+
+    @unittest.skipUnless(raster.available(), "numpy and Pillow are not installed")
+    def test_raster_receipt(self):
+        """Test that raster images are decoded to bitmaps of the printed height."""
+        backend = printer_utils.EscPosBackend({}, discover_devices=False, mode=printer_utils.ESCPOS_RASTER)
+        [receipt] = parse_stream(backend.encode_receipt("Task", TIMESTAMP))
+        self.assertGreater(receipt.images, 0)
+        self.assertEqual(receipt.text, "")
+        self.assertGreater(receipt.height_dots, 100)
+
+    def test_save_receipt(self):
+        """Test that receipts are written as text, and PNG when raster support is installed."""
+        [receipt] = parse_stream(escpos.encode_receipt("Task", "time"))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            base = save_receipt(receipt, tmpdir)
+            with open(base + ".txt", encoding="utf-8") as f:
+                self.assertEqual(f.read(), "Task\n\ntime\n")
+            self.assertEqual(os.path.exists(base + ".png"), raster.available())
+
+
+class TestRealTimeScanner(unittest.TestCase):
+    """Test cases for finding status requests as data arrives."""
+
+    def test_request_split_across_reads(self):
+        """Test that a DLE EOT request split between two reads is found once it is complete."""
+        scanner = RealTimeScanner()
+        self.assertEqual(scanner.feed(b"Task\n\x10\x04"), [])
+        self.assertEqual(scanner.feed(b"\x01\x10"), [1])
+        self.assertEqual(scanner.feed(b"\x04\x04"), [4])
+
+    def test_image_data_is_not_a_request(self):
+        """Test that DLE EOT bytes inside raster image data are skipped, even when the image is split."""
+        image = escpos.raster_header(4, 2) + b"\x10\x04\x01\x00\x00\x10\x04\x02"
+        data = image + printer_status.STATUS_QUERY
+        self.assertEqual(RealTimeScanner().feed(data), [1, 2, 4])
+        scanner = RealTimeScanner()
+        requests = [n for i in range(0, len(data), 5) for n in scanner.feed(data[i:i + 5])]
+        self.assertEqual(requests, [1, 2, 4])
+        # The image itself still prints
+        self.assertEqual(parse_stream(image + escpos.cut())[0].images, 1)
+
+
+class TestEscPosEmulator(unittest.TestCase):
+    """Test cases for the TCP emulator, printed to through EscPosBackend."""
+
+    def setUp(self):
+        self.emulator = EscPosEmulator(port=0).start()
+        self.addCleanup(self.emulator.stop)
+        self.backend = printer_utils.EscPosBackend({"Emulator": self.emulator.target},
+                                                   timeout=5, discover_devices=False)
+        printer_status.board.clear()
+        patcher = patch("printer_status.POLL_INTERVAL", 0.02)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_end_to_end(self):
+        """Test that a batch printed through the backend arrives as separate receipts."""
+        results = self.backend.print_batch("Emulator", ["Task 1", "Task 2", "Task 3"], TIMESTAMP)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertTrue(self.emulator.wait_for_receipts(3))
+        self.assertEqual([r.lines[0] for r in self.emulator.receipts], ["Task 1", "Task 2", "Task 3"])
+        self.assertEqual(self.emulator.connections, 1)
+
+    def test_paper_speed(self):
+        """Test that printing takes as long as the paper movement at the simulated speed."""
+        self.emulator.paper_speed = 200  # mm/s, 1600 dots/s
+        self.backend.print_batch("Emulator", ["Task"], TIMESTAMP)
+        start = time.perf_counter()
+        self.assertTrue(self.emulator.wait_for_receipts(1))
+        expected = self.emulator.receipts[0].height_dots / 1600
+        self.assertGreater(time.perf_counter() - start, expected * 0.5)
+
+    def _wait_for_status(self, text):
+        deadline = time.monotonic() + 5
+        while str(printer_status.board.get("Emulator")) != text:
+            if time.monotonic() > deadline:
+                self.fail(f"Printer status never became {text!r}")
+            time.sleep(0.01)
+
+    def test_busy_printer_pauses_sending(self):
+        """Test that sending pauses while the printer reports offline and resumes once it is online."""
+        self.emulator.set_state(BUSY)
+        batch = ThreadPoolExecutor(1).submit(self.backend.print_batch, "Emulator", ["Task"], TIMESTAMP)
+        self._wait_for_status("offline")
+        self.assertFalse(self.emulator.wait_for_receipts(1, timeout=0.2))
+
+        self.emulator.set_state("online")
+        self.assertTrue(all(r.ok for r in batch.result(timeout=5)))
+        self.assertTrue(self.emulator.wait_for_receipts(1))
+        self.assertEqual(str(printer_status.board.get("Emulator")), "ready")
+
+    def test_paper_out_pause_can_be_cancelled(self):
+        """Test that a printer out of paper holds the batch until it is cancelled."""
+        self.emulator.set_state(PAPER_OUT)
+        cancel = threading.Event()
+        batch = ThreadPoolExecutor(1).submit(self.backend.print_batch, "Emulator", ["A", "B"], TIMESTAMP,
+                                             cancel_event=cancel)
+        self._wait_for_status("out of paper")
+        cancel.set()
+        self.assertEqual(batch.result(timeout=5), [])
+
+    def test_paper_out_fails_after_max_pause(self):
+        """Test that receipts fail, unsent, once the printer has been unavailable for too long."""
+        self.emulator.set_state(PAPER_OUT)
+        self.backend.max_pause = 0.1
+        results = self.backend.print_batch("Emulator", ["A", "B"], TIMESTAMP)
+        self.assertEqual([r.error for r in results], ["Printer not ready: out of paper"] * 2)
+        self.emulator.set_state("online")
+        self.assertFalse(self.emulator.wait_for_receipts(1, timeout=0.2))
+
+    def test_slow_printer_streams_without_timing_out(self):
+        """Test that a batch taking longer than the socket timeout still prints in full."""
+        self.backend.timeout = 0.2
+        self.emulator.paper_speed = 400  # mm/s; the batch takes about a second
+        results = self.backend.print_batch("Emulator", [f"Task {i}" for i in range(6)], TIMESTAMP)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertTrue(self.emulator.wait_for_receipts(6))
+
+    def test_offline_printer_prints_nothing(self):
+        self.emulator.set_state(OFFLINE)
+        results = self.backend.print_batch("Emulator", ["Task"], TIMESTAMP)
+        self.assertFalse(any(r.ok for r in results))
+        self.assertFalse(self.emulator.wait_for_receipts(1, timeout=0.2))
+
+    def test_status_requests(self):
+        """Test that DLE EOT is answered in real time with the printer state."""
+        self.emulator.set_state(PAPER_OUT)
+        with socket.create_connection(("127.0.0.1", self.emulator.port), timeout=5) as conn:
+            conn.sendall(b"\x10\x04\x01\x10\x04\x04")
+            replies = b""
+            while len(replies) < 2:
+                replies += conn.recv(2)
+        self.assertEqual(replies, bytes([0x12 | 0x08, 0x12 | 0x60]))
+
+    def test_status_request_split_across_writes(self):
+        """Test that a request split across writes is answered, and image data is not."""
+        self.emulator.set_state(PAPER_OUT)
+        with socket.create_connection(("127.0.0.1", self.emulator.port), timeout=5) as conn:
+            conn.sendall(escpos.raster_header(2, 1) + b"\x10\x04" + b"\x10\x04")
+            time.sleep(0.05)
+            conn.sendall(b"\x02")
+            reply = conn.recv(16)
+            conn.settimeout(0.1)
+            with self.assertRaises(socket.timeout):
+                conn.recv(16)
+        self.assertEqual(reply, bytes([0x12 | 0x20]))
+
+
+if __name__ == '__main__':
+    unittest.main()
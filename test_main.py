@@ -4,16 +4,20 @@ Unit tests for Receipt Task Printer application.
 Tests core GUI functionality for M0 milestone.
 """
 
+import threading
+import time
 import unittest
 import tkinter as tk
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import tempfile
 
 # Add the current directory to the path so we can import main
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from main import ReceiptTaskApp
+from print_journal import PrintJournal
 
 # Patch printer_utils for all tests
 import printer_utils
@@ -28,19 +32,39 @@ class TestReceiptTaskApp(unittest.TestCase):
         self.root = tk.Tk()
         self.patcher_list = patch('printer_utils.list_printers', return_value=['RONGTA 80mm', 'Other Printer'])
         self.patcher_find = patch('printer_utils.find_rongta_printer', return_value='RONGTA 80mm')
-        self.patcher_print = patch('printer_utils.print_task')
+        self.patcher_print = patch('printer_utils.print_batch', side_effect=self._batch_results)
         self.mock_list = self.patcher_list.start()
         self.mock_find = self.patcher_find.start()
         self.mock_print = self.patcher_print.start()
         self.app = ReceiptTaskApp(self.root)
+        self.app.print_worker.retry_delay = 0
     
+    @staticmethod
+    def _batch_results(printer_name, tasks, error=None, **kwargs):
+        """Build per-task results the way printer_utils.print_batch reports them."""
+        return [printer_utils.TaskResult(i, task, error) for i, task in enumerate(tasks, 1)]
+
     def tearDown(self):
         """Clean up test fixtures."""
         self.patcher_list.stop()
         self.patcher_find.stop()
         self.patcher_print.stop()
+        self.app.print_worker.stop(timeout=5)
         self.root.destroy()
     
+    def _add_tasks(self, *tasks):
+        """Add tasks through the entry box, as the user would."""
+        for task in tasks:
+            self.app.task_entry.insert(0, task)
+            self.app._add_task()
+        self.app.ui.flush()
+
+    def _finish_printing(self):
+        """Wait for the print worker and apply its events as the Tk loop would."""
+        self.app.print_worker.wait_idle()
+        self.app._poll_print_worker()
+        self.app.ui.flush()
+    
     def test_initial_state(self):
         """Test that the application initializes with correct initial state."""
         self.assertEqual(len(self.app.tasks), 0)
@@ -54,10 +78,11 @@ class TestReceiptTaskApp(unittest.TestCase):
         # Simulate entering text and clicking add button
         self.app.task_entry.insert(0, test_task)
         self.app._add_task()
+        self.app.ui.flush()
         
         # Verify task was added
         self.assertEqual(len(self.app.tasks), 1)
-        self.assertEqual(self.app.tasks[0], test_task)
+        self.assertEqual(self.app.tasks.texts(), [test_task])
         self.assertEqual(self.app.task_listbox.size(), 1)
         self.assertIn(test_task, self.app.task_listbox.get(0))
     
@@ -72,8 +97,8 @@ class TestReceiptTaskApp(unittest.TestCase):
             mock_warning.assert_called_once()
             self.assertEqual(len(self.app.tasks), initial_count)
     
-    def test_add_task_too_long(self):
-        """Test that tasks longer than 100 characters are rejected."""
+    def test_add_long_task(self):
+        """Test that long tasks are accepted; the receipt layout wraps them."""
         long_task = "A" * 101
         
         self.app.task_entry.insert(0, long_task)
@@ -81,26 +106,39 @@ class TestReceiptTaskApp(unittest.TestCase):
         with patch('tkinter.messagebox.showwarning') as mock_warning:
             self.app._add_task()
             
-            # Verify warning was shown and no task was added
-            mock_warning.assert_called_once()
-            self.assertEqual(len(self.app.tasks), 0)
+            # Verify no warning was shown and the task was added
+            mock_warning.assert_not_called()
+            self.assertEqual(self.app.tasks.texts(), [long_task])
     
     def test_remove_selected_task(self):
         """Test removing a selected task."""
         # Add a task first
-        self.app.tasks.append("Test task")
-        self.app.task_listbox.insert(tk.END, "1. Test task")
+        self._add_tasks("Test task")
         
         # Select the first item
         self.app.task_listbox.selection_set(0)
         
         # Remove the selected task
         self.app._remove_selected()
+        self.app.ui.flush()
         
         # Verify task was removed
         self.assertEqual(len(self.app.tasks), 0)
         self.assertEqual(self.app.task_listbox.size(), 0)
-    
+
+    def test_remove_several_selected_tasks(self):
+        """Test that a multiple selection is removed at once and the rest renumbered."""
+        self._add_tasks('Task 1', 'Task 2', 'Task 3', 'Task 4')
+        self.app.task_listbox.selection_set(0)
+        self.app.task_listbox.selection_set(2)
+
+        self.app._remove_selected()
+        self.app.ui.flush()
+
+        self.assertEqual(self.app.tasks.texts(), ['Task 2', 'Task 4'])
+        self.assertEqual(self.app.task_listbox.get(1), "2. Task 4")
+        self.assertIn("2 tasks removed", self.app.status_var.get())
+
     def test_remove_no_selection(self):
         """Test removing when no task is selected."""
         with patch('tkinter.messagebox.showinfo') as mock_info:
@@ -112,13 +150,12 @@ class TestReceiptTaskApp(unittest.TestCase):
     def test_clear_all_tasks(self):
         """Test clearing all tasks."""
         # Add some tasks
-        self.app.tasks.extend(["Task 1", "Task 2", "Task 3"])
-        for i, task in enumerate(self.app.tasks, 1):
-            self.app.task_listbox.insert(tk.END, f"{i}. {task}")
+        self._add_tasks("Task 1", "Task 2", "Task 3")
         
         # Mock the confirmation dialog to return True
         with patch('tkinter.messagebox.askyesno', return_value=True):
             self.app._clear_all()
+            self.app.ui.flush()
             
             # Verify all tasks were cleared
             self.assertEqual(len(self.app.tasks), 0)
@@ -135,7 +172,7 @@ class TestReceiptTaskApp(unittest.TestCase):
     def test_update_ui_state_with_tasks(self):
         """Test UI state when tasks are present."""
         # Add a task
-        self.app.tasks.append("Test task")
+        self.app.tasks.add(["Test task"])
         self.app._update_ui_state()
         
         # Verify buttons are enabled
@@ -157,7 +194,7 @@ class TestReceiptTaskApp(unittest.TestCase):
     def test_refresh_listbox(self):
         """Test refreshing the listbox display."""
         # Add some tasks
-        self.app.tasks.extend(["Task 1", "Task 2"])
+        self._add_tasks("Task 1", "Task 2")
         
         # Refresh the listbox
         self.app._refresh_listbox()
@@ -167,35 +204,322 @@ class TestReceiptTaskApp(unittest.TestCase):
         self.assertIn("1. Task 1", self.app.task_listbox.get(0))
         self.assertIn("2. Task 2", self.app.task_listbox.get(1))
 
+    def _finish_printer_scan(self):
+        """Wait for the background printer scan and apply it as the Tk loop would."""
+        self.app._printer_scan.result(timeout=5)
+        self.app._check_printer_scan()
+
     def test_printer_dropdown_populates_and_selects_rongta(self):
         """Test that the printer dropdown populates and selects RONGTA by default."""
+        self._finish_printer_scan()
         self.assertIn('RONGTA 80mm', self.app.printer_combo['values'])
         self.assertEqual(self.app.printer_var.get(), 'RONGTA 80mm')
 
+    def test_printer_scan_enumerates_once(self):
+        """Test that startup enumerates printers once and shares the list with the RONGTA lookup."""
+        self._finish_printer_scan()
+        self.mock_list.assert_called_once_with(refresh=False)
+        self.mock_find.assert_called_once_with(['RONGTA 80mm', 'Other Printer'])
+
+    def test_rescan_refreshes_and_keeps_selection(self):
+        """Test that rescanning bypasses the cache and keeps a still-available choice."""
+        self._finish_printer_scan()
+        self.app.printer_var.set('Other Printer')
+        self.mock_list.return_value = ['Other Printer', 'New Printer']
+        self.mock_find.return_value = None
+        self.app.rescan_button.invoke()
+        self._finish_printer_scan()
+        self.mock_list.assert_called_with(refresh=True)
+        self.assertEqual(list(self.app.printer_combo['values']), ['Other Printer', 'New Printer'])
+        self.assertEqual(self.app.printer_var.get(), 'Other Printer')
+        self.assertEqual(str(self.app.rescan_button.cget('state')), 'normal')
+
+    def test_printer_scan_error(self):
+        """Test that a failed scan clears the dropdown and shows an error."""
+        self._finish_printer_scan()
+        self.mock_list.side_effect = RuntimeError("spooler not running")
+        with patch('tkinter.messagebox.showerror') as mock_error:
+            self.app._scan_printers(refresh=True)
+            self.app._printer_scan.exception(timeout=5)
+            self.app._check_printer_scan()
+            mock_error.assert_called_once()
+        self.assertEqual(self.app.printer_var.get(), '')
+
     def test_print_tasks_success(self):
         """Test printing all tasks successfully clears the list and shows info dialog."""
-        self.app.tasks = ['Task 1', 'Task 2']
-        for i, task in enumerate(self.app.tasks, 1):
-            self.app.task_listbox.insert(tk.END, f"{i}. {task}")
+        self._add_tasks('Task 1', 'Task 2')
         self.app.printer_var.set('RONGTA 80mm')
         with patch('tkinter.messagebox.showinfo') as mock_info:
             self.app._print_tasks()
+            self._finish_printing()
             self.assertEqual(len(self.app.tasks), 0)
             self.assertEqual(self.app.task_listbox.size(), 0)
             mock_info.assert_called_with("Print Complete", "All 2 tasks printed successfully.")
+            self.assertEqual(self.mock_print.call_args[0], ('RONGTA 80mm', ['Task 1', 'Task 2']))
 
     def test_print_tasks_with_error(self):
         """Test printing with a printer error shows error dialog and does not clear tasks."""
-        self.app.tasks = ['Task 1']
-        self.app.task_listbox.insert(tk.END, "1. Task 1")
+        self._add_tasks('Task 1')
         self.app.printer_var.set('RONGTA 80mm')
-        self.mock_print.side_effect = Exception("Printer jam")
+        self.mock_print.side_effect = lambda printer, tasks, **kwargs: self._batch_results(printer, tasks, "Printer jam")
         with patch('tkinter.messagebox.showerror') as mock_error:
             self.app._print_tasks()
+            self._finish_printing()
             self.assertEqual(len(self.app.tasks), 1)
             self.assertEqual(self.app.task_listbox.size(), 1)
             mock_error.assert_called()
 
+    def test_print_tasks_partial_failure_reports_failed_tasks(self):
+        """Test that a partial batch failure names the tasks that failed."""
+        self._add_tasks('Task 1', 'Task 2', 'Task 3')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.mock_print.side_effect = lambda printer, tasks, **kwargs: [
+            printer_utils.TaskResult(i, task, "Paper out" if task == 'Task 2' else None)
+            for i, task in enumerate(tasks, 1)
+        ]
+        with patch('tkinter.messagebox.showerror') as mock_error:
+            self.app._print_tasks()
+            self._finish_printing()
+            mock_error.assert_called_once()
+            self.assertIn("#2", mock_error.call_args[0][1])
+        # Printed tasks are done; only the failed one stays, marked, after its retries
+        self.assertEqual(self.app.tasks.texts(), ['Task 2'])
+        self.assertIn("[failed]", self.app.task_listbox.get(0))
+        self.assertEqual(self.mock_print.call_count, 1 + self.app.print_worker.max_retries)
+
+    def test_status_bar_shows_why_printing_is_paused(self):
+        """Test that a printer holding back a print job is named in the status bar until it is ready."""
+        import printer_status
+        self.addCleanup(printer_status.board.clear)
+        with patch.object(type(self.app.print_worker), 'busy', new=True):
+            printer_status.board.update('RONGTA 80mm', printer_status.PrinterStatus(paper_out=True))
+            self.app._show_printer_pause()
+            self.app.ui.flush()
+            self.assertEqual(self.app.status_var.get(), "Printing paused - RONGTA 80mm: out of paper. "
+                                                        "Printing resumes when the printer is ready.")
+
+            printer_status.board.update('RONGTA 80mm', printer_status.READY)
+            self.app._show_printer_pause()
+            self.app.ui.flush()
+            self.assertEqual(self.app.status_var.get(), "Printer ready, printing resumed...")
+
+    def test_scheduled_job_prints_when_due(self):
+        """Test that a due scheduled job adds its tasks and prints them, with one timer armed at a time."""
+        self.app.printer_var.set('RONGTA 80mm')
+        self.app.schedule.add_once(time.time() + 3600, ['Later'])
+        self.app.schedule.add_once(time.time() - 1, ['Unlock doors', 'Start coffee'], name='Opening')
+        self.app._arm_schedule()
+        first_timer = self.app._schedule_timer
+        self.app._arm_schedule()
+        self.assertNotIn(first_timer, self.root.tk.splitlist(self.root.tk.call('after', 'info')))
+
+        with patch('tkinter.messagebox.showinfo'):
+            self.app._run_schedule()
+            self._finish_printing()
+        self.assertEqual(self.mock_print.call_args[0], ('RONGTA 80mm', ['Unlock doors', 'Start coffee']))
+        self.assertEqual(len(self.app.tasks), 0)
+        self.assertEqual(len(self.app.schedule), 1)
+        self.assertIsNotNone(self.app._schedule_timer)
+
+    def test_batch_stopping_early_reports_unattempted_tasks_as_failed(self):
+        """Test that tasks a batch never reached, without a cancel, are failed rather than 'cancelled'."""
+        self._add_tasks('Task 1', 'Task 2', 'Task 3')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.mock_print.side_effect = lambda printer, tasks, **kwargs: self._batch_results(printer, tasks)[:1]
+        with patch('tkinter.messagebox.showerror') as mock_error:
+            self.app._print_tasks()
+            self._finish_printing()
+            mock_error.assert_called_once()
+            self.assertIn("#2, 3", mock_error.call_args[0][1])
+        self.assertEqual(self.app.tasks.texts(), ['Task 2', 'Task 3'])
+        self.assertIn("[failed]", self.app.task_listbox.get(0))
+        self.assertNotIn("cancelled", self.app.status_var.get())
+
+    def test_retry_failed_prints_only_failed_tasks(self):
+        """Test that Retry Failed resubmits the failed tasks and leaves the others queued."""
+        self._add_tasks('Task 1')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.mock_print.side_effect = lambda printer, tasks, **kwargs: self._batch_results(printer, tasks, "Offline")
+        with patch('tkinter.messagebox.showerror'):
+            self.app._print_tasks()
+            self._finish_printing()
+        self._add_tasks('Task 2')
+        self.assertEqual(str(self.app.retry_button.cget('state')), 'normal')
+
+        self.mock_print.side_effect = self._batch_results
+        with patch('tkinter.messagebox.showinfo'):
+            self.app.retry_button.invoke()
+            self._finish_printing()
+        self.assertEqual(self.mock_print.call_args[0], ('RONGTA 80mm', ['Task 1']))
+        self.assertEqual(self.app.tasks.texts(), ['Task 2'])
+        self.assertEqual(str(self.app.retry_button.cget('state')), 'disabled')
+
+    def test_tasks_can_be_added_while_printing(self):
+        """Test that the list accepts new tasks while a batch is in flight."""
+        gate = threading.Event()
+
+        def slow_batch(printer, tasks, **kwargs):
+            gate.wait(5)
+            return self._batch_results(printer, tasks)
+
+        self.mock_print.side_effect = slow_batch
+        self._add_tasks('Task 1')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.app._print_tasks()
+        self.app.ui.flush()
+        self.assertEqual(str(self.app.cancel_button.cget('state')), 'normal')
+
+        self.app.task_entry.insert(0, "Task 2")
+        self.app._add_task()
+        self.assertEqual(self.app.tasks.texts(), ['Task 2'])
+
+        gate.set()
+        with patch('tkinter.messagebox.showinfo'):
+            self._finish_printing()
+        self.assertEqual(self.app.tasks.texts(), ['Task 2'])
+        self.assertEqual(str(self.app.cancel_button.cget('state')), 'disabled')
+
+    def test_cancel_printing_returns_unprinted_tasks(self):
+        """Test that cancelling a batch puts unprinted tasks back in order."""
+        gate = threading.Event()
+
+        def cancellable_batch(printer, tasks, on_result=None, cancel_event=None, **kwargs):
+            gate.wait(5)
+            results = []
+            for result in self._batch_results(printer, tasks):
+                if cancel_event.is_set():
+                    break
+                results.append(result)
+                cancel_event.set()  # Cancelled after the first receipt
+            return results
+
+        self.mock_print.side_effect = cancellable_batch
+        self._add_tasks('Task 1', 'Task 2', 'Task 3')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.app._print_tasks()
+        self.app.task_entry.insert(0, "Task 4")
+        self.app._add_task()
+
+        gate.set()
+        self._finish_printing()
+        self.assertEqual(self.app.tasks.texts(), ['Task 2', 'Task 3', 'Task 4'])
+        self.assertIn("2. Task 3", self.app.task_listbox.get(1))
+        self.assertIn("cancelled", self.app.status_var.get())
+
+    def test_cancel_printing_before_job_starts(self):
+        """Test that the cancel button returns a cancelled job's tasks to the list."""
+        gate = threading.Event()
+
+        def blocked_batch(printer, tasks, **kwargs):
+            gate.wait(5)
+            return []
+
+        self.mock_print.side_effect = blocked_batch
+        self._add_tasks('Task 1')
+        self.app.printer_var.set('RONGTA 80mm')
+        self.app._print_tasks()
+        self.app._cancel_printing()
+        gate.set()
+        self._finish_printing()
+        self.assertEqual(self.app.tasks.texts(), ['Task 1'])
+        self.assertIn("cancelled", self.app.status_var.get())
+
+    def test_journal_replays_unprinted_tasks(self):
+        """Test that tasks still unprinted when the app exits come back in the next session."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = PrintJournal(os.path.join(tmpdir, 'journal.db'))
+            app = ReceiptTaskApp(tk.Toplevel(self.root), journal)
+            for task in ['Task 1', 'Task 2']:
+                app.task_entry.insert(0, task)
+                app._add_task()
+            app.printer_var.set('RONGTA 80mm')
+            self.mock_print.side_effect = lambda printer, tasks, on_result=None, **kwargs: [
+                on_result(result) or result for result in self._batch_results(printer, tasks)[:1]
+            ]
+            with patch('tkinter.messagebox.showerror'), patch('tkinter.messagebox.showinfo'):
+                app._print_tasks()
+                app.print_worker.wait_idle()
+                app._poll_print_worker()
+            app.print_worker.stop(timeout=5)
+            journal.close()
+
+            journal = PrintJournal(os.path.join(tmpdir, 'journal.db'))
+            restored = ReceiptTaskApp(tk.Toplevel(self.root), journal)
+            restored.ui.flush()
+            self.assertEqual(restored.tasks.texts(), ['Task 2'])
+            self.assertIn("Restored 1 unprinted task(s)", restored.status_var.get())
+            restored.print_worker.stop(timeout=5)
+            journal.close()
+
+    def _finish_import(self):
+        """Run the Tk loop until a running import has added its last chunk."""
+        deadline = time.monotonic() + 5
+        while not self.app.status_var.get().startswith("Imported"):
+            if time.monotonic() > deadline:
+                self.fail("Import did not finish")
+            self.root.update()
+            time.sleep(0.001)
+        self.app.ui.flush()
+
+    def test_import_file_adds_tasks_in_chunks(self):
+        """Test that a task file is added a chunk at a time and numbered in order."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'tasks.txt')
+            with open(path, 'w') as f:
+                f.write(''.join(f"Task {i}\n" for i in range(1, 26)) + "\n")
+            with patch('tkinter.filedialog.askopenfilename', return_value=path), \
+                    patch('task_import.IMPORT_CHUNK_SIZE', 10), \
+                    patch.object(self.app.task_view, 'refresh', wraps=self.app.task_view.refresh) as refresh:
+                self.app._import_file()
+                self._finish_import()
+
+        self.assertEqual(self.app.tasks.texts(), [f"Task {i}" for i in range(1, 26)])
+        self.assertEqual(len(set(self.app.tasks.ids())), 25)
+        # At most one redraw per chunk; chunks added within one frame share a redraw
+        self.assertLessEqual(refresh.call_count, 3)
+        self.assertEqual(self.app.task_listbox.get(0), "1. Task 1")
+        self.assertIn("Imported 25 task(s) from tasks.txt", self.app.status_var.get())
+
+    def test_import_csv_column(self):
+        """Test that a CSV import reads the column the user names."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'orders.csv')
+            with open(path, 'w') as f:
+                f.write('table,task\n4,Soup\n7,Salad\n')
+            with patch('tkinter.filedialog.askopenfilename', return_value=path), \
+                    patch('tkinter.simpledialog.askstring', return_value='task'):
+                self.app._import_file()
+                self._finish_import()
+
+        self.assertEqual(self.app.tasks.texts(), ['Soup', 'Salad'])
+
+    def test_import_csv_column_number_skips_header(self):
+        """Test that a CSV column chosen by number does not import the header as a task."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'orders.csv')
+            with open(path, 'w') as f:
+                f.write('table,task\n4,Soup\n7,Salad\n')
+            with patch('tkinter.filedialog.askopenfilename', return_value=path), \
+                    patch('tkinter.simpledialog.askstring', return_value='2'), \
+                    patch('tkinter.messagebox.askyesno', return_value=True) as ask_header:
+                self.app._import_file()
+                self._finish_import()
+
+        self.assertEqual(ask_header.call_args.kwargs['default'], 'yes')
+        self.assertEqual(self.app.tasks.texts(), ['Soup', 'Salad'])
+
+    def test_paste_several_lines_adds_one_task_each(self):
+        """Test that pasting multi-line text imports each line, but a single line pastes normally."""
+        self.root.clipboard_clear()
+        self.root.clipboard_append("Task 1\n\nTask 2\n")
+        self.assertEqual(self.app._on_paste(), "break")
+        self._finish_import()
+        self.assertEqual(self.app.tasks.texts(), ['Task 1', 'Task 2'])
+
+        self.root.clipboard_clear()
+        self.root.clipboard_append("Task 3")
+        self.assertIsNone(self.app._on_paste())
+
     def test_print_tasks_no_printer_selected(self):
         """Test printing with no printer selected shows error dialog."""
         self.app.printer_var.set('')
@@ -215,6 +539,12 @@ class TestReceiptTaskApp(unittest.TestCase):
 class TestMainFunction(unittest.TestCase):
     """Test cases for the main function."""
     
+    def setUp(self):
+        # The real setup writes receipt_tasks.log and leaves a listener on the root logger
+        patcher = patch('app_logging.setup_logging')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
     @patch('tkinter.Tk')
     @patch('tkinter.messagebox.showerror')
     def test_main_function_success(self, mock_error, mock_tk):
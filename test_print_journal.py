@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the durable print journal.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from print_journal import PrintJournal
+
+
+class FailingCommits:
+    """Wraps a journal's connection so its next ``failures`` commits raise."""
+
+    def __init__(self, conn, failures):
+        self.conn = conn
+        self.failures = failures
+
+    def execute(self, sql, *args):
+        if sql == "COMMIT" and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class TestPrintJournal(unittest.TestCase):
+    """Test cases for PrintJournal."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "journal.db")
+        self.journal = PrintJournal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmpdir.cleanup()
+
+    def _reopen(self):
+        self.journal.close()
+        self.journal = PrintJournal(self.path)
+
+    def test_only_unprinted_tasks_are_replayed(self):
+        """Test that queued and failed tasks survive a restart and printed ones do not."""
+        ids = self.journal.add(["A", "B", "C", "D"])
+        self.journal.mark_printed(ids[0])
+        self.journal.mark_failed(ids[1], "Out of paper")
+        self.journal.remove([ids[3]])
+        self._reopen()
+        self.assertEqual(self.journal.unprinted(), [(ids[1], "B"), (ids[2], "C")])
+
+    def test_ids_continue_after_restart(self):
+        """Test that IDs are never reused across restarts."""
+        first = self.journal.add(["A"])
+        self._reopen()
+        self.assertGreater(self.journal.add(["B"])[0], first[0])
+
+    def test_updates_are_group_committed(self):
+        """Test that many concurrent updates share a few commits."""
+        def producer(n):
+            for task_id in self.journal.add([f"{n}-{i}" for i in range(50)]):
+                self.journal.mark_printed(task_id)
+
+        threads = [threading.Thread(target=producer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.journal.flush()
+        self.assertEqual(self.journal.unprinted(), [])
+        self.assertLess(self.journal.commits, 50)
+
+    def test_flush_makes_updates_durable(self):
+        """Test that flushed updates are visible to a separate connection, as after a crash."""
+        self.journal.add(["A"])
+        self.journal.flush()
+        other = PrintJournal(self.path)
+        try:
+            self.assertEqual([task for _, task in other.unprinted()], ["A"])
+        finally:
+            other.close()
+
+
+    def test_failed_commit_is_not_reported_durable(self):
+        """Test that flush raises when a commit fails, and the updates are written by a later one."""
+        self.journal.close()
+        self.journal = PrintJournal(self.path, commit_interval=60)  # Commit only when flushed
+        self.journal._conn = FailingCommits(self.journal._conn, failures=1)
+        self.journal.add(["A"])
+        with self.assertRaises(sqlite3.Error):
+            self.journal.flush()
+
+        self.journal.add(["B"])
+        self.journal.flush()
+        other = PrintJournal(self.path)
+        try:
+            self.assertEqual([task for _, task in other.unprinted()], ["A", "B"])
+        finally:
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Unit tests for print timing metrics.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import print_metrics
+import printer_utils
+from print_metrics import JOB, OPEN, RENDER, SEND, Histogram, PrintMetrics
+
+
+class TestHistogram(unittest.TestCase):
+    """Test cases for Histogram."""
+
+    def test_observations_fall_in_upper_bound_buckets(self):
+        h = Histogram((0.1, 1.0))
+
+        for seconds in (0.05, 0.1, 0.5, 5.0):
+            h.observe(seconds)
+
+        self.assertEqual(h.counts, [2, 1, 1])
+        self.assertEqual(h.count, 4)
+        self.assertAlmostEqual(h.sum, 5.65)
+
+    def test_quantile_returns_bucket_bound(self):
+        h = Histogram((0.1, 1.0))
+        for _ in range(9):
+            h.observe(0.05)
+        h.observe(0.5)
+
+        self.assertEqual(h.quantile(0.5), 0.1)
+        self.assertEqual(h.quantile(1.0), 1.0)
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+
+class TestPrintMetrics(unittest.TestCase):
+    """Test cases for PrintMetrics."""
+
+    def test_disabled_metrics_record_nothing(self):
+        metrics = PrintMetrics()
+
+        with metrics.time('RONGTA', SEND):
+            pass
+        metrics.add_bytes('RONGTA', 10)
+        metrics.count_results('RONGTA', [True])
+
+        self.assertIs(metrics.time('RONGTA', SEND), print_metrics._NULL_TIMER)
+        self.assertEqual(metrics.printers(), [])
+
+    def test_timer_records_phase_even_when_block_raises(self):
+        metrics = PrintMetrics(enabled=True)
+
+        with self.assertRaises(OSError):
+            with metrics.time('RONGTA', OPEN):
+                raise OSError("Printer offline")
+
+        self.assertEqual(metrics.histogram('RONGTA', OPEN).count, 1)
+
+    def test_prometheus_text_has_cumulative_buckets_and_counters(self):
+        metrics = PrintMetrics(enabled=True)
+        metrics.observe('RONGTA "Bar"', SEND, 0.002)
+        metrics.observe('RONGTA "Bar"', SEND, 0.2)
+        metrics.add_bytes('RONGTA "Bar"', 512)
+        metrics.count_results('RONGTA "Bar"', [True, True, False])
+
+        text = metrics.render_prometheus()
+
+        labels = 'printer="RONGTA \\"Bar\\"",phase="send"'
+        self.assertIn(f'receipt_print_phase_seconds_bucket{{{labels},le="0.0025"}} 1', text)
+        self.assertIn(f'receipt_print_phase_seconds_bucket{{{labels},le="0.25"}} 2', text)
+        self.assertIn(f'receipt_print_phase_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn(f'receipt_print_phase_seconds_count{{{labels}}} 2', text)
+        self.assertIn('receipt_print_bytes_total{printer="RONGTA \\"Bar\\""} 512', text)
+        self.assertIn('receipt_print_receipts_total{printer="RONGTA \\"Bar\\"",result="printed"} 2', text)
+        self.assertIn('receipt_print_receipts_total{printer="RONGTA \\"Bar\\"",result="failed"} 1', text)
+
+    def test_summary_lists_outcomes_and_phase_latencies(self):
+        metrics = PrintMetrics(enabled=True)
+        metrics.observe('RONGTA', RENDER, 0.003)
+        metrics.count_results('RONGTA', [True, False])
+
+        summary = metrics.summary('RONGTA')
+
+        self.assertEqual(summary, "RONGTA: 1 printed, 1 failed, 0 bytes; render p50 5 ms p95 5 ms")
+
+    def test_environment_enables_metrics(self):
+        with patch.dict(os.environ, {print_metrics.METRICS_FILE_ENV_VAR: 'metrics.prom'}):
+            metrics = PrintMetrics.from_environment()
+        self.assertTrue(metrics.enabled)
+        self.assertEqual(metrics.path, 'metrics.prom')
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(PrintMetrics.from_environment().enabled)
+
+
+class TestPrinterUtilsMetrics(unittest.TestCase):
+    """Phase timings recorded by the printer backends."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'metrics.prom')
+        self.metrics = PrintMetrics(path=self.path)
+        patcher = patch.object(print_metrics, 'metrics', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        capture = os.path.join(self.tmp.name, 'capture.bin')
+        backend = printer_utils.EscPosBackend({'RONGTA': capture}, discover_devices=False,
+                                              mode=printer_utils.ESCPOS_TEXT)
+        printer_utils.set_backend(backend)
+        self.addCleanup(printer_utils.set_backend, None)
+
+    def test_batch_records_phases_bytes_and_results(self):
+        printer_utils.print_batch('RONGTA', ['Task 1', 'Task 2'], datetime(2025, 1, 2, 3, 4))
+
+        self.assertEqual(self.metrics.histogram('RONGTA', OPEN).count, 1)
+        self.assertEqual(self.metrics.histogram('RONGTA', RENDER).count, 2)
+        self.assertEqual(self.metrics.histogram('RONGTA', SEND).count, 2)
+        self.assertEqual(self.metrics.histogram('RONGTA', JOB).count, 1)
+        with open(self.path) as f:
+            text = f.read()
+        self.assertIn('receipt_print_receipts_total{printer="RONGTA",result="printed"} 2', text)
+        self.assertRegex(text, r'receipt_print_bytes_total\{printer="RONGTA"\} [1-9]')
+
+    def test_failed_task_is_counted(self):
+        missing = os.path.join(self.tmp.name, 'no-such-dir', 'lp0')
+        with self.assertRaises(OSError):
+            printer_utils.print_task(missing, 'Task 1', datetime.now())
+
+        self.assertEqual(self.metrics.summary(missing).split(';')[0],
+                         f"{missing}: 0 printed, 1 failed, 0 bytes")
+
+
+if __name__ == '__main__':
+    unittest.main()
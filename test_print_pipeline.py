@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Unit tests for render/transmit pipelining.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import printer_utils
+import raster
+from print_pipeline import InlineExecutor, pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for the pipeline generator."""
+
+    def test_results_in_order(self):
+        """Test that items come back in submission order whatever order renders finish in."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            stages = pipeline(range(20), lambda n: executor.submit(pow, n, 2), depth=4)
+            self.assertEqual([(n, future.result()) for n, future in stages],
+                             [(n, n * n) for n in range(20)])
+
+    def test_depth_bounds_outstanding_renders(self):
+        """Test that no more than ``depth`` renders run ahead of the consumer."""
+        submitted = []
+
+        def submit(n):
+            submitted.append(n)
+            return InlineExecutor().submit(lambda: n)
+
+        for n, _ in pipeline(range(10), submit, depth=3):
+            self.assertLessEqual(len(submitted), n + 1 + 3)
+
+    def test_cancel_stops_submission(self):
+        """Test that nothing new is submitted once cancelled and pending renders are cancelled."""
+        cancel = threading.Event()
+        submitted = []
+        blocker = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            def submit(n):
+                submitted.append(n)
+                return executor.submit(blocker.wait)
+
+            stages = pipeline(range(10), submit, depth=3, cancel_event=cancel)
+            _, first = next(stages)
+            cancel.set()
+            stages.close()
+            blocker.set()
+        self.assertLess(len(submitted), 10)
+        self.assertTrue(first.done())
+
+    def test_inline_executor_captures_errors(self):
+        """Test that the inline executor reports exceptions through the future."""
+        future = InlineExecutor().submit(int, "not a number")
+        with self.assertRaises(ValueError):
+            future.result()
+
+
+class TestPipelinedBatch(unittest.TestCase):
+    """Test cases for pipelined ESC/POS batches."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.capture = os.path.join(self.tmpdir.name, "receipts.bin")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _backend(self, mode):
+        return printer_utils.EscPosBackend({"Capture": self.capture}, discover_devices=False, mode=mode)
+
+    def test_render_error_fails_only_that_task(self):
+        """Test that a receipt that cannot be rendered does not stop the batch."""
+        backend = self._backend(printer_utils.ESCPOS_TEXT)
+        real_encode = printer_utils._encode_receipt
+
+        def encode(mode, logo_path, compression, template_path, task, timestamp):
+            if task == "B":
+                raise ValueError("Bad task")
+            return real_encode(mode, logo_path, compression, template_path, task, timestamp)
+
+        with patch.object(printer_utils, "_encode_receipt", side_effect=encode):
+            results = backend.print_batch("Capture", ["A", "B", "C"], datetime(2025, 1, 2))
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[1].error, "Bad task")
+
+    @unittest.skipUnless(raster.available(), "numpy and Pillow are not installed")
+    def test_raster_batch_matches_sequential_output(self):
+        """Test that a batch rendered in worker processes prints the same bytes, in order."""
+        backend = self._backend(printer_utils.ESCPOS_RASTER)
+        tasks = [f"Task number {n}" for n in range(12)]
+        timestamp = datetime(2025, 1, 2, 3, 4)
+        try:
+            with patch.object(printer_utils, "PIPELINE_MIN_TASKS", 4):
+                results = backend.print_batch("Capture", tasks, timestamp)
+            self.assertIsNotNone(backend._render_pool)
+        finally:
+            backend.close()
+        self.assertIsNone(backend._render_pool)
+        self.assertTrue(all(r.ok for r in results))
+        with open(self.capture, "rb") as f:
+            self.assertEqual(f.read(), b"".join(backend.encode_receipt(task, timestamp) for task in tasks))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the multi-printer scheduler, run against simulated printers.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from print_scheduler import ROUND_ROBIN, FanOutScheduler, parse_routes
+from printer_utils import TaskResult
+
+
+class SimulatedPrinters:
+    """Prints in ``seconds_per_task`` per receipt; printers in ``broken`` always fail."""
+
+    def __init__(self, seconds_per_task=0.0):
+        self.seconds_per_task = seconds_per_task
+        self.broken = set()
+        self.printed = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, printer_name, tasks, cancel_event=None):
+        if printer_name in self.broken:
+            time.sleep(self.seconds_per_task * len(tasks))
+            return [TaskResult(i, task, f"{printer_name} offline") for i, task in enumerate(tasks, 1)]
+        results = []
+        for i, task in enumerate(tasks, 1):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            time.sleep(self.seconds_per_task)
+            with self.lock:
+                self.printed.setdefault(printer_name, []).append(task)
+            results.append(TaskResult(i, task))
+        return results
+
+
+class TestFanOutScheduler(unittest.TestCase):
+    """Test cases for FanOutScheduler."""
+
+    def setUp(self):
+        self.sim = SimulatedPrinters()
+
+    def _scheduler(self, printers=('P1', 'P2', 'P3'), **kwargs):
+        kwargs.setdefault('routes', [])
+        scheduler = FanOutScheduler(printers, print_batch=self.sim, **kwargs)
+        self.addCleanup(scheduler.close)
+        return scheduler
+
+    def test_least_loaded_spreads_work(self):
+        """Test that every printer takes a share and every task prints once."""
+        self.sim.seconds_per_task = 0.005
+        scheduler = self._scheduler(max_batch=1)
+        tasks = [f"Task {n}" for n in range(30)]
+        results = scheduler.print_batch(tasks)
+        self.assertEqual([(r.index, r.ok) for r in results], [(n, True) for n in range(1, 31)])
+        self.assertEqual(set(self.sim.printed), {'P1', 'P2', 'P3'})
+        self.assertEqual(sorted(sum(self.sim.printed.values(), [])), sorted(tasks))
+
+    def test_throughput_scales_with_printers(self):
+        """Test that three printers finish a batch much faster than one."""
+        self.sim.seconds_per_task = 0.01
+        tasks = [f"Task {n}" for n in range(30)]
+        start = time.perf_counter()
+        self._scheduler(['P1'], max_batch=1).print_batch(tasks)
+        one = time.perf_counter() - start
+        start = time.perf_counter()
+        self._scheduler(max_batch=1).print_batch(tasks)
+        three = time.perf_counter() - start
+        self.assertLess(three, one * 0.6)
+
+    def test_round_robin(self):
+        """Test that round-robin hands tasks to printers in turn."""
+        scheduler = self._scheduler(['P1', 'P2'], policy=ROUND_ROBIN)
+        futures = [scheduler.submit(f"Task {n}") for n in range(4)]
+        self.assertEqual([f.result(5)[0] for f in futures], ['P1', 'P2', 'P1', 'P2'])
+
+    def test_failing_printer_leaves_the_pool(self):
+        """Test that tasks fail over to healthy printers and the broken one is taken out."""
+        self.sim.broken = {'P2'}
+        scheduler = self._scheduler(max_batch=1, max_failures=2)
+        results = scheduler.print_batch([f"Task {n}" for n in range(12)])
+        self.assertTrue(all(r.ok for r in results))
+        self.assertNotIn('P2', scheduler.healthy_printers())
+        self.assertNotIn('P2', self.sim.printed)
+
+    def test_all_printers_failing(self):
+        """Test that a task is reported failed once no printer can print it."""
+        self.sim.broken = {'P1', 'P2'}
+        scheduler = self._scheduler(['P1', 'P2'])
+        results = scheduler.print_batch(["Task"])
+        self.assertFalse(results[0].ok)
+        self.assertIn("offline", results[0].error)
+
+    def test_routing_rules(self):
+        """Test that matching tasks go to their routed printer and the rest are balanced."""
+        scheduler = self._scheduler(routes=parse_routes("^BAR:=P3"))
+        futures = [scheduler.submit(task) for task in ["BAR: 2x cola", "Soup", "BAR: beer"]]
+        printers = [f.result(5)[0] for f in futures]
+        self.assertEqual(printers[0], 'P3')
+        self.assertEqual(printers[2], 'P3')
+
+    def test_parse_routes(self):
+        self.assertEqual(parse_routes("^BAR=Bar Printer; ;x"), [(re.compile("^BAR"), "Bar Printer")])
+
+    def test_cancel_drops_unstarted_tasks(self):
+        """Test that cancelling returns only the tasks that were printed."""
+        cancel = threading.Event()
+        self.sim.seconds_per_task = 0.01
+        scheduler = self._scheduler(['P1'], max_batch=1)
+        results = scheduler.print_batch([f"Task {n}" for n in range(50)],
+                                        on_result=lambda result: cancel.set(), cancel_event=cancel)
+        self.assertLess(len(results), 50)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_cancel_stops_batches_part_way(self):
+        """Test that cancelling stops each printer within its batch, not after it."""
+        cancel = threading.Event()
+        self.sim.seconds_per_task = 0.01
+        scheduler = self._scheduler(['P1', 'P2'])
+        timer = threading.Timer(0.05, cancel.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        # 20 receipts each, taking 0.2 s; the cancel comes after about 5 of them
+        results = scheduler.print_batch([f"Task {n}" for n in range(40)], cancel_event=cancel)
+
+        printed = sum(self.sim.printed.values(), [])
+        self.assertLess(len(printed), 30)
+        self.assertEqual(sorted(r.task for r in results), sorted(printed))
+        self.assertTrue(all(r.ok for r in results))
+        # Tasks stopped by the cancel are neither printed nor failed
+        self.assertEqual(sum(failed for _, failed, _ in scheduler.stats().values()), 0)
+
+
+    def test_close_stops_running_batches(self):
+        """Test that closing cancels the job being printed and a caller waiting on it returns."""
+        cancel = threading.Event()
+        self.sim.seconds_per_task = 0.01
+        scheduler = self._scheduler(['P1'])
+        results = []
+        caller = threading.Thread(target=lambda: results.extend(
+            scheduler.print_batch([f"Task {n}" for n in range(40)], cancel_event=cancel)))
+        caller.start()
+        time.sleep(0.05)
+
+        scheduler.close(timeout=5)
+        caller.join(timeout=5)
+
+        self.assertFalse(caller.is_alive())
+        self.assertTrue(cancel.is_set())
+        self.assertLess(len(results), 40)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_close_fails_batches_that_do_not_stop(self):
+        """Test that tasks still printing when close stops waiting are failed, not left pending."""
+        self.sim.seconds_per_task = 0.02
+        scheduler = self._scheduler(['P1'])
+        futures = [scheduler.submit(f"Task {n}") for n in range(20)]  # No cancel event to stop them
+        time.sleep(0.02)
+
+        scheduler.close(timeout=0.05)
+
+        self.assertTrue(all(future.done() for future in futures))
+        self.assertIn("closed", futures[-1].result()[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the network job submission server, run on localhost with a fake printer.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from print_server import PrintServer
+from printer_utils import TaskResult
+
+
+class FakePrinter:
+    """Records printed tasks; ``hold`` blocks printing until released."""
+
+    def __init__(self):
+        self.printed = []
+        self.failing = set()
+        self.hold = threading.Event()
+        self.hold.set()
+
+    def __call__(self, printer_name, tasks):
+        self.hold.wait(5)
+        self.printed.extend(tasks)
+        return [TaskResult(i, task, 'Out of paper' if task in self.failing else None)
+                for i, task in enumerate(tasks, 1)]
+
+
+class TestPrintServer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for PrintServer."""
+
+    async def asyncSetUp(self):
+        self.printer = FakePrinter()
+        self.server = PrintServer('Fake', port=0, max_per_client=3, max_batch=1, print_batch=self.printer)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        self.printer.hold.set()
+        await self.server.close()
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+        self.addAsyncCleanup(self._close, writer)
+        return reader, writer
+
+    @staticmethod
+    async def _close(writer):
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    @staticmethod
+    async def _read(reader, count):
+        return [(await asyncio.wait_for(reader.readline(), 5)).decode().strip() for _ in range(count)]
+
+    async def test_plain_task_is_acknowledged_then_printed(self):
+        """Test that a plain line is queued, printed and reported."""
+        reader, writer = await self._connect()
+        writer.write(b'Table 4 soup\n')
+        self.assertEqual(await self._read(reader, 2), ['QUEUED 1', 'PRINTED 1'])
+        self.assertEqual(self.printer.printed, ['Table 4 soup'])
+
+    async def test_json_protocol_and_failures(self):
+        """Test that JSON requests get JSON replies, including print errors."""
+        self.printer.failing = {'Salad'}
+        reader, writer = await self._connect()
+        writer.write(b'{"task": "Salad"}\n{"nope": 1}\n')
+        replies = [json.loads(line) for line in await self._read(reader, 3)]
+        self.assertIn({'id': 1, 'status': 'queued'}, replies)
+        self.assertIn({'status': 'error', 'error': 'expected {"task": "..."}'}, replies)
+        self.assertIn({'id': 1, 'status': 'failed', 'error': 'Out of paper'}, replies)
+
+    async def test_per_client_limit_applies_backpressure(self):
+        """Test that a client over its pending limit is told to back off."""
+        self.printer.hold.clear()
+        reader, writer = await self._connect()
+        writer.write(b''.join(f'Task {n}\n'.encode() for n in range(5)))
+        replies = await self._read(reader, 5)
+        # The first task may already be at the printer, freeing one place
+        self.assertEqual(replies[:3], ['QUEUED 1', 'QUEUED 2', 'QUEUED 3'])
+        self.assertEqual(replies[-1], 'BUSY too many pending tasks')
+
+    async def test_clients_are_served_round_robin(self):
+        """Test that a burst from one station does not delay another station's task."""
+        self.printer.hold.clear()
+        reader_a, writer_a = await self._connect()
+        writer_a.write(b'A1\nA2\nA3\n')
+        await self._read(reader_a, 3)
+        reader_b, writer_b = await self._connect()
+        writer_b.write(b'B1\n')
+        await self._read(reader_b, 1)
+        self.printer.hold.set()
+        await self._read(reader_a, 3)
+        await self._read(reader_b, 1)
+        self.assertEqual(self.printer.printed, ['A1', 'A2', 'B1', 'A3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the background print worker.
+"""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import printer_utils
+from print_scheduler import ALL_PRINTERS, FanOutScheduler
+from print_worker import FINISHED, PROGRESS, RETRY, PrintWorker
+
+
+def fake_batch(printer_name, tasks, timestamp=None, on_result=None, cancel_event=None):
+    """Print nothing, reporting each task as printed unless cancelled."""
+    results = []
+    for index, task in enumerate(tasks, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        result = printer_utils.TaskResult(index, task)
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+class TestPrintWorker(unittest.TestCase):
+    """Test cases for PrintWorker."""
+
+    def setUp(self):
+        self.patcher = patch('printer_utils.print_batch', side_effect=fake_batch)
+        self.mock_batch = self.patcher.start()
+        self.worker = PrintWorker(retry_delay=0)
+        self.worker.start()
+
+    def tearDown(self):
+        self.worker.stop(timeout=5)
+        self.patcher.stop()
+
+    def test_progress_then_finished(self):
+        """Test that each task reports progress before the job finishes."""
+        job = self.worker.submit('RONGTA', ['A', 'B'])
+        self.worker.wait_idle()
+        events = self.worker.poll_events()
+        self.assertEqual([e.kind for e in events], [PROGRESS, PROGRESS, FINISHED])
+        self.assertEqual([(e.done, e.total) for e in events[:2]], [(1, 2), (2, 2)])
+        self.assertIs(events[-1].job, job)
+        self.assertTrue(all(r.ok for r in events[-1].results))
+        self.assertFalse(self.worker.busy)
+        self.assertEqual(self.worker.poll_events(), [])
+
+    def test_cancel_all_skips_queued_jobs(self):
+        """Test that cancelling stops the running job and skips queued ones."""
+        gate = threading.Event()
+        started = threading.Event()
+
+        def blocking_batch(*args, **kwargs):
+            started.set()
+            gate.wait(5)
+            return fake_batch(*args, **kwargs)
+
+        self.mock_batch.side_effect = blocking_batch
+        self.worker.submit('RONGTA', ['A', 'B'])
+        self.worker.submit('RONGTA', ['C'])
+        started.wait(5)
+        self.assertTrue(self.worker.busy)
+        self.assertEqual(self.worker.cancel_all(), 2)
+        gate.set()
+        self.worker.wait_idle()
+
+        finished = [e for e in self.worker.poll_events() if e.kind == FINISHED]
+        self.assertEqual([e.results for e in finished], [[], []])
+        self.assertTrue(all(e.job.cancelled for e in finished))
+        self.assertEqual(self.mock_batch.call_count, 1)
+
+    def test_unexpected_error_fails_every_task(self):
+        """Test that an exception from the backend is reported per task."""
+        self.mock_batch.side_effect = RuntimeError("spooler crashed")
+        self.worker.submit('RONGTA', ['A', 'B'])
+        self.worker.wait_idle()
+        finished = self.worker.poll_events()[-1]
+        self.assertEqual([r.error for r in finished.results], ["spooler crashed"] * 2)
+
+    def test_failed_tasks_are_retried_with_backoff(self):
+        """Test that only failed tasks are retried until they print or retries run out."""
+        attempts = []
+
+        def flaky_batch(printer_name, tasks, on_result=None, cancel_event=None):
+            attempts.append(list(tasks))
+            results = [printer_utils.TaskResult(i, task, "Paper jam" if task == 'B' and len(attempts) < 3
+                                                else None) for i, task in enumerate(tasks, 1)]
+            for result in results:
+                on_result(result)
+            return results
+
+        self.mock_batch.side_effect = flaky_batch
+        self.worker.submit('RONGTA', ['A', 'B', 'C'])
+        self.worker.wait_idle()
+        events = self.worker.poll_events()
+        self.assertEqual(attempts, [['A', 'B', 'C'], ['B'], ['B']])
+        retries = [e for e in events if e.kind == RETRY]
+        self.assertEqual([[r.index for r in e.results] for e in retries], [[2], [2]])
+        self.assertEqual([(r.index, r.ok) for r in events[-1].results], [(1, True), (2, True), (3, True)])
+
+    def test_retries_are_bounded(self):
+        """Test that a task that keeps failing is given up after the retry limit."""
+        self.mock_batch.side_effect = RuntimeError("offline")
+        self.worker.max_retries = 2
+        self.worker.submit('RONGTA', ['A'])
+        self.worker.wait_idle()
+        self.assertEqual(self.mock_batch.call_count, 3)
+        self.assertEqual(self.worker.poll_events()[-1].results[0].error, "offline")
+
+    def test_all_printers_job_uses_scheduler(self):
+        """Test that a job for all printers is spread by the scheduler, not the single-printer path."""
+        scheduler = FanOutScheduler(['P1', 'P2'], routes=[], print_batch=fake_batch)
+        self.addCleanup(scheduler.close)
+        self.worker.scheduler = scheduler
+        self.worker.submit(ALL_PRINTERS, ['A', 'B', 'C'])
+        self.worker.wait_idle()
+        self.assertTrue(all(r.ok for r in self.worker.poll_events()[-1].results))
+        self.mock_batch.assert_not_called()
+        self.assertEqual(sum(printed for printed, _, _ in scheduler.stats().values()), 3)
+
+    def test_backoff_is_exponential_and_capped(self):
+        """Test the retry delays."""
+        worker = PrintWorker(retry_delay=1, max_retry_delay=5)
+        self.assertEqual([worker.retry_delay_for(n) for n in range(1, 6)], [1, 2, 4, 5, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Unit tests for printer backends and ESC/POS encoding.
+These run without Windows or a physical printer.
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escpos
+import printer_status
+import printer_utils
+
+
+class TestEscPosEncoding(unittest.TestCase):
+    """Test cases for the ESC/POS command builders."""
+
+    def test_encode_receipt_layout(self):
+        """Test that a receipt initializes, contains both texts and ends with a cut."""
+        data = escpos.encode_receipt("Wipe counters", "2025-01-02 03:04")
+        self.assertTrue(data.startswith(escpos.INIT))
+        self.assertIn(b"Wipe counters", data)
+        self.assertIn(b"2025-01-02 03:04", data)
+        self.assertLess(data.index(b"Wipe counters"), data.index(b"2025-01-02 03:04"))
+        self.assertTrue(data.endswith(escpos.cut()))
+
+    def test_encode_text_replaces_unsupported_characters(self):
+        """Test that characters outside the code page do not raise."""
+        self.assertEqual(escpos.encode_text("café ☃"), b"caf\x82 ?")
+
+    def test_feed_is_clamped(self):
+        """Test that feed counts are clamped to a single byte."""
+        self.assertEqual(escpos.feed(300), b"\x1bd\xff")
+        self.assertEqual(escpos.feed(-1), b"\x1bd\x00")
+
+
+class TestPrinterStatus(unittest.TestCase):
+    """Test cases for decoding DLE EOT status replies."""
+
+    def test_parse_status(self):
+        self.assertEqual(printer_status.parse_status(bytes([0x12, 0x12, 0x12])), printer_status.READY)
+        self.assertEqual(str(printer_status.parse_status(bytes([0x1a, 0x16, 0x12]))), "cover open")
+        self.assertEqual(str(printer_status.parse_status(bytes([0x1a, 0x32, 0x72]))), "out of paper")
+        low = printer_status.parse_status(bytes([0x12, 0x12, 0x1e]))
+        self.assertTrue(low.ready)
+        self.assertEqual(str(low), "paper low")
+        with self.assertRaises(ValueError):
+            printer_status.parse_status(b"\x00\x12\x12")
+
+
+class TestParseTargets(unittest.TestCase):
+    """Test cases for printer target specifications."""
+
+    def test_named_and_bare_targets(self):
+        """Test parsing named entries, bare entries and blank segments."""
+        targets = printer_utils.parse_targets("RONGTA 80mm=tcp://10.0.0.5:9100; ;/dev/usb/lp0")
+        self.assertEqual(targets, {
+            "RONGTA 80mm": "tcp://10.0.0.5:9100",
+            "/dev/usb/lp0": "/dev/usb/lp0",
+        })
+
+
+class TestEscPosBackend(unittest.TestCase):
+    """Test cases for the raw ESC/POS backend."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.capture = os.path.join(self.tmpdir.name, "receipts.bin")
+        self.backend = printer_utils.EscPosBackend(
+            {"RONGTA Capture": self.capture}, discover_devices=False
+        )
+        printer_utils.set_backend(self.backend)
+
+    def tearDown(self):
+        printer_utils.set_backend(None)
+        self.tmpdir.cleanup()
+
+    def test_list_and_find_rongta(self):
+        """Test that configured printers are listed and RONGTA is found."""
+        self.assertEqual(printer_utils.list_printers(), ["RONGTA Capture"])
+        self.assertEqual(printer_utils.find_rongta_printer(), "RONGTA Capture")
+
+    def test_print_task_to_file_sink(self):
+        """Test that receipts are appended to a capture file."""
+        timestamp = datetime(2025, 1, 2, 3, 4)
+        printer_utils.print_task("RONGTA Capture", "Task 1", timestamp)
+        printer_utils.print_task("RONGTA Capture", "Task 2", timestamp)
+        with open(self.capture, "rb") as f:
+            data = f.read()
+        self.assertEqual(data, escpos.encode_receipt("Task 1", "2025-01-02 03:04")
+                         + escpos.encode_receipt("Task 2", "2025-01-02 03:04"))
+
+    def test_print_task_to_tcp_socket(self):
+        """Test that receipts are sent over a raw TCP connection."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        received = []
+
+        def accept():
+            conn, _ = server.accept()
+            with conn:
+                chunks = []
+                while True:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                received.append(b"".join(chunks))
+
+        thread = threading.Thread(target=accept)
+        thread.start()
+        port = server.getsockname()[1]
+        self.backend.printers["Network"] = f"tcp://127.0.0.1:{port}"
+        # The server never answers the status query, so the receipt follows it after a short wait
+        with patch("printer_status.FIRST_REPLY_TIMEOUT", 0.1):
+            printer_utils.print_task("Network", "Task", datetime(2025, 1, 2, 3, 4))
+        thread.join(timeout=5)
+        server.close()
+        self.assertEqual(received, [printer_status.STATUS_QUERY + escpos.encode_receipt("Task", "2025-01-02 03:04")])
+
+    def test_lost_status_reply_is_asked_again(self):
+        """Test that a query whose reply is cut short is sent again instead of waiting for it forever."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        queries = []
+
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                pending = b""
+                while True:
+                    chunk = conn.recv(4096)
+                    if not chunk:
+                        break
+                    pending += chunk
+                    while printer_status.STATUS_QUERY in pending:
+                        pending = pending.split(printer_status.STATUS_QUERY, 1)[1]
+                        queries.append(1)
+                        # Only one byte of the first reply arrives
+                        conn.sendall(b"\x12" if len(queries) == 1 else b"\x12\x12\x12")
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        sink = printer_utils.open_target(f"tcp://127.0.0.1:{server.getsockname()[1]}")
+        try:
+            with patch("printer_status.REPLY_TIMEOUT", 0.2):
+                deadline = time.monotonic() + 5
+                status = None
+                while status is None and time.monotonic() < deadline:
+                    status = sink.query_status(0.1)
+        finally:
+            sink.close()
+            thread.join(timeout=5)
+            server.close()
+        self.assertEqual(status, printer_status.READY)
+        self.assertEqual(len(queries), 2)
+
+    def test_print_batch_opens_target_once(self):
+        """Test that a batch is written through a single sink with one cut per task."""
+        with patch.object(printer_utils, "open_target", wraps=printer_utils.open_target) as mock_open:
+            results = printer_utils.print_batch("RONGTA Capture", ["A", "B", "C"], datetime(2025, 1, 2))
+        mock_open.assert_called_once()
+        self.assertEqual([(r.index, r.task, r.ok) for r in results],
+                         [(1, "A", True), (2, "B", True), (3, "C", True)])
+        with open(self.capture, "rb") as f:
+            self.assertEqual(f.read().count(escpos.cut()), 3)
+
+    def test_transfer_stats(self):
+        """Test that bytes sent and wire time are recorded per printer."""
+        printer_utils.print_batch("RONGTA Capture", ["A", "B"])
+        stats = self.backend.transfer_stats()["RONGTA Capture"]
+        self.assertEqual(stats.receipts, 2)
+        self.assertEqual(stats.bytes_sent, os.path.getsize(self.capture))
+        self.assertGreaterEqual(stats.wire_seconds, 0)
+        self.assertIn("2 receipt(s)", str(stats))
+
+    def test_print_batch_broken_stream_fails_remaining(self):
+        """Test that a write failure marks the failing and remaining tasks as failed."""
+        calls = []
+
+        def flaky_write(sink, data):
+            calls.append(data)
+            if len(calls) == 2:
+                raise OSError("Connection reset")
+            sink.write(data)
+
+        with patch.object(self.backend, "_write", side_effect=flaky_write):
+            results = printer_utils.print_batch("RONGTA Capture", ["A", "B", "C"])
+        self.assertEqual([r.ok for r in results], [True, False, False])
+        self.assertEqual(results[2].error, "Connection reset")
+        self.assertEqual(len(calls), 2)
+
+    def test_print_batch_progress_and_cancel(self):
+        """Test that results are reported as they happen and cancellation stops the batch."""
+        cancel = threading.Event()
+        seen = []
+
+        def on_result(result):
+            seen.append(result.index)
+            cancel.set()
+
+        results = printer_utils.print_batch("RONGTA Capture", ["A", "B"], on_result=on_result,
+                                            cancel_event=cancel)
+        self.assertEqual(seen, [1])
+        self.assertEqual([r.task for r in results], ["A"])
+
+    def test_print_batch_unreachable_target(self):
+        """Test that failing to open the printer reports every task as failed."""
+        missing = os.path.join(self.tmpdir.name, "missing", "lp0")
+        results = printer_utils.print_batch(missing, ["A", "B"])
+        self.assertEqual([r.index for r in results], [1, 2])
+        self.assertFalse(any(r.ok for r in results))
+
+    def test_print_task_error_is_raised(self):
+        """Test that an unreachable target raises to the caller."""
+        missing = os.path.join(self.tmpdir.name, "missing", "lp0")
+        with self.assertRaises(OSError):
+            printer_utils.print_task(missing, "Task", datetime.now())
+
+
+class TestDefaultPrintBatch(unittest.TestCase):
+    """Test cases for the per-task fallback batch implementation."""
+
+    def test_fallback_reports_each_task(self):
+        """Test that the base implementation prints each task and records failures."""
+        class FlakyBackend(printer_utils.PrinterBackend):
+            def print_task(self, printer_name, task, timestamp):
+                if task == "bad":
+                    raise RuntimeError("jam")
+
+        results = FlakyBackend().print_batch("P", ["good", "bad"])
+        self.assertEqual([(r.ok, r.error) for r in results], [(True, None), (False, "jam")])
+
+
+class TestWin32Sessions(unittest.TestCase):
+    """Test cases for GDI session reuse, with pywin32 replaced by mocks."""
+
+    def setUp(self):
+        self.patchers = [patch.object(printer_utils, name) for name in
+                         ("win32print", "win32ui", "win32con", "win32gui")]
+        self.win32print, self.win32ui, _, self.win32gui = [p.start() for p in self.patchers]
+        self.win32ui.CreateDC.return_value.GetDeviceCaps.return_value = 3000  # Page height
+        self.backend = printer_utils.Win32Backend()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def test_session_reused_across_batches(self):
+        """Test that the handle, DC and fonts are created once for consecutive batches."""
+        self.assertTrue(all(r.ok for r in self.backend.print_batch("RONGTA", ["A", "B"])))
+        self.assertTrue(self.backend.print_batch("RONGTA", ["C"])[0].ok)
+        self.win32print.OpenPrinter.assert_called_once_with("RONGTA")
+        self.win32ui.CreateDC.assert_called_once()
+        self.assertEqual(self.win32ui.CreateFont.call_count, 2)
+        hdc = self.win32ui.CreateDC.return_value
+        self.assertEqual(hdc.StartDoc.call_count, 2)
+        self.assertEqual(hdc.StartPage.call_count, 3)
+        self.win32print.ClosePrinter.assert_not_called()
+
+    def test_long_receipt_spans_pages(self):
+        """Test that a receipt taller than the page continues on another page."""
+        self.win32ui.CreateDC.return_value.GetDeviceCaps.return_value = 200
+        self.assertTrue(self.backend.print_batch("RONGTA", ["word " * 60])[0].ok)
+        self.assertGreater(self.win32ui.CreateDC.return_value.StartPage.call_count, 1)
+
+    def test_close_releases_everything(self):
+        """Test that closing the backend frees the DC, both fonts and the handle."""
+        self.backend.print_batch("RONGTA", ["A"])
+        self.backend.close()
+        self.win32ui.CreateDC.return_value.DeleteDC.assert_called_once()
+        self.assertEqual(self.win32gui.DeleteObject.call_count, 2)
+        self.win32print.ClosePrinter.assert_called_once()
+        self.backend.print_batch("RONGTA", ["B"])
+        self.assertEqual(self.win32print.OpenPrinter.call_count, 2)
+
+    def test_failed_document_discards_session(self):
+        """Test that a spooler failure fails the batch and reopens the printer next time."""
+        self.win32ui.CreateDC.return_value.StartDoc.side_effect = [RuntimeError("spooler"), None]
+        results = self.backend.print_batch("RONGTA", ["A", "B"])
+        self.assertEqual([r.error for r in results], ["spooler", "spooler"])
+        self.win32print.ClosePrinter.assert_called_once()
+        self.assertTrue(self.backend.print_batch("RONGTA", ["C"])[0].ok)
+        self.assertEqual(self.win32print.OpenPrinter.call_count, 2)
+
+    def test_failure_after_pages_reports_each_task_once(self):
+        """Test that a failure late in the document does not report printed tasks again as failed."""
+        self.win32ui.CreateDC.return_value.EndDoc.side_effect = [RuntimeError("spooler"), None]
+        seen = []
+        results = self.backend.print_batch("RONGTA", ["A", "B"], on_result=seen.append)
+        self.assertEqual([(r.index, r.ok) for r in seen], [(1, True), (2, True)])
+        self.assertEqual(results, seen)
+        self.win32print.ClosePrinter.assert_called_once()
+        self.assertTrue(self.backend.print_batch("RONGTA", ["C"])[0].ok)
+        self.assertEqual(self.win32print.OpenPrinter.call_count, 2)
+
+
+class TestPrinterCache(unittest.TestCase):
+    """Test cases for the cached printer enumeration."""
+
+    def setUp(self):
+        self.backend = printer_utils.EscPosBackend({"RONGTA": "/dev/null"}, discover_devices=False)
+        printer_utils.set_backend(self.backend)
+
+    def tearDown(self):
+        printer_utils.set_backend(None)
+
+    def test_enumeration_is_cached(self):
+        """Test that list_printers and find_rongta_printer share one enumeration."""
+        with patch.object(self.backend, "list_printers", wraps=self.backend.list_printers) as mock_list:
+            self.assertEqual(printer_utils.list_printers(), ["RONGTA"])
+            self.assertEqual(printer_utils.find_rongta_printer(), "RONGTA")
+            mock_list.assert_called_once()
+
+    def test_refresh_and_expiry(self):
+        """Test that refresh and an expired TTL both enumerate again."""
+        with patch.object(self.backend, "list_printers", return_value=["A"]) as mock_list:
+            printer_utils.list_printers()
+            printer_utils.list_printers(refresh=True)
+            self.assertEqual(mock_list.call_count, 2)
+            with patch.object(printer_utils, "PRINTER_CACHE_TTL", 0):
+                printer_utils.list_printers()
+            self.assertEqual(mock_list.call_count, 3)
+
+    def test_cached_list_is_a_copy(self):
+        """Test that callers cannot mutate the cached list."""
+        printer_utils.list_printers().append("Bogus")
+        self.assertEqual(printer_utils.list_printers(), ["RONGTA"])
+
+
+class TestBackendSelection(unittest.TestCase):
+    """Test cases for choosing the default backend."""
+
+    def test_env_var_selects_escpos(self):
+        """Test that the environment variable selects the ESC/POS backend."""
+        with patch.dict(os.environ, {printer_utils.BACKEND_ENV_VAR: "escpos"}):
+            self.assertIsInstance(printer_utils.create_backend(), printer_utils.EscPosBackend)
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name raises ValueError."""
+        with self.assertRaises(ValueError):
+            printer_utils.create_backend("carrier-pigeon")
+
+    def test_fallback_without_pywin32(self):
+        """Test that ESC/POS is the default when pywin32 is unavailable."""
+        with patch.object(printer_utils, "win32print", None), patch.dict(os.environ, {}, clear=True):
+            self.assertIsInstance(printer_utils.create_backend(), printer_utils.EscPosBackend)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit tests for raster receipt rendering and GS v 0 encoding.
+Skipped when the optional numpy and Pillow packages are not installed.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escpos
+import printer_utils
+import raster
+from receipt_layout import FontSpec
+
+if raster.available():
+    import numpy as np
+    from PIL import Image
+
+TASK_FONT = FontSpec('Arial', 44, bold=True)
+TIME_FONT = FontSpec('Arial', 20)
+
+
+@unittest.skipUnless(raster.available(), "numpy and Pillow are required for raster mode")
+class TestRasterEncoding(unittest.TestCase):
+    """Test cases for bit packing and GS v 0 commands."""
+
+    def test_pack_bits_msb_first_with_padding(self):
+        """Test that the leftmost pixel is the high bit and rows pad to whole bytes."""
+        bitmap = np.zeros((2, 10), dtype=bool)
+        bitmap[0, 0] = True
+        bitmap[1, 9] = True
+        self.assertEqual(raster.pack_bits(bitmap).tolist(), [[0x80, 0x00], [0x00, 0x40]])
+
+    def test_encode_raster_bands(self):
+        """Test that tall images are split into bands, each with its own header."""
+        bitmap = np.ones((5, 16), dtype=bool)
+        data = raster.encode_raster(bitmap, band_rows=2)
+        expected = b''.join(escpos.raster_header(2, rows) + b'\xff' * 2 * rows for rows in (2, 2, 1))
+        self.assertEqual(data, expected)
+
+    def test_raster_header(self):
+        """Test the little-endian width and height fields."""
+        self.assertEqual(escpos.raster_header(72, 300), b'\x1dv0\x00\x48\x00\x2c\x01')
+
+
+@unittest.skipUnless(raster.available(), "numpy and Pillow are required for raster mode")
+class TestRasterRendering(unittest.TestCase):
+    """Test cases for receipt rendering."""
+
+    def test_render_receipt(self):
+        """Test that a receipt renders at full width with ink in the task and timestamp rows."""
+        bitmap = raster.render_receipt("Mop floors", "2025-01-02 03:04", TASK_FONT, TIME_FONT, 576, 20)
+        self.assertEqual(bitmap.shape[1], 576)
+        self.assertEqual(bitmap.dtype, bool)
+        self.assertTrue(bitmap[40:84].any())
+        self.assertTrue(bitmap[124:144].any())
+        self.assertFalse(bitmap[:, :20].any())
+
+    def test_rendered_lines_are_cached(self):
+        """Test that static text is rasterized once and shared read-only."""
+        first = raster.render_line("OPENING CHECKLIST", TIME_FONT)
+        hits = raster.render_line.cache_info().hits
+        second = raster.render_line("OPENING CHECKLIST", TIME_FONT)
+        self.assertIs(first, second)
+        self.assertEqual(raster.render_line.cache_info().hits, hits + 1)
+        self.assertFalse(first.flags.writeable)
+
+    def test_lines_are_drawn_in_the_measured_font(self):
+        """Test that a substitute layout font resolves to the font its widths were measured from."""
+        for spec in (TASK_FONT, TIME_FONT):
+            layout_spec, measured = raster.resolve_font(spec)
+            drawn_spec, drawn = raster.resolve_font(layout_spec)
+            with self.subTest(font=spec):
+                self.assertEqual(drawn_spec, layout_spec)
+                self.assertEqual(drawn.getname(), measured.getname())
+                self.assertEqual(drawn.size, measured.size)
+                self.assertEqual(drawn.getlength("Mop floors"), measured.getlength("Mop floors"))
+
+    def test_logo_is_scaled_and_cached(self):
+        """Test that logos are scaled to the paper width and loaded once."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "logo.png")
+            Image.new('L', (1152, 100), 0).save(path)
+            logo = raster.load_image(path, 576)
+            self.assertEqual(logo.shape, (50, 576))
+            self.assertTrue(logo.all())
+            self.assertIs(raster.load_image(path, 576), logo)
+            bitmap = raster.render_receipt("Task", "t", TASK_FONT, TIME_FONT, 576, 20, logo)
+            self.assertTrue(bitmap[20:70].all())
+
+    def test_escpos_backend_raster_mode(self):
+        """Test that the raster backend mode sends an image instead of text."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            capture = os.path.join(tmpdir, "receipts.bin")
+            backend = printer_utils.EscPosBackend({"P": capture}, discover_devices=False, mode="raster")
+            backend.print_task("P", "Mop floors", datetime(2025, 1, 2, 3, 4))
+            with open(capture, "rb") as f:
+                data = f.read()
+        self.assertIn(b'\x1dv0\x00', data)
+        self.assertNotIn(b"Mop floors", data)
+        self.assertTrue(data.endswith(escpos.cut()))
+        stats = backend.transfer_stats()["P"]
+        self.assertEqual((stats.receipts, stats.bytes_sent), (1, len(data)))
+
+    def test_compression_shrinks_receipts(self):
+        """Test that compact encoding of a real receipt is much smaller than plain."""
+        bitmap = raster.render_receipt("Mop floors", "2025-01-02 03:04", TASK_FONT, TIME_FONT, 576, 20)
+        plain = raster.encode_raster(bitmap, compression=raster.COMPRESSION_NONE)
+        compact = raster.encode_raster(bitmap, compression=raster.COMPRESSION_COMPACT)
+        self.assertLess(len(compact), len(plain) / 2)
+        self.assertEqual(raster.encode_raster(bitmap, compression=raster.COMPRESSION_AUTO), compact)
+
+
+@unittest.skipUnless(raster.available(), "numpy and Pillow are required for raster mode")
+class TestRasterCompression(unittest.TestCase):
+    """Test cases for blank-band skipping and trimming."""
+
+    def test_blank_rows_become_feeds(self):
+        """Test that long blank runs are fed instead of sent, and bands are right-trimmed."""
+        bitmap = np.zeros((32, 32), dtype=bool)
+        bitmap[0:2, 0:8] = True
+        bitmap[22:24, 0:16] = True
+        data = raster.encode_raster(bitmap, compression=raster.COMPRESSION_COMPACT)
+        expected = (escpos.raster_header(1, 2) + b'\xff\xff'
+                    + escpos.feed_dots(20)
+                    + escpos.raster_header(2, 2) + b'\xff' * 4
+                    + escpos.feed_dots(8))
+        self.assertEqual(data, expected)
+
+    def test_short_blank_runs_stay_in_image(self):
+        """Test that gaps shorter than MIN_BLANK_ROWS are kept in the band."""
+        bitmap = np.zeros((4, 8), dtype=bool)
+        bitmap[0] = bitmap[3] = True
+        data = raster.encode_raster(bitmap, compression=raster.COMPRESSION_COMPACT)
+        self.assertEqual(data, escpos.raster_header(1, 4) + b'\xff\x00\x00\xff')
+
+    def test_auto_falls_back_to_plain(self):
+        """Test that auto keeps the plain encoding when compaction does not help."""
+        bitmap = np.ones((3, 16), dtype=bool)
+        self.assertEqual(raster.encode_raster(bitmap, compression=raster.COMPRESSION_AUTO),
+                         raster.encode_raster(bitmap, compression=raster.COMPRESSION_NONE))
+
+    def test_unknown_compression(self):
+        """Test that an unknown compression name raises ValueError."""
+        with self.assertRaises(ValueError):
+            raster.encode_raster(np.ones((1, 8), dtype=bool), compression="zip")
+
+    def test_feed_dots_splits_long_feeds(self):
+        """Test that feeds beyond 255 dots use several commands."""
+        self.assertEqual(escpos.feed_dots(300), b'\x1bJ\xff\x1bJ\x2d')
+        self.assertEqual(escpos.feed_dots(0), b'')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the headless command-line mode.
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import printer_utils
+import receipt_cli
+
+
+class TestReceiptCli(unittest.TestCase):
+    """Test cases for receipt_cli."""
+
+    def setUp(self):
+        self.batches = []
+        self.failing = set()
+        patcher = patch('printer_utils.print_batch', side_effect=self._print_batch)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('printer_utils.find_rongta_printer', return_value='RONGTA 80mm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        stderr = patch('sys.stderr', new_callable=io.StringIO)
+        self.stderr = stderr.start()
+        self.addCleanup(stderr.stop)
+
+    def _print_batch(self, printer_name, tasks, *args, **kwargs):
+        self.batches.append((printer_name, list(tasks)))
+        return [printer_utils.TaskResult(i, task, 'Out of paper' if task in self.failing else None)
+                for i, task in enumerate(tasks, 1)]
+
+    def test_tasks_from_arguments(self):
+        """Test that argument tasks print in one job to the RONGTA printer."""
+        self.assertEqual(receipt_cli.main(['Task 1', 'Task 2']), receipt_cli.EXIT_OK)
+        self.assertEqual(self.batches, [('RONGTA 80mm', ['Task 1', 'Task 2'])])
+        self.assertIn("Printed 2 of 2 task(s)", self.stderr.getvalue())
+
+    def test_stdin_is_streamed(self):
+        """Test that each stdin line prints before the next one is read."""
+        printed_before_read = []
+
+        def lines():
+            for line in ['  First  \n', '\n', 'Second\n']:
+                printed_before_read.append(len(self.batches))
+                yield line
+
+        self.assertEqual(receipt_cli.main(['-p', 'Kitchen'], stdin=lines()), receipt_cli.EXIT_OK)
+        self.assertEqual(self.batches, [('Kitchen', ['First']), ('Kitchen', ['Second'])])
+        self.assertEqual(printed_before_read, [0, 1, 1])
+
+    def test_file_in_batches(self):
+        """Test that a task file is printed in batches of the requested size."""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('A\nB\nC\n')
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(receipt_cli.main(['-f', f.name, '-b', '2']), receipt_cli.EXIT_OK)
+        self.assertEqual([tasks for _, tasks in self.batches], [['A', 'B'], ['C']])
+
+    def test_csv_file_column(self):
+        """Test that a CSV file prints the named column, and a missing column is a usage error."""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('table,task\n4,Soup\n7,Salad\n')
+        self.addCleanup(os.remove, f.name)
+        self.assertEqual(receipt_cli.main(['-f', f.name, '-c', 'task']), receipt_cli.EXIT_OK)
+        self.assertEqual(self.batches, [('RONGTA 80mm', ['Soup', 'Salad'])])
+        self.assertEqual(receipt_cli.main(['-f', f.name, '-c', 'notes']), receipt_cli.EXIT_USAGE)
+        self.assertEqual(receipt_cli.main(['-f', f.name, '-c', '2', '--no-header']), receipt_cli.EXIT_OK)
+        self.assertEqual(self.batches[-1], ('RONGTA 80mm', ['task', 'Soup', 'Salad']))
+
+    def test_failure_sets_exit_status(self):
+        """Test that any failed task makes the command fail and is reported."""
+        self.failing = {'B'}
+        self.assertEqual(receipt_cli.main(['A', 'B']), receipt_cli.EXIT_FAILED)
+        self.assertIn("Failed to print 'B': Out of paper", self.stderr.getvalue())
+
+    def test_no_printer(self):
+        """Test that a missing printer is a usage error."""
+        with patch('printer_utils.find_rongta_printer', return_value=None):
+            self.assertEqual(receipt_cli.main(['A']), receipt_cli.EXIT_USAGE)
+        self.assertEqual(self.batches, [])
+
+
+class TestHeadlessStartup(unittest.TestCase):
+    """Test that headless mode never loads the GUI toolkit, nor numpy and Pillow for text receipts."""
+
+    def test_tkinter_not_imported(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        code = ("import sys, runpy; sys.argv = ['main.py', '--cli', '--list-printers']\n"
+                "try:\n    runpy.run_path('main.py', run_name='__main__')\n"
+                "except SystemExit as e:\n    assert e.code == 0, e.code\n"
+                "assert 'tkinter' not in sys.modules\n"
+                "assert not {'numpy', 'PIL', 'raster'} & set(sys.modules), 'raster imported'")
+        env = dict(os.environ, RECEIPT_PRINTER_BACKEND='escpos', RECEIPT_PRINTERS='')
+        subprocess.run([sys.executable, '-c', code], cwd=here, env=env, check=True,
+                       capture_output=True, timeout=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
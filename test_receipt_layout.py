@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the receipt layout engine.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escpos
+from receipt_layout import (FontSpec, PlacedLine, center_x, layout_receipt, paginate,
+                            text_width, wrap_text)
+
+ARIAL_44_BOLD = FontSpec('Arial', 44, bold=True)
+ARIAL_20 = FontSpec('Arial', 20)
+MONO = FontSpec('Mono', 24, fixed_width=10)
+
+
+class TestMeasurement(unittest.TestCase):
+    """Test cases for glyph-width based measurement."""
+
+    def test_proportional_widths(self):
+        """Test that narrow glyphs measure narrower than wide ones and bold is wider."""
+        self.assertLess(text_width(ARIAL_20, "iiii"), text_width(ARIAL_20, "WWWW"))
+        self.assertGreater(text_width(FontSpec('Arial', 20, bold=True), "task"),
+                           text_width(ARIAL_20, "task"))
+        self.assertEqual(text_width(ARIAL_20, ""), 0)
+
+    def test_fixed_width_and_unknown_characters(self):
+        """Test fixed-width fonts and characters outside the width table."""
+        self.assertEqual(text_width(MONO, "abc"), 30)
+        self.assertGreater(text_width(ARIAL_20, "日本"), 0)
+
+    def test_measurements_are_cached(self):
+        """Test that repeated measurements hit the LRU cache."""
+        text_width(ARIAL_20, "cached measurement")
+        hits = text_width.cache_info().hits
+        text_width(ARIAL_20, "cached measurement")
+        self.assertEqual(text_width.cache_info().hits, hits + 1)
+
+
+class TestWrapText(unittest.TestCase):
+    """Test cases for word wrapping."""
+
+    def test_wraps_on_word_boundaries(self):
+        """Test greedy wrapping at spaces."""
+        self.assertEqual(wrap_text("aa bb cc", MONO, 50), ["aa bb", "cc"])
+
+    def test_lines_fit_width(self):
+        """Test that every wrapped line fits the width."""
+        text = "Restock the walk-in cooler and check every temperature log twice " * 3
+        lines = wrap_text(text, ARIAL_44_BOLD, 600)
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(text_width(ARIAL_44_BOLD, line) <= 600 for line in lines))
+        self.assertEqual(" ".join(lines), " ".join(text.split()))
+
+    def test_breaks_overlong_words(self):
+        """Test that words wider than a line are split."""
+        self.assertEqual(wrap_text("abcdefghij k", MONO, 40), ["abcd", "efgh", "ij k"])
+
+    def test_keeps_explicit_newlines(self):
+        """Test that newlines start new lines and blank lines survive."""
+        self.assertEqual(wrap_text("a\n\nb", MONO, 100), ["a", "", "b"])
+
+
+class TestLayout(unittest.TestCase):
+    """Test cases for receipt layout and pagination."""
+
+    def test_layout_centers_task_and_places_timestamp_below(self):
+        """Test that task lines are centered and the timestamp follows them."""
+        lines, bottom = layout_receipt("Mop floors", "2025-01-02 03:04", ARIAL_44_BOLD,
+                                       ARIAL_20, width=639, margin=20)
+        task, stamp = lines
+        self.assertEqual(task.x, center_x(ARIAL_44_BOLD, "Mop floors", 639, 20))
+        self.assertEqual(task.y, 40)
+        self.assertEqual(stamp, PlacedLine("2025-01-02 03:04", 20, 124, ARIAL_20))
+        self.assertEqual(bottom, 144)
+
+    def test_center_respects_margin(self):
+        """Test that lines wider than the paper start at the margin."""
+        self.assertEqual(center_x(MONO, "x" * 100, 100, 5), 5)
+
+    def test_paginate(self):
+        """Test that overflowing lines move to a new page starting at the margin."""
+        lines = [PlacedLine(str(i), 0, 10 + i * 30, MONO) for i in range(5)]
+        pages = paginate(lines, page_height=100, margin=10)
+        self.assertEqual([[line.text for line in page] for page in pages], [["0", "1"], ["2", "3"], ["4"]])
+        self.assertEqual(pages[0][0].y, 10)
+        self.assertEqual([line.y for line in pages[1]], [10, 40])
+
+
+class TestEscPosWrapping(unittest.TestCase):
+    """Test cases for wrapping in the ESC/POS encoder."""
+
+    def test_long_task_wraps_at_word_boundaries(self):
+        """Test that double-size task text wraps at 24 columns."""
+        data = escpos.encode_receipt("Wipe down every table in the dining room", "t")
+        self.assertIn(b"Wipe down every table in\nthe dining room\n", data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Unit tests for receipt templates.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import escpos
+import printer_utils
+import raster
+import receipt_template
+from receipt_layout import layout_receipt
+
+TIMESTAMP = datetime(2025, 1, 2, 3, 4)
+
+
+class TestReceiptTemplate(unittest.TestCase):
+    """Test cases for receipt_template."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, data, name='receipt.json'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        return path
+
+    def test_default_template_is_the_standard_receipt(self):
+        template = receipt_template.DEFAULT_TEMPLATE
+        task = "Wipe down every table in the dining room before the lunch service"
+
+        self.assertEqual(template.encode(task, TIMESTAMP), escpos.encode_receipt(task, "2025-01-02 03:04"))
+        self.assertEqual(template.layout(task, "t", template.task_font, template.text_font, 640, 20),
+                         layout_receipt(task, "t", template.task_font, template.text_font, 640, 20))
+
+    def test_only_fields_are_filled_per_receipt(self):
+        template = receipt_template.compile_template(receipt_template.parse_template({
+            'header': ["KITCHEN", "Table {task}"], 'timestamp': "At {time}", 'time_format': "%H:%M",
+            'footer': "Thank you", 'feed_lines': 2, 'cut': False,
+        }))
+
+        data = template.encode("Soup", TIMESTAMP)
+
+        self.assertTrue(data.startswith(escpos.INIT + escpos.ALIGN_CENTER + b"KITCHEN\nTable Soup\n"))
+        self.assertIn(b"At 03:04\n", data)
+        self.assertTrue(data.endswith(b"Thank you\n" + escpos.ALIGN_LEFT + escpos.feed(2)))
+        # Static text is compiled to bytes; only the lines with fields are filled in per receipt
+        self.assertEqual(sum(not isinstance(part, bytes) for part in template._parts), 3)
+
+    def test_static_header_is_laid_out_once(self):
+        template = receipt_template.compile_template(receipt_template.TemplateSpec(header=("KITCHEN",)))
+        first, _ = template.layout("A", "t", template.task_font, template.text_font, 640, 20)
+        second, bottom = template.layout("B", "t", template.task_font, template.text_font, 640, 20)
+
+        self.assertIs(first[0], second[0])
+        self.assertEqual([line.text for line in second], ["KITCHEN", "B", "t"])
+        self.assertEqual(bottom, second[-1].y + template.text_font.height)
+
+    def test_invalid_templates_are_rejected(self):
+        for data in ({'body': "{table}"}, {'colour': "red"}, {'cut': "yes"}, {'header': [1]}, []):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                receipt_template.compile_template(receipt_template.parse_template(data))
+
+    def test_compiled_template_is_cached_until_the_file_changes(self):
+        path = self._write({'header': "BAR"})
+        first = receipt_template.load_template(path)
+        self.assertIs(receipt_template.load_template(path), first)
+
+        self._write({'header': "KITCHEN"})
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = receipt_template.load_template(path)
+
+        self.assertIsNot(second, first)
+        self.assertEqual(second.spec.header, ("KITCHEN",))
+        self.assertIs(receipt_template.load_template(None), receipt_template.DEFAULT_TEMPLATE)
+
+    def test_backend_prints_with_template(self):
+        path = self._write({'header': "BAR", 'cut': False})
+        capture = os.path.join(self.tmp.name, 'capture.bin')
+        backend = printer_utils.EscPosBackend({'Capture': capture}, discover_devices=False,
+                                              mode=printer_utils.ESCPOS_TEXT, template_path=path)
+
+        backend.print_task('Capture', "Soup", TIMESTAMP)
+
+        with open(capture, 'rb') as f:
+            data = f.read()
+        self.assertIn(b"BAR\n", data)
+        self.assertNotIn(escpos.cut(), data)
+
+    @unittest.skipUnless(raster.available(), "numpy and Pillow are not installed")
+    def test_raster_receipt_uses_template_layout(self):
+        template = receipt_template.compile_template(receipt_template.TemplateSpec(header=("KITCHEN",)))
+        plain = raster.render_receipt("Soup", "t", template.task_font, template.text_font, 576, 20)
+        with_header = raster.render_receipt("Soup", "t", template.task_font, template.text_font, 576, 20,
+                                            template=template)
+
+        self.assertGreater(with_header.shape[0], plain.shape[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
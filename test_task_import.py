@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for bulk task import.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import task_import
+
+
+class TestTaskImport(unittest.TestCase):
+    """Test cases for task_import."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        return path
+
+    def _import(self, path, column=None):
+        with task_import.open_tasks(path) as source:
+            return list(task_import.file_tasks(source, path, column))
+
+    def test_text_file_yields_stripped_non_blank_lines(self):
+        path = self._write('tasks.txt', "﻿Buy milk\r\n\r\n  Call supplier  \nTable 4\n")
+
+        self.assertEqual(self._import(path), ["Buy milk", "Call supplier", "Table 4"])
+
+    def test_csv_column_by_number_and_by_name(self):
+        path = self._write('orders.csv', 'table,task\n4,"Soup, no salt"\n7,\n9,Salad\n')
+
+        self.assertEqual(self._import(path, 2), ["Soup, no salt", "Salad"])
+        self.assertEqual(self._import(path, 'Task'), ["Soup, no salt", "Salad"])
+
+    def test_csv_header_row_is_not_a_task(self):
+        headed = self._write('orders.csv', 'table,task\n4,Soup\n7,Salad\n')
+        plain = self._write('plain.csv', '4,Soup\n7,Salad\n')
+
+        # Detected from the numeric column, or stated when there is nothing to detect it from
+        self.assertEqual(self._import(headed, 2), ["Soup", "Salad"])
+        self.assertEqual(self._import(plain, 2), ["Soup", "Salad"])
+        with task_import.open_tasks(headed) as source:
+            self.assertTrue(task_import.has_header(source))
+        single = self._write('single.csv', 'task\nSoup\nSalad\n')
+        with task_import.open_tasks(single) as source:
+            self.assertEqual(list(task_import.file_tasks(source, single, 1, header=True)), ["Soup", "Salad"])
+        with task_import.open_tasks(headed) as source:
+            self.assertEqual(list(task_import.file_tasks(source, headed, 2, header=False)),
+                             ["task", "Soup", "Salad"])
+
+    def test_missing_csv_column_is_reported(self):
+        path = self._write('orders.csv', 'table,task\n4,Soup\n')
+
+        with self.assertRaises(ValueError):
+            self._import(path, 'notes')
+        with self.assertRaises(ValueError):
+            self._import(path, 0)
+
+    def test_parse_column(self):
+        self.assertEqual(task_import.parse_column(' 3 '), 3)
+        self.assertEqual(task_import.parse_column('Task'), 'Task')
+
+    def test_large_file_is_streamed_in_chunks(self):
+        path = self._write('tasks.txt', ''.join(f"Task {i}\n" for i in range(50000)))
+
+        started = time.perf_counter()
+        with task_import.open_tasks(path) as source:
+            sizes = [len(chunk) for chunk in task_import.chunked(task_import.file_tasks(source, path),
+                                                                 task_import.IMPORT_CHUNK_SIZE)]
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(sizes, [task_import.IMPORT_CHUNK_SIZE] * 10)
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the virtual task list view, using stand-ins for the Tk widgets.
+"""
+
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from task_list_view import WHEEL_ROWS, VirtualListbox
+
+
+class FakeListbox:
+    """The parts of tk.Listbox the view uses, counting row inserts and deletes."""
+
+    def __init__(self, height=5):
+        self.rows = []
+        self.selected = set()
+        self.options = {'height': height}
+        self.bindings = {}
+        self.inserted = 0
+        self.deleted = 0
+
+    def cget(self, option):
+        return self.options[option]
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def bind(self, sequence, func):
+        self.bindings[sequence] = func
+
+    def insert(self, index, *rows):
+        assert index == 'end'
+        self.rows.extend(rows)
+        self.inserted += len(rows)
+
+    def delete(self, first, last):
+        assert last == 'end'
+        self.deleted += len(self.rows) - first
+        del self.rows[first:]
+        self.selected = {row for row in self.selected if row < first}
+
+    def get(self, index):
+        return self.rows[index]
+
+    def size(self):
+        return len(self.rows)
+
+    def curselection(self):
+        return tuple(sorted(self.selected))
+
+    def selection_set(self, index):
+        self.selected.add(index)
+
+    def selection_clear(self, first, last):
+        self.selected.clear()
+
+    def activate(self, index):
+        pass
+
+
+class FakeScrollbar:
+    def __init__(self):
+        self.options = {}
+        self.position = None
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+class TestVirtualListbox(unittest.TestCase):
+    """Test cases for VirtualListbox."""
+
+    def setUp(self):
+        self.tasks = [f"Task {i}" for i in range(1, 101)]
+        self.listbox = FakeListbox(height=5)
+        self.scrollbar = FakeScrollbar()
+        self.view = VirtualListbox(self.listbox, self.scrollbar, lambda: len(self.tasks),
+                                   lambda i: f"{i + 1}. {self.tasks[i]}")
+        self.view.refresh()
+        self.listbox.inserted = self.listbox.deleted = 0
+
+    def test_only_visible_rows_are_rendered(self):
+        self.assertEqual(self.listbox.rows, [f"{i}. Task {i}" for i in range(1, 6)])
+        self.assertEqual(self.scrollbar.position, (0.0, 0.05))
+        self.assertEqual(self.scrollbar.options['command'], self.view.yview)
+
+    def test_removal_redraws_rows_from_the_removed_one(self):
+        del self.tasks[2]
+
+        self.view.refresh(2)
+
+        self.assertEqual(self.listbox.rows, ["1. Task 1", "2. Task 2", "3. Task 4", "4. Task 5", "5. Task 6"])
+        self.assertEqual((self.listbox.deleted, self.listbox.inserted), (3, 3))
+
+    def test_changes_below_the_window_touch_no_rows(self):
+        self.tasks.append("Task 101")
+
+        self.view.refresh(100)
+
+        self.assertEqual((self.listbox.deleted, self.listbox.inserted), (0, 0))
+        self.assertEqual(self.scrollbar.position[1], 5 / 101)
+
+    def test_short_list_is_rendered_in_full(self):
+        self.tasks[:] = ["Task 1", "Task 2"]
+
+        self.view.refresh()
+
+        self.assertEqual(self.listbox.rows, ["1. Task 1", "2. Task 2"])
+        self.assertEqual(self.scrollbar.position, (0.0, 1.0))
+
+    def test_scrollbar_moves_window_and_keeps_selection(self):
+        self.listbox.selection_set(4)
+
+        self.view.yview('scroll', '2', 'units')
+
+        self.assertEqual(self.listbox.rows[0], "3. Task 3")
+        self.assertEqual(self.view.selection(), [4])
+        self.view.yview('moveto', '1.0')
+        self.assertEqual(self.listbox.rows, [f"{i}. Task {i}" for i in range(96, 101)])
+        self.view.yview('scroll', '-1', 'pages')
+        self.assertEqual(self.view.first, 90)
+
+    def test_window_is_clamped_when_tasks_are_removed_at_the_end(self):
+        self.view.scroll_to(95)
+        del self.tasks[-10:]
+
+        self.view.refresh(90)
+
+        self.assertEqual(self.view.first, 85)
+        self.assertEqual(self.listbox.rows, [f"{i}. Task {i}" for i in range(86, 91)])
+
+    def test_selection_maps_rows_to_task_indexes(self):
+        self.view.scroll_to(40)
+        self.listbox.selection_set(1)
+
+        self.assertEqual(self.view.selection(), [41])
+
+    def test_mouse_wheel_and_keys_scroll_the_window(self):
+        result = self.listbox.bindings['<MouseWheel>'](SimpleNamespace(num=0, delta=-120))
+        self.assertEqual(result, 'break')
+        self.assertEqual(self.view.first, WHEEL_ROWS)
+
+        self.listbox.selection_set(4)
+        self.listbox.bindings['<Down>'](SimpleNamespace(keysym='Down'))
+        self.assertEqual(self.view.first, WHEEL_ROWS + 1)
+        self.assertEqual(self.view.selection(), [WHEEL_ROWS + 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
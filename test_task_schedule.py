@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for scheduled printing.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import task_schedule
+from task_schedule import TaskScheduler, parse_cron
+
+SATURDAY = datetime(2026, 10, 17, 8, 0)
+
+
+class TestCronRule(unittest.TestCase):
+    """Test cases for parse_cron and CronRule.next_after."""
+
+    def test_next_due_times(self):
+        cases = [
+            ("30 7 * * mon-sat", SATURDAY, datetime(2026, 10, 19, 7, 30)),
+            ("*/15 9-17 * * *", datetime(2026, 1, 1, 17, 50), datetime(2026, 1, 2, 9, 0)),
+            ("0 22 * * 0", SATURDAY, datetime(2026, 10, 18, 22, 0)),
+            ("0 0 29 feb *", SATURDAY, datetime(2028, 2, 29, 0, 0)),
+            ("@daily", SATURDAY, datetime(2026, 10, 18, 0, 0)),
+            # Both day fields restricted: either one makes the day due, as in cron
+            ("0 12 1 * fri", datetime(2026, 1, 1, 13, 0), datetime(2026, 1, 2, 12, 0)),
+        ]
+        for text, after, expected in cases:
+            with self.subTest(rule=text):
+                self.assertEqual(parse_cron(text).next_after(after), expected)
+
+    def test_invalid_rules_are_rejected(self):
+        for text in ("* * * *", "60 * * * *", "* * * * funday", "*/0 * * * *", "5-1 * * * *"):
+            with self.subTest(rule=text), self.assertRaises(ValueError):
+                parse_cron(text)
+        with self.assertRaises(ValueError):
+            parse_cron("0 0 31 feb *").next_after(SATURDAY)
+
+
+class TestTaskScheduler(unittest.TestCase):
+    """Test cases for TaskScheduler."""
+
+    def setUp(self):
+        self.now = SATURDAY.timestamp()
+        self.scheduler = TaskScheduler(clock=lambda: self.now)
+
+    def test_jobs_come_due_in_order(self):
+        later = self.scheduler.add_once(self.now + 120, ["Later"])
+        sooner = self.scheduler.add_once(self.now + 60, ["Sooner"], printer="RONGTA Bar", name="Bar")
+
+        self.assertEqual(self.scheduler.next_due(), self.now + 60)
+        self.assertEqual(self.scheduler.pop_due(self.now + 59), [])
+        due = self.scheduler.pop_due(self.now + 300)
+
+        self.assertEqual([job.id for job in due], [sooner, later])
+        self.assertEqual((due[0].name, due[0].printer), ("Bar", "RONGTA Bar"))
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertIsNone(self.scheduler.next_due())
+
+    def test_recurring_job_runs_once_after_missed_times(self):
+        job_id = self.scheduler.add_recurring("0 * * * *", ["Check fridge temperature"])
+        self.assertEqual(self.scheduler.next_due(), datetime(2026, 10, 17, 9, 0).timestamp())
+
+        # Asleep for three hours: the job runs once, then waits for its next hour
+        self.now = datetime(2026, 10, 17, 11, 30).timestamp()
+        self.assertEqual([job.id for job in self.scheduler.pop_due()], [job_id])
+        self.assertEqual(self.scheduler.next_due(), datetime(2026, 10, 17, 12, 0).timestamp())
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_cancel(self):
+        first = self.scheduler.add_once(self.now + 60, ["A"])
+        second = self.scheduler.add_once(self.now + 120, ["B"])
+
+        self.assertTrue(self.scheduler.cancel(first))
+        self.assertFalse(self.scheduler.cancel(first))
+        self.assertEqual(self.scheduler.next_due(), self.now + 120)
+        self.assertEqual([job.id for job in self.scheduler.pop_due(self.now + 300)], [second])
+        with self.assertRaises(ValueError):
+            self.scheduler.add_once(self.now, [])
+
+    def test_many_jobs_are_cheap(self):
+        started = time.perf_counter()
+        job_ids = [self.scheduler.add_once(self.now + i, [f"Task {i}"]) for i in range(20000)]
+        for job_id in job_ids[::2]:
+            self.scheduler.cancel(job_id)
+        due = self.scheduler.pop_due(self.now + 100)
+
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual([job.id for job in due], job_ids[1:101:2])
+        # Cancelled entries do not pile up in the heap
+        self.assertLess(len(self.scheduler._heap), 15000)
+
+    def test_load_schedule(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'schedule.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([
+                    {"name": "Opening", "cron": "30 7 * * mon-sat", "tasks": ["Unlock doors", "Start coffee"],
+                     "printer": "RONGTA Kitchen"},
+                    {"at": "2026-10-17 09:00", "tasks": "Count stock"},
+                    {"at": "2026-10-16 09:00", "tasks": "Already passed"},
+                ], f)
+
+            job_ids = task_schedule.load_schedule(path, self.scheduler)
+
+            self.assertEqual(len(job_ids), 2)
+            jobs = self.scheduler.jobs()
+            self.assertEqual([job.tasks for job in jobs], [("Count stock",), ("Unlock doors", "Start coffee")])
+            self.assertEqual(str(jobs[1].rule), "30 7 * * mon-sat")
+
+            for bad in ([{"tasks": ["A"]}], [{"cron": "@daily", "tasks": []}], {"cron": "@daily"},
+                        [{"at": "tomorrow", "tasks": ["A"]}], [{"cron": "@daily", "tasks": ["A"], "colour": 1}],
+                        [{"cron": "@daily", "tasks": ""}], [{"cron": "@daily", "tasks": ["A", "  "]}],
+                        [{"cron": "0 0 31 feb *", "tasks": ["A"]}]):
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(bad, f)
+                with self.subTest(entry=bad), self.assertRaises(ValueError):
+                    task_schedule.load_schedule(path, self.scheduler)
+            self.assertEqual(len(self.scheduler), 2)
+
+    def test_bad_schedule_adds_nothing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'schedule.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([
+                    {"cron": "@daily", "tasks": ["Fine"]},
+                    {"at": "2026-10-18 09:00", "tasks": ["Also fine"]},
+                    {"cron": "@daily", "tasks": " "},
+                ], f)
+
+            with self.assertRaisesRegex(ValueError, "entry 3"):
+                task_schedule.load_schedule(path, self.scheduler)
+
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertIsNone(self.scheduler.next_due())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the task store.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import task_store
+from task_store import FAILED, PRINTING, QUEUED, TaskStore
+
+
+class TestTaskStore(unittest.TestCase):
+    """Test cases for TaskStore."""
+
+    def setUp(self):
+        # Small blocks so the tests cross block boundaries
+        self.store = TaskStore(block_size=2)
+
+    def test_add_insert_and_lookup(self):
+        ids = self.store.add(['A', 'B', 'D'])
+        [c_id] = self.store.add(['C'], position=2, priority=5, printer='Kitchen', created=100.0)
+
+        self.assertEqual(self.store.texts(), ['A', 'B', 'C', 'D'])
+        self.assertEqual(self.store.ids(), ids[:2] + [c_id] + ids[2:])
+        self.assertEqual(self.store.id_at(2), c_id)
+        self.assertEqual(self.store.task_at(2), task_store.Task(c_id, 'C', 100.0, 5, QUEUED, 'Kitchen'))
+        with self.assertRaises(IndexError):
+            self.store.task_at(4)
+
+    def test_given_ids_are_kept_and_must_be_unique(self):
+        self.assertEqual(self.store.add(['A', 'B'], [7, 9]), [7, 9])
+        self.assertEqual(self.store.add(['C']), [10])
+        with self.assertRaises(ValueError):
+            self.store.add(['D'], [9])
+
+    def test_remove_several_positions(self):
+        self.store.add(['A', 'B', 'C', 'D', 'E'])
+
+        removed = self.store.remove_at([3, 0, 1])
+
+        self.assertEqual([task.text for task in removed], ['A', 'B', 'D'])
+        self.assertEqual(self.store.texts(), ['C', 'E'])
+        self.assertNotIn(removed[0].id, self.store)
+
+    def test_move(self):
+        self.store.add(['A', 'B', 'C', 'D', 'E'])
+
+        self.store.move(0, 4)
+        self.store.move(3, 1)
+
+        self.assertEqual(self.store.texts(), ['B', 'E', 'C', 'D', 'A'])
+
+    def test_take_restore_and_remove_for_printing(self):
+        a, b, c = self.store.add(['A', 'B', 'C'])
+        self.store.set_status([b], FAILED)
+
+        taken = self.store.take([c, a], 'RONGTA 80mm')
+        self.assertEqual([task.text for task in taken], ['A', 'C'])
+        self.assertEqual(self.store.texts(), ['B'])
+        self.assertEqual(self.store.get(a).status, PRINTING)
+        self.assertEqual(self.store.get(a).printer, 'RONGTA 80mm')
+
+        self.store.add(['D'])
+        self.store.remove([a])
+        self.store.restore([c])
+        self.assertEqual(self.store.texts(), ['C', 'B', 'D'])
+        self.assertEqual(self.store.ids_with_status(FAILED), [b])
+        self.assertEqual((self.store.count(QUEUED), self.store.count(PRINTING)), (2, 0))
+
+    def test_freed_slots_are_reused(self):
+        ids = self.store.add([f"Task {i}" for i in range(10)])
+        self.store.remove(ids[:5])
+        self.store.add([f"New {i}" for i in range(5)])
+
+        self.assertEqual(len(self.store._texts), 10)
+        self.assertEqual(len(self.store), 10)
+
+    def test_large_queue_is_compact_and_fast(self):
+        store = TaskStore()
+        texts = [f"Task {i}" for i in range(100000)]
+        tracemalloc.start()
+        try:
+            store.add(texts)
+            used, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # Fields and index only; the task text itself is shared with ``texts``
+        self.assertLess(used / len(texts), 200)
+
+        started = time.perf_counter()
+        for _ in range(1000):
+            store.add(['Urgent'], position=0)
+            store.remove_at([0])
+            store.move(0, len(store) - 1)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(store.task_at(len(store) - 1).text, 'Task 999')
+
+
+if __name__ == '__main__':
+    unittest.main()
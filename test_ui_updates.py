@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for coalesced window updates, using a stand-in for the Tk root.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ui_updates import FRAME_MS, STATUS_INTERVAL_MS, UiUpdates
+
+
+class FakeRoot:
+    """The timer calls of tk.Tk, run by ``advance`` against a fake clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = {}
+        self.ids = 0
+
+    def after(self, ms, func):
+        self.ids += 1
+        self.timers[f'after#{self.ids}'] = (self.now + ms / 1000, func)
+        return f'after#{self.ids}'
+
+    def after_idle(self, func):
+        return self.after(0, func)
+
+    def after_cancel(self, timer_id):
+        del self.timers[timer_id]
+
+    def advance(self, seconds):
+        """Let ``seconds`` pass, running timers as they come due."""
+        end = self.now + seconds
+        while True:
+            due = [(when, timer_id) for timer_id, (when, _) in self.timers.items() if when <= end]
+            if not due:
+                break
+            when, timer_id = min(due)
+            self.now = max(self.now, when)
+            _, func = self.timers.pop(timer_id)
+            func()
+        self.now = end
+
+
+class TestUiUpdates(unittest.TestCase):
+    """Test cases for UiUpdates."""
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.refreshes = []
+        self.state_updates = 0
+        self.statuses = []
+        self.ui = UiUpdates(self.root, self.refreshes.append, self._update_state, self.statuses.append,
+                            clock=lambda: self.root.now)
+
+    def _update_state(self):
+        self.state_updates += 1
+
+    def test_changes_are_drawn_once_when_idle(self):
+        for start in (40, 12, 30):
+            self.ui.refresh(start)
+            self.ui.update_state()
+        self.assertEqual(self.refreshes, [])
+
+        self.root.advance(0)
+
+        self.assertEqual(self.refreshes, [12])
+        self.assertEqual(self.state_updates, 1)
+        self.assertEqual(len(self.root.timers), 0)
+
+    def test_redraws_are_at_most_one_per_frame(self):
+        # A change every millisecond for one second, as in a fast import
+        for i in range(1000):
+            self.ui.refresh(i)
+            self.root.advance(0.001)
+        self.root.advance(1)
+
+        self.assertLessEqual(len(self.refreshes), 1000 // FRAME_MS + 2)
+        # Each redraw starts from the first row changed since the last one
+        self.assertEqual(self.refreshes, sorted(self.refreshes))
+        self.assertGreaterEqual(self.refreshes[-1], 1000 - FRAME_MS)
+
+    def test_status_is_rate_limited_and_last_message_shown(self):
+        self.ui.status("Printing task 1 of 500...")
+        self.assertEqual(self.statuses, ["Printing task 1 of 500..."])
+
+        for done in range(2, 501):
+            self.ui.status(f"Printing task {done} of 500...")
+            self.root.advance(0.002)
+        self.ui.status("All 500 tasks printed.")
+        self.root.advance(1)
+
+        self.assertLessEqual(len(self.statuses), 1000 // STATUS_INTERVAL_MS + 2)
+        self.assertEqual(self.statuses[-1], "All 500 tasks printed.")
+
+    def test_flush_applies_everything_now(self):
+        self.ui.status("First")
+        self.ui.status("Second")
+        self.ui.refresh(3)
+
+        self.ui.flush()
+
+        self.assertEqual(self.statuses, ["First", "Second"])
+        self.assertEqual(self.refreshes, [3])
+        self.assertEqual(self.root.timers, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
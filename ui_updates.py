@@ -0,0 +1,121 @@
+"""
+Coalesced window updates for Receipt Task Printer.
+Model changes only note what needs redrawing: the first task that changed,
+whether the buttons may need enabling or disabling, and the latest status
+text. The redraw happens at most once per frame, when Tk is idle, however
+many changes came in, so bulk imports and fast printing do not flood the
+event loop.
+
+Status text is rate limited too: a message is shown at once unless another
+one was shown less than ``STATUS_INTERVAL_MS`` ago, in which case only the
+latest is shown when the interval ends. The last message is always shown.
+"""
+
+import math
+import time
+from typing import Callable, Optional
+
+FRAME_MS = 16  # Shortest time between two redraws, about one frame at 60 Hz
+STATUS_INTERVAL_MS = 100  # Shortest time between two status messages
+
+
+class UiUpdates:
+    """
+    Collects list, button and status updates and applies them together.
+
+    ``refresh(start)`` redraws the list from task ``start`` on,
+    ``update_state()`` sets the buttons from the model and
+    ``show_status(text)`` sets the status bar. Use from the Tk thread only.
+    """
+
+    def __init__(self, root, refresh: Callable[[int], None], update_state: Callable[[], None],
+                 show_status: Callable[[str], None], clock: Callable[[], float] = time.monotonic):
+        self.root = root
+        self._refresh = refresh
+        self._update_state = update_state
+        self._show_status = show_status
+        self._clock = clock
+        self._refresh_from: Optional[int] = None
+        self._state_dirty = False
+        self._status: Optional[str] = None
+        self._status_shown: Optional[float] = None
+        self._last_redraw: Optional[float] = None
+        self._timer: Optional[str] = None
+
+    def refresh(self, start: int = 0) -> None:
+        """Redraw the list from task ``start`` on at the next redraw."""
+        self._refresh_from = start if self._refresh_from is None else min(self._refresh_from, start)
+        self._schedule()
+
+    def update_state(self) -> None:
+        """Set the buttons from the model at the next redraw."""
+        self._state_dirty = True
+        self._schedule()
+
+    def status(self, text: str) -> None:
+        """Show ``text`` in the status bar now, or when the rate limit allows if it replaces a recent message."""
+        self._status = text
+        if self._timer is None and self._status_wait() <= 0:
+            self._apply_status()
+        else:
+            self._schedule()
+
+    def flush(self) -> None:
+        """Apply everything pending now, ignoring the frame and status rate limits."""
+        self.cancel()
+        self._redraw()
+        if self._status is not None:
+            self._apply_status()
+
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+
+    def _schedule(self) -> None:
+        if self._timer is not None:
+            return
+        if self._refresh_from is None and not self._state_dirty:
+            delay = self._status_wait()
+        else:
+            delay = self._frame_wait()
+        if delay > 0:
+            self._timer = self.root.after(delay, self._run)
+        else:
+            self._timer = self.root.after_idle(self._run)
+
+    def _run(self) -> None:
+        self._timer = None
+        if self._frame_wait() <= 0:
+            self._redraw()
+        if self._status is not None and self._status_wait() <= 0:
+            self._apply_status()
+        if self._refresh_from is not None or self._state_dirty or self._status is not None:
+            self._schedule()
+
+    def _redraw(self) -> None:
+        if self._refresh_from is None and not self._state_dirty:
+            return
+        start, self._refresh_from = self._refresh_from, None
+        state_dirty, self._state_dirty = self._state_dirty, False
+        if start is not None:
+            self._refresh(start)
+        if state_dirty:
+            self._update_state()
+        self._last_redraw = self._clock()
+
+    def _apply_status(self) -> None:
+        text, self._status = self._status, None
+        self._show_status(text)
+        self._status_shown = self._clock()
+
+    def _frame_wait(self) -> int:
+        return self._wait_ms(self._last_redraw, FRAME_MS)
+
+    def _status_wait(self) -> int:
+        return self._wait_ms(self._status_shown, STATUS_INTERVAL_MS)
+
+    def _wait_ms(self, since: Optional[float], interval_ms: int) -> int:
+        if since is None:
+            return 0
+        return max(0, math.ceil(interval_ms - (self._clock() - since) * 1000))